@@ -0,0 +1,108 @@
+"""Offline end-to-end benchmark of the orchestrator.
+
+Drives representative queries through stream_agent_response with the scripted
+fake model and fixture market data, so it measures the framework itself
+(graph steps, scheduling, charts, sandbox, streaming) without network:
+
+    python benchmark.py --conversations 4 --rounds 2 --latency 0.2
+
+"overhead" is the wall time of a conversation minus the scripted model
+latency on its critical path (4 orchestrator calls plus the slower task:
+3 quant agent calls, or 2 / 1 chart calls in two-step / merged mode).
+"""
+
+import os
+
+# Must be set before the src modules read their settings
+os.environ["MARKET_DATA_SOURCE"] = "fixture"
+os.environ.setdefault("CHECKPOINT_DB_PATH", "")  # in-memory checkpoints
+os.environ.setdefault("CHART_RESPONSE_CACHE_SIZE", "0")  # every conversation does the full work
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from src.config.settings import CHART_TASK_MODE
+from src.services.usage import get_usage_tracker
+from streamlit_app.services.agent_service import create_context, stream_agent_response
+
+QUERIES = [
+    "I'm considering a short position for a day trade for EUR/USD 1h. What's the setup quality?",
+    "Is XAU/USD 4h still in an uptrend, and where are the key support levels?",
+    "Give me a swing trading plan for GBP/USD 1day with entries and stops.",
+    "How volatile has USD/JPY 15min been recently, and is a breakout likely?",
+]
+
+ORCHESTRATOR_CALLS = 4
+TASK_CALLS = max(3, 2 if CHART_TASK_MODE == "two_step" else 1)
+
+
+async def run_conversation(query: str, latency: float) -> dict:
+    """One conversation; returns wall time, time to first event, event count and usage."""
+    context = create_context(
+        gemini_api_key="offline",
+        model_name=f"fake:{latency}",
+        subagent_model_name=f"fake:{latency}",
+    )
+    thread_id = f"bench-{uuid.uuid4().hex[:8]}"
+    start = time.perf_counter()
+    first_event = None
+    events = 0
+    async for event in stream_agent_response(query, context, thread_id):
+        events += 1
+        if first_event is None:
+            first_event = time.perf_counter() - start
+        if event.event_type == "error":
+            raise RuntimeError(event.content)
+    wall = time.perf_counter() - start
+    return {
+        "wall": wall,
+        "first_event": first_event or wall,
+        "events": events,
+        "overhead": wall - latency * (ORCHESTRATOR_CALLS + TASK_CALLS),
+        "usage": get_usage_tracker().summary(thread_id) or {},
+    }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def main(conversations: int, rounds: int, latency: float) -> None:
+    # Warm-up: starts the sandbox pool and imports the chart stack outside the measurement
+    await run_conversation(QUERIES[0], 0.0)
+
+    results = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results += await asyncio.gather(*(
+            run_conversation(QUERIES[i % len(QUERIES)], latency) for i in range(conversations)
+        ))
+    elapsed = time.perf_counter() - start
+
+    walls = [r["wall"] for r in results]
+    overheads = [r["overhead"] for r in results]
+    model_calls = sum(r["usage"].get("model_calls", 0) for r in results)
+    tokens = sum(r["usage"].get("input_tokens", 0) + r["usage"].get("output_tokens", 0) for r in results)
+
+    print(f"conversations      {len(results)} ({conversations} concurrent x {rounds} rounds, {latency}s per model call)")
+    print(f"throughput         {len(results) / elapsed * 60:.1f} conversations/min")
+    print(f"wall time          p50 {statistics.median(walls):.2f}s  p95 {_percentile(walls, 0.95):.2f}s")
+    print(f"overhead           p50 {statistics.median(overheads):.2f}s  p95 {_percentile(overheads, 0.95):.2f}s")
+    print(f"first event        p50 {statistics.median(r['first_event'] for r in results):.2f}s")
+    print(f"events / conv      {statistics.mean(r['events'] for r in results):.1f}")
+    print(f"model calls        {model_calls} ({model_calls / len(results):.1f} per conversation)")
+    print(f"estimated tokens   {tokens:,}")
+
+
+if __name__ == "__main__":
+    # Guarded so spawned sandbox worker processes do not re-run the benchmark on import
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=4, help="Concurrent conversations per round")
+    parser.add_argument("--rounds", type=int, default=2, help="Rounds of concurrent conversations")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per scripted model call")
+    args = parser.parse_args()
+    asyncio.run(main(args.conversations, args.rounds, args.latency))
@@ -25,11 +25,13 @@ async def main(query: str):
     )
     return result
 
-query = "I'm considering a short position for a day trade for EUR/USD. What's the setup quality and what should I watch for?"
-#query = "I'm looking at AAPL on the 1-hour chart. What Should I do?"
-query = (
-    "I am long term for AI stocks. But NVIDIA seems bumpy recently.",
-    "Give me a comprehensive technical analysis on the daily and weekly intervals.",
-)
-query = "What will be the most successful strategy for trading USD/JPY for the last 3 months. As a day trader. The symbol is USD/JPY."
-asyncio.run(main(query=query))
+if __name__ == "__main__":
+    # Guarded so spawned sandbox worker processes do not re-run the query on import
+    query = "I'm considering a short position for a day trade for EUR/USD. What's the setup quality and what should I watch for?"
+    #query = "I'm looking at AAPL on the 1-hour chart. What Should I do?"
+    query = (
+        "I am long term for AI stocks. But NVIDIA seems bumpy recently.",
+        "Give me a comprehensive technical analysis on the daily and weekly intervals.",
+    )
+    query = "What will be the most successful strategy for trading USD/JPY for the last 3 months. As a day trader. The symbol is USD/JPY."
+    asyncio.run(main(query=query))
@@ -1,19 +1,20 @@
 from langchain.agents import create_agent
 
 from src.agents.quant_agent import dynamic_model_from_context
+from src.agents.usage_tracking import track_usage
 from src.states_and_contexts.technical_analysis import ChartAgentContext
 from src.prompts.technical_analysis import CHART_DESCRIPTION_AGENT_SYSTEM_PROMPT, CHART_ANALYSIS_AGENT_SYSTEM_PROMPT
 
 chart_description_agent = create_agent(
     model=None,
     system_prompt=CHART_DESCRIPTION_AGENT_SYSTEM_PROMPT,
-    middleware=[dynamic_model_from_context],
+    middleware=[dynamic_model_from_context, *track_usage("chart_description_agent")],
     context_schema=ChartAgentContext
 )
 
 chart_analysis_agent = create_agent(
     model=None,
     system_prompt=CHART_ANALYSIS_AGENT_SYSTEM_PROMPT,
-    middleware=[dynamic_model_from_context],
+    middleware=[dynamic_model_from_context, *track_usage("chart_analysis_agent")],
     context_schema=ChartAgentContext
 )
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Compaction of earlier turns in long orchestrator conversations.
+
+Every orchestrator call replays the whole thread, so the task results of
+finished turns (full chart analyses, quant outputs) are paid for again on
+every later call. Once a thread's messages exceed ORCHESTRATOR_CONTEXT_BUDGET
+tokens, the large tool results of earlier turns are replaced in the thread
+state by short findings written by the subagent model. The current turn
+(everything since the last user message) is always kept verbatim, and each
+result is compacted only once, so later turns start from the smaller state.
+"""
+
+import asyncio
+
+from langchain.agents.middleware import AgentState, before_model
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.runtime import Runtime
+
+from src.config.settings import ORCHESTRATOR_CONTEXT_BUDGET
+from src.prompts.technical_analysis import TOOL_RESULT_COMPACTION_PROMPT
+from src.utils.llm import get_chat_model, parse_langchain_ai_message
+
+# Tool results shorter than this (characters) are left as they are
+MIN_COMPACT_CHARS = 1500
+
+# Characters kept when a summary cannot be made
+FALLBACK_CHARS = 800
+
+
+def _text(message: ToolMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "\n".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in message.content
+    )
+
+
+async def _summarize(model, message: ToolMessage) -> str:
+    text = _text(message)
+    try:
+        reply = await model.ainvoke(TOOL_RESULT_COMPACTION_PROMPT.format(tool_name=message.name, result=text))
+        summary = parse_langchain_ai_message(reply).strip()
+        if summary:
+            return summary
+    except Exception:
+        pass
+    return f"{text[:FALLBACK_CHARS]} ... [truncated]"
+
+
+@before_model
+async def compact_earlier_turns(state: AgentState, runtime: Runtime) -> dict | None:
+    messages = state["messages"]
+    if ORCHESTRATOR_CONTEXT_BUDGET <= 0 or count_tokens_approximately(messages) <= ORCHESTRATOR_CONTEXT_BUDGET:
+        return None
+
+    last_user = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=0)
+    stale = [
+        message for message in messages[:last_user]
+        if isinstance(message, ToolMessage)
+        and not message.additional_kwargs.get("compacted")
+        and len(_text(message)) >= MIN_COMPACT_CHARS
+    ]
+    if not stale:
+        return None
+
+    model = get_chat_model(runtime.context.subagent_model_name, runtime.context.api_key, max_retries=0)
+    summaries = await asyncio.gather(*(_summarize(model, message) for message in stale))
+
+    # Same ids, so the reducer replaces the original messages in the thread state
+    return {"messages": [
+        message.model_copy(update={
+            "content": f"[Compacted result from an earlier turn]\n{summary}",
+            "additional_kwargs": {**message.additional_kwargs, "compacted": True},
+        })
+        for message, summary in zip(stale, summaries)
+    ]}
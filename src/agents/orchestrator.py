@@ -2,13 +2,15 @@ from pathlib import Path
 
 from langchain.agents import create_agent
 from langchain.agents.middleware import dynamic_prompt, ModelRequest
-from langgraph.checkpoint.memory import InMemorySaver
 
 from src.states_and_contexts.technical_analysis import OrchestratorState, OrchestratorContext
 from src.tools.todo_tools import write_todos, read_todos
 from src.tools.think_tool import think_tool
 from src.tools.task_tool import task
 from src.agents.quant_agent import dynamic_model_from_context
+from src.agents.context_compaction import compact_earlier_turns
+from src.agents.usage_tracking import track_usage
+from src.services.checkpointer import create_checkpointer
 
 ORCHESTRATOR_PROMPT_PATH = Path(__file__).parent.parent / "prompts" / "orchestrator.md"
 ORCHESTRATOR_SYSTEM_PROMPT = ORCHESTRATOR_PROMPT_PATH.read_text(encoding="utf-8")
@@ -21,7 +23,7 @@ def orchestrator_system_prompt_from_context(request: ModelRequest) -> str:
         min_research_iterations=request.runtime.context.min_research_iterations
     )
 
-checkpointer = InMemorySaver()
+checkpointer = create_checkpointer()
 
 orchestrator_agent = create_agent(
     model=None,
@@ -29,6 +31,11 @@ orchestrator_agent = create_agent(
     system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
     state_schema=OrchestratorState,
     context_schema=OrchestratorContext,
-    middleware=[dynamic_model_from_context, orchestrator_system_prompt_from_context],
+    middleware=[
+        compact_earlier_turns,
+        dynamic_model_from_context,
+        *track_usage("orchestrator"),
+        orchestrator_system_prompt_from_context
+    ],
     checkpointer=checkpointer
 )
\ No newline at end of file
@@ -1,11 +1,12 @@
 from langchain.agents import create_agent
 from langchain.agents.middleware import dynamic_prompt, ModelRequest, ModelResponse, wrap_model_call
 from typing import Callable
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from src.states_and_contexts.technical_analysis import QuantAgentState, QuantAgentContext
 from src.prompts.technical_analysis import QUANT_AGENT_SYSTEM_PROMPT
 from src.tools.quant_tools import download_market_data, write_code
+from src.utils.llm import get_chat_model
+from src.agents.usage_tracking import track_usage
 
 # ============================================================
 # Quantitative Analysis Agent
@@ -18,11 +19,8 @@ async def dynamic_model_from_context(
     model_name = request.runtime.context.model_name
     api_key = request.runtime.context.api_key
 
-    model = ChatGoogleGenerativeAI(
-        model=model_name,
-        api_key=api_key,
-        max_retries=0
-    )
+    # Pooled per (model, key, settings, loop) so the client and its connections are reused
+    model = get_chat_model(model_name, api_key, max_retries=0)
 
     return await handler(request.override(model=model))
 
@@ -36,7 +34,7 @@ def quant_agent_system_prompt_from_context(request: ModelRequest) -> str:
 quant_agent = create_agent(
     model=None,
     tools=[download_market_data, write_code],
-    middleware=[dynamic_model_from_context, quant_agent_system_prompt_from_context],
+    middleware=[dynamic_model_from_context, *track_usage("quant_agent"), quant_agent_system_prompt_from_context],
     state_schema=QuantAgentState,
     context_schema=QuantAgentContext,
 )
@@ -0,0 +1,48 @@
+"""Middleware recording model and tool usage of an agent (see src.services.usage)."""
+
+from typing import Callable
+import time
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse, wrap_model_call, wrap_tool_call
+from langchain_core.messages import AIMessage
+from langgraph.config import get_config
+
+from src.services.usage import get_usage_tracker
+
+
+def current_thread_id() -> str:
+    """thread_id of the running conversation ("default" outside one)."""
+    try:
+        return str(get_config().get("configurable", {}).get("thread_id", "default"))
+    except RuntimeError:
+        return "default"
+
+
+def track_usage(agent: str) -> list[AgentMiddleware]:
+    """Middleware recording this agent's model calls (tokens, latency) and tool latency."""
+
+    @wrap_model_call(name=f"{agent}_model_usage")
+    async def model_usage(request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        start = time.perf_counter()
+        response = await handler(request)
+        seconds = time.perf_counter() - start
+
+        input_tokens = output_tokens = 0
+        for message in getattr(response, "result", [response]):
+            if isinstance(message, AIMessage) and message.usage_metadata:
+                input_tokens += message.usage_metadata.get("input_tokens", 0)
+                output_tokens += message.usage_metadata.get("output_tokens", 0)
+        get_usage_tracker().record_model(current_thread_id(), agent, input_tokens, output_tokens, seconds)
+        return response
+
+    @wrap_tool_call(name=f"{agent}_tool_usage")
+    async def tool_usage(request, handler):
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            get_usage_tracker().record_tool(
+                current_thread_id(), request.tool_call["name"], time.perf_counter() - start
+            )
+
+    return [model_usage, tool_usage]
@@ -17,4 +17,64 @@ ENV = os.getenv("ENV", "development")
 GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
 TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 
+# Chart persistence: "none" (default), "local" (unique file per render) or "content" (SHA-256 keyed)
+CHART_SINK = os.getenv("CHART_SINK", "none")
+CHART_SINK_DIR = os.getenv("CHART_SINK_DIR", str(BASE_DIR / "data" / "chart"))
+
+# Backend for agent chart images: "matplotlib" (default) or "plotly" (needs kaleido)
+CHART_RENDERER = os.getenv("CHART_RENDERER", "matplotlib")
+
+# Interactive charts above this many bars are downsampled server-side ("lttb" or "minmax" for line traces)
+CHART_POINT_BUDGET = int(os.getenv("CHART_POINT_BUDGET", "500"))
+CHART_DOWNSAMPLE_METHOD = os.getenv("CHART_DOWNSAMPLE_METHOD", "lttb")
+
+# Number of pre-warmed worker processes that run quant sandbox code
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Memory cap (MB) for variables kept between write_code calls of one quant session
+SANDBOX_SESSION_MAX_MB = int(os.getenv("SANDBOX_SESSION_MAX_MB", "512"))
+
+# Per-snippet limits for quant sandbox code (0 disables a limit); memory is the worker's RSS
+# growth during the snippet, on top of the sessions and cached results it already holds
+SANDBOX_WALL_SECONDS = float(os.getenv("SANDBOX_WALL_SECONDS", "30"))
+SANDBOX_CPU_SECONDS = float(os.getenv("SANDBOX_CPU_SECONDS", "20"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+
+# Per-worker memory for cached write_code results (0 disables the cache)
+SANDBOX_CACHE_MB = int(os.getenv("SANDBOX_CACHE_MB", "128"))
+
+# Bar budget for download_market_data; TwelveData requests above 5000 bars are paginated
+QUANT_MAX_BARS = int(os.getenv("QUANT_MAX_BARS", "50000"))
+
+# Local Parquet store of raw downloaded bars, read before paginating the API (needs pyarrow)
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", str(BASE_DIR / "data" / "bar_store"))
+
+# Reused Gemini chat clients: max pooled clients and seconds an unused one is kept
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))
+LLM_POOL_IDLE_SECONDS = float(os.getenv("LLM_POOL_IDLE_SECONDS", "300"))
+
+# Chart tasks: "two_step" (description call, then analysis call) or "merged" (one multimodal call)
+CHART_TASK_MODE = os.getenv("CHART_TASK_MODE", "two_step")
+
+# Subagent tasks running at once across all conversations
+TASK_MAX_CONCURRENT = int(os.getenv("TASK_MAX_CONCURRENT", "8"))
+
+# Chart subagent replies shared across conversations until the bar closes (0 disables)
+CHART_RESPONSE_CACHE_SIZE = int(os.getenv("CHART_RESPONSE_CACHE_SIZE", "256"))
+
+# Orchestrator conversation checkpoints (SQLite file; empty keeps them in memory),
+# root checkpoints kept per thread, idle-thread TTL and file size cap (0 disables)
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", str(BASE_DIR / "data" / "checkpoints.sqlite"))
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "3"))
+CHECKPOINT_THREAD_TTL_HOURS = float(os.getenv("CHECKPOINT_THREAD_TTL_HOURS", "72"))
+CHECKPOINT_MAX_MB = float(os.getenv("CHECKPOINT_MAX_MB", "512"))
+
+# Approximate orchestrator context tokens above which earlier turns' tool results are compacted (0 disables)
+ORCHESTRATOR_CONTEXT_BUDGET = int(os.getenv("ORCHESTRATOR_CONTEXT_BUDGET", "24000"))
+
+# Market data for the agents: "twelvedata" (live API) or "fixture" (offline; CSVs in
+# FIXTURE_DATA_DIR named like EUR_USD_1h.csv, else deterministic synthetic bars)
+MARKET_DATA_SOURCE = os.getenv("MARKET_DATA_SOURCE", "twelvedata")
+FIXTURE_DATA_DIR = os.getenv("FIXTURE_DATA_DIR", str(BASE_DIR / "data" / "fixtures"))
+
 # Add your configuration here
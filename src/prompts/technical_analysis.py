@@ -5,6 +5,9 @@ DOWNLOAD_MARKET_DATA_DESCRIPTION = """Download OHLC market data with pre-calcula
 
 Downloads data and saves it as a CSV file to the data/time_series/ folder.
 The file can then be used for quantitative analysis with the write_code tool.
+For TwelveData, outputsize can exceed 5000 bars (e.g. 30000 hourly bars for multi-year
+studies): the download is paginated in one call, so do not call the tool repeatedly
+to build a longer history.
 
 Data providers:
 - "twelvedata" (default): For forex (EUR/USD), crypto (BTC/USD), stocks (AAPL), commodities (XAU/USD), ETFs
@@ -29,6 +32,18 @@ The code runs in a restricted environment with access to:
 - read_csv(filename): Function to read CSV files from data/time_series/
     Automatically parses Date column as datetime, e.g.: df = read_csv("EUR_USD_4h.csv")
 - DATA_DIR: Path to the data/time_series/ directory
+- backtest(df, signals, spread=0, commission=0, stop_loss=None, take_profit=None): Vectorized
+    backtest of target positions (1/-1/0 per bar). Returns .stats, .trades, .equity, .returns, .summary()
+- crossover(a, b) / crossunder(a, b): Boolean cross events
+- positions_from_events(df, long_entry=, long_exit=, short_entry=, short_exit=): Events -> positions
+- sweep(df, strategy, grid, metric="annualized_sharpe", constraint=None, spread=0, ...): Ranked
+    parameter-grid search in one call; strategy(df, **params) returns signals or
+    {"signals": ..., "stop_loss": ..., "take_profit": ...}
+- emit(value, name=None): Return a DataFrame, Series, array, dict or number as a compact
+    table/JSON (rounded, long tables trimmed) instead of printing it, e.g. emit(table.head(10), "top")
+
+Printed lines are streamed to the user while the code runs, so print short progress
+messages in long computations.
 
 NOTE: The downloaded data already includes pre-calculated indicators (EMA, RSI, MACD,
 Bollinger Bands, ATR, ROC). Use talib only for advanced analysis like candlestick
@@ -37,9 +52,15 @@ pattern recognition, indicators not in the data, or custom technical studies.
 Date column is datetime - use pd.Timedelta for date math:
 recent = df[df['Date'] >= df['Date'].max() - pd.Timedelta(days=30)]
 
+Variables persist between write_code calls in the same session (like a notebook),
+so load a CSV once and reuse the DataFrame in later calls. Pass reset=True to
+start from a clean namespace. Very large variables may be dropped to stay within
+the session memory limit; the output will say so.
+
 Security restrictions:
 - Only reading from data/time_series/ is allowed (no write operations)
-- No system commands, imports, or network access
+- No system commands or network access; imports are limited to math, numpy, pandas, talib
+  and standard helpers (statistics, itertools, collections, datetime, ...)
 - No access to eval, exec, or other dangerous functions"""
 
 QUANT_AGENT_SYSTEM_PROMPT = """You are a Quantitative Analysis Agent specialized in financial market data analysis.
@@ -81,6 +102,30 @@ Libraries Available in write_code:
 - **numpy** (np): Numerical operations
 - **math**: Mathematical functions
 - **talib**: TA-Lib for ADVANCED analysis only (see below)
+- **backtest / crossover / crossunder / positions_from_events / sweep**: Built-in vectorized backtester and parameter sweep (see below)
+
+Strategy Backtesting:
+ALWAYS evaluate strategies with the built-in backtest() instead of writing loops over bars.
+Signals are target positions decided at a bar's close (1 long, -1 short, 0 flat, NaN = keep);
+stop_loss/take_profit are price distances (e.g. 1.5 * df['ATR']), spread is in price units.
+```python
+fast_above = df['EMA10'] > df['EMA50']
+signals = np.where(fast_above, 1, -1)
+result = backtest(df, signals, spread=0.0001, stop_loss=1.5 * df['ATR'], take_profit=3 * df['ATR'])
+emit(result.stats, "stats")
+emit(result.trades.tail(), "last_trades")
+```
+
+To compare parameter combinations, use ONE sweep() call instead of one write_code call per combination:
+```python
+def ema_cross(df, fast, slow, stop_atr):
+    f, s = talib.EMA(df['Close'].values, fast), talib.EMA(df['Close'].values, slow)
+    return {{"signals": np.where(f > s, 1, -1), "stop_loss": stop_atr * df['ATR']}}
+
+table = sweep(df, ema_cross, {{"fast": [5, 10, 20], "slow": [50, 100, 200], "stop_atr": [1, 2]}},
+              constraint=lambda fast, slow, stop_atr: fast < slow, spread=0.0001)
+emit(table.head(10), "top_combinations")
+```
 
 When to Use TA-Lib:
 DO NOT use talib for EMA, RSI, MACD, Bollinger Bands, ATR, or ROC - these are already in the downloaded data!
@@ -102,7 +147,7 @@ Workflow Guidelines:
 1. Always download data first before attempting analysis
 2. Use the pre-calculated indicators directly from the downloaded data
 3. Only use talib for pattern recognition or indicators not already in the data
-4. Use print() statements to output results in your code
+4. Use print() for short messages and emit() for tables, arrays and stats dicts (more compact than printing them)
 5. Handle errors gracefully and explain issues clearly
 6. Provide insights and interpretations of your analysis results
 
@@ -202,6 +247,19 @@ CHART_ANALYSIS_USER_PROMPT = """The {size} bars {interval} interval candlestick
 </task description>
 """
 
+CHART_MERGED_USER_PROMPT = """The {size} bars {interval} interval candlestick chart for {asset} is provided with the {analysis_type} technical indicator. Current asset close price is {current_price}.
+Extra context about the technical indicator is as follows:
+{extra_context}
+
+First, inside <chart description></chart description> tags, write a factual, chronological description
+(max 300 words, no interpretation) of how price evolved in relation to the indicator: trend, key levels,
+crossings, divergences and the closing state. Then, after the closing tag, answer the task below based on
+the chart and your description.
+<task description>
+{task_description}
+</task description>
+"""
+
 # ============================================================
 # Task tool
 # ============================================================
@@ -229,6 +287,19 @@ Reflection should address:
 3. Quality evaluation - Do I have sufficient evidence/examples for a good answer?
 4. Strategic decision - Should I stick with the current plan or adapt it?"""
 
+# ============================================================
+# Context compaction
+# ============================================================
+TOOL_RESULT_COMPACTION_PROMPT = """Below is the result of a `{tool_name}` tool call from an earlier turn of a market analysis conversation.
+Rewrite it as compact findings (max 120 words): the asset and interval, key price levels, trend / signal
+conclusions, statistics and any caveats. Keep every number that matters; drop narration and formatting.
+Return only the findings.
+
+<tool result>
+{result}
+</tool result>
+"""
+
 # ============================================================
 # Orchestrator Agent
 # ============================================================
@@ -0,0 +1,73 @@
+"""Cooperative cancellation of work a subagent task started outside the event loop.
+
+Cancelling a task's coroutine stops its awaits (LLM calls, scheduler waits),
+but not the threads and sandbox processes it is waiting on. A cancel_scope()
+around the task turns the coroutine's cancellation into a threading.Event
+those threads can see: paginated downloads stop before their next request
+and a running write_code snippet is interrupted in its worker. The scope
+travels in a contextvar, which asyncio tasks, asyncio.to_thread and
+LangGraph's tool executors copy.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import threading
+import time
+
+
+class OperationCancelled(Exception):
+    """Raised in worker threads once the task they work for was cancelled."""
+
+
+class CancelScope:
+    """Cancellation flag of one task, shared with the threads it starts."""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self) -> None:
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+
+_current_scope: ContextVar[CancelScope | None] = ContextVar("cancel_scope", default=None)
+
+
+@contextmanager
+def cancel_scope():
+    """Scope whose event is set when the enclosed coroutine is cancelled."""
+    scope = CancelScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    except asyncio.CancelledError:
+        scope.cancel()
+        raise
+    finally:
+        _current_scope.reset(token)
+
+
+def current_cancel_event() -> threading.Event | None:
+    """Event of the enclosing cancel scope, or None outside one."""
+    scope = _current_scope.get()
+    return scope.event if scope is not None else None
+
+
+def check_cancelled() -> None:
+    """Raise OperationCancelled if the enclosing scope was cancelled."""
+    scope = _current_scope.get()
+    if scope is not None and scope.cancelled:
+        raise OperationCancelled()
+
+
+def sleep_unless_cancelled(seconds: float) -> None:
+    """time.sleep that returns early, raising OperationCancelled, once the scope is cancelled."""
+    event = current_cancel_event()
+    if event is None:
+        time.sleep(seconds)
+    elif event.wait(seconds):
+        raise OperationCancelled()
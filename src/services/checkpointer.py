@@ -0,0 +1,450 @@
+"""Disk-backed LangGraph checkpointer for orchestrator threads.
+
+InMemorySaver kept every conversation's full history, including the
+subagents' image-bearing messages, in process memory until a restart lost
+it. This saver stores the same data in a local SQLite file and compacts it
+as it goes:
+
+* when a thread's root graph saves a checkpoint, only its newest
+  CHECKPOINT_KEEP root checkpoints are kept, and the checkpoints of subagent
+  runs (nested namespaces, which are never read back) are dropped;
+* threads idle for longer than CHECKPOINT_THREAD_TTL_HOURS are deleted;
+* while the file holds more than CHECKPOINT_MAX_MB, the least recently used
+  threads are deleted.
+"""
+
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+import asyncio
+import atexit
+import sqlite3
+import threading
+import time
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.config.settings import CHECKPOINT_DB_PATH, CHECKPOINT_KEEP, CHECKPOINT_MAX_MB, CHECKPOINT_THREAD_TTL_HOURS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT,
+    type TEXT,
+    value BLOB,
+    task_path TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);
+"""
+
+# Seconds between TTL / size sweeps
+MAINTENANCE_INTERVAL = 60.0
+
+# Threads updated this recently are never evicted to meet the size cap
+ACTIVE_THREAD_SECONDS = 600.0
+
+# Application types stored in graph state, allowed when checkpoints are read back
+STATE_TYPES = [
+    ("src.states_and_contexts.technical_analysis", "Todo"),
+    ("src.states_and_contexts.technical_analysis", "ChartAnalysisInput"),
+]
+
+
+def create_serializer() -> JsonPlusSerializer:
+    """Checkpoint serializer that deserializes the application's state types without warnings."""
+    return JsonPlusSerializer(allowed_msgpack_modules=STATE_TYPES)
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoints, channel blobs and pending writes in one SQLite file."""
+
+    def __init__(
+            self,
+            path: str | Path,
+            keep: int = CHECKPOINT_KEEP,
+            thread_ttl_hours: float = CHECKPOINT_THREAD_TTL_HOURS,
+            max_mb: float = CHECKPOINT_MAX_MB,
+            serde=None
+    ):
+        super().__init__(serde=serde or create_serializer())
+        self.path = Path(path)
+        self.keep = max(1, keep)
+        self.thread_ttl = thread_ttl_hours * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._last_maintenance = 0.0
+        # Opened on first use, so importing the agents doesn't create the file
+        self._connection: sqlite3.Connection | None = None
+        self._connect_lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._connect_lock:
+                if self._connection is None:
+                    self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        # auto_vacuum only takes effect if set before the first table is created
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SCHEMA)
+        atexit.register(self.close)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock, self._connect_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # Reads
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[tuple[str, str, Any]]:
+        rows = self._conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda row: writes_sort_key(row[5], row[0], row[1]))
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, _, channel, type_, value, _ in rows]
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: tuple, metadata: CheckpointMetadata | None = None) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, payload, metadata_type, metadata_payload = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, payload))
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id
+            }},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=metadata if metadata is not None else self.serde.loads_typed((metadata_type, metadata_payload)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id
+                }}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """The checkpoint named in `config`, or the thread's latest one."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+            self,
+            config: RunnableConfig | None,
+            *,
+            filter: dict[str, Any] | None = None,
+            before: RunnableConfig | None = None,
+            limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints matching the config / metadata filter, newest first within a thread."""
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        results = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                f"metadata_type, metadata FROM checkpoints {where} "
+                "ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+                params,
+            ).fetchall()
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                results.append(self._tuple(thread_id, checkpoint_ns, tuple(row), metadata))
+        yield from results
+
+    # Writes
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint and the channel values that changed with it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        stored = checkpoint.copy()
+        values: dict[str, Any] = stored.pop("channel_values")
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in new_versions.items()
+        ]
+        type_, payload = self.serde.dumps_typed(stored)
+        metadata_type, metadata_payload = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, payload, metadata_type, metadata_payload),
+            )
+            conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time()))
+            if checkpoint_ns == "":
+                self._compact_thread(conn, thread_id)
+        self._maybe_maintain()
+
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        """Save a task's pending writes for a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        regular, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel,
+                   *self.serde.dumps_typed(value), task_path)
+            # Regular writes are kept from their first save; special ones (errors, interrupts) are replaced
+            (regular if write_idx >= 0 else special).append(row)
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", regular)
+            conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+        with self._transaction() as conn:
+            self._delete_thread(conn, thread_id)
+
+    def _delete_thread(self, conn: sqlite3.Connection, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "writes", "threads"):
+            conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # Compaction
+
+    def _compact_thread(self, conn: sqlite3.Connection, thread_id: str) -> None:
+        """Keep the newest root checkpoints of a thread and the blobs they reference."""
+        for table in ("checkpoints", "blobs", "writes"):
+            conn.execute(f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns != ''", (thread_id,))
+
+        stale = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, self.keep),
+        ).fetchall()
+        if not stale:
+            return
+        for table in ("checkpoints", "writes"):
+            conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = '' AND checkpoint_id = ?",
+                [(thread_id, checkpoint_id) for checkpoint_id, in stale],
+            )
+
+        referenced = set()
+        for type_, payload in conn.execute(
+                "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''", (thread_id,)
+        ):
+            versions = self.serde.loads_typed((type_, payload))["channel_versions"]
+            referenced.update((channel, str(version)) for channel, version in versions.items())
+        blobs = conn.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ''", (thread_id,)
+        ).fetchall()
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = '' AND channel = ? AND version = ?",
+            [(thread_id, channel, version) for channel, version in blobs if (channel, version) not in referenced],
+        )
+
+    def _maybe_maintain(self) -> None:
+        now = time.monotonic()
+        if now - self._last_maintenance < MAINTENANCE_INTERVAL:
+            return
+        self._last_maintenance = now
+        self.maintain()
+
+    def _used_bytes(self) -> int:
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def maintain(self) -> None:
+        """Delete expired threads, then least recently used ones while over the size cap."""
+        now = time.time()
+        with self._transaction() as conn:
+            if self.thread_ttl > 0:
+                expired = conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?", (now - self.thread_ttl,)
+                ).fetchall()
+                for thread_id, in expired:
+                    self._delete_thread(conn, thread_id)
+            if self.max_bytes > 0:
+                while self._used_bytes() > self.max_bytes:
+                    row = conn.execute(
+                        "SELECT thread_id FROM threads WHERE updated_at < ? ORDER BY updated_at LIMIT 1",
+                        (now - ACTIVE_THREAD_SECONDS,),
+                    ).fetchone()
+                    if row is None:
+                        break
+                    self._delete_thread(conn, row[0])
+        with self._lock:
+            # Hand the freed pages back to the file system
+            self._conn.execute("PRAGMA incremental_vacuum")
+
+    # Async variants run the blocking SQLite calls on a worker thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: RunnableConfig | None,
+            *,
+            filter: dict[str, Any] | None = None,
+            before: RunnableConfig | None = None,
+            limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for item in results:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # Same version scheme as InMemorySaver
+    get_next_version = InMemorySaver.get_next_version
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """SQLite saver at CHECKPOINT_DB_PATH, or an InMemorySaver if the path is empty."""
+    if not CHECKPOINT_DB_PATH:
+        return InMemorySaver(serde=create_serializer())
+    return SqliteCheckpointSaver(CHECKPOINT_DB_PATH)
@@ -0,0 +1,128 @@
+"""Shared cache of chart subagent responses.
+
+A chart description depends only on the rendered chart and the prompt text
+(asset, interval, indicator, size, current price, extra context), so replies
+are keyed on a hash of the image, the prompt and the model. Entries live
+until the end of the bar they were rendered in; identical requests that
+arrive while the first call is still running wait for it instead of making
+their own call. Conversations run on different event loops, so in-flight
+calls are shared through concurrent futures.
+"""
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+import asyncio
+import hashlib
+import threading
+import time
+
+from src.config.settings import CHART_RESPONSE_CACHE_SIZE
+
+INTERVAL_SECONDS = {
+    "1min": 60, "5min": 300, "15min": 900, "30min": 1800, "45min": 2700,
+    "1h": 3600, "2h": 7200, "4h": 14400, "1day": 86400, "1week": 604800,
+}
+
+# Shortest lifetime of an entry, so a reply made just before a bar closes is still shared
+MIN_TTL_SECONDS = 30.0
+
+
+def bar_ttl(interval: str, now: float | None = None) -> float:
+    """Seconds until the current bar of `interval` closes (UTC-aligned)."""
+    seconds = INTERVAL_SECONDS.get(interval, 3600)
+    now = time.time() if now is None else now
+    return max(MIN_TTL_SECONDS, seconds - now % seconds)
+
+
+def response_key(kind: str, model_name: str, text_prompt: str, encoded_chart: str) -> str:
+    """Cache key of one chart subagent call."""
+    digest = hashlib.sha256()
+    for part in (kind, model_name, text_prompt, encoded_chart):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """LRU of subagent replies with per-entry expiry and shared in-flight calls."""
+
+    def __init__(self, max_entries: int = CHART_RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()  # key -> (expires_at, text)
+        self._inflight: dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def put(self, key: str, text: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_call(self, key: str, ttl: float, call: Callable[[], Awaitable[str]]) -> str:
+        """Cached reply for `key`, else the reply of `call()` (shared with concurrent callers)."""
+        if self.max_entries <= 0:
+            return await call()
+
+        with self._lock:
+            text = self._get_locked(key)
+            if text is not None:
+                self.hits += 1
+                return text
+            self.misses += 1
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = Future()
+
+        if pending is not None:
+            # shield: a cancelled waiter must not cancel the call other waiters share
+            text = await asyncio.shield(asyncio.wrap_future(pending))
+            # None means the shared call failed; make our own
+            return text if text is not None else await call()
+
+        text = None
+        try:
+            text = await call()
+            self.put(key, text, ttl)
+            return text
+        finally:
+            with self._lock:
+                future = self._inflight.pop(key)
+            future.set_result(text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# Global cache shared by all conversations of this process
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the process-wide chart response cache."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1 @@
+"""Sandboxed execution of agent-written analysis code."""
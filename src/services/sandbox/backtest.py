@@ -0,0 +1,239 @@
+"""Vectorized backtesting for strategies evaluated in the quant sandbox.
+
+Signals are target positions per bar (1 long, -1 short, 0 flat, NaN keeps the
+previous target), decided at a bar's close and filled at that close, so the
+position is held from the next bar on. Stops and targets are price distances
+from the entry checked against each bar's High/Low; when both are touched in
+the same bar the stop is assumed to fill first. Everything is computed with
+pandas/numpy column operations, no per-bar Python loop.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def crossover(a, b) -> pd.Series:
+    """True on bars where `a` crosses above `b` (series or scalar)."""
+    a = pd.Series(a)
+    b = pd.Series(b, index=a.index) if np.ndim(b) else b
+    return (a > b) & (a.shift(1) <= (b.shift(1) if isinstance(b, pd.Series) else b))
+
+
+def crossunder(a, b) -> pd.Series:
+    """True on bars where `a` crosses below `b` (series or scalar)."""
+    a = pd.Series(a)
+    b = pd.Series(b, index=a.index) if np.ndim(b) else b
+    return (a < b) & (a.shift(1) >= (b.shift(1) if isinstance(b, pd.Series) else b))
+
+
+def positions_from_events(index, long_entry=None, long_exit=None, short_entry=None, short_exit=None) -> pd.Series:
+    """Build target positions from boolean entry/exit events.
+
+    Entries open (or flip) a position; an exit only closes a position of its own
+    side. When an entry and an exit fire on the same bar the entry wins.
+    """
+    index = pd.Index(index) if not isinstance(index, (pd.DataFrame, pd.Series)) else index.index
+    none = pd.Series(False, index=index)
+
+    def as_bool(events):
+        return none if events is None else pd.Series(np.asarray(events, dtype=bool), index=index)
+
+    long_entry, long_exit = as_bool(long_entry), as_bool(long_exit)
+    short_entry, short_exit = as_bool(short_entry), as_bool(short_exit)
+
+    entries = pd.Series(np.nan, index=index)
+    entries[long_entry] = 1.0
+    entries[short_entry] = -1.0
+    last_entry = entries.ffill()
+
+    events = entries.copy()
+    exits = (long_exit & (last_entry == 1)) | (short_exit & (last_entry == -1))
+    events[exits & entries.isna()] = 0.0
+    return events.ffill().fillna(0.0)
+
+
+@dataclass
+class BacktestResult:
+    """Output of `backtest`.
+
+    Attributes:
+        positions: Position held during each bar after stops/targets
+        returns: Per-bar strategy returns, net of costs
+        equity: Equity curve starting at 1.0
+        trades: One row per trade (entry/exit time and price, direction, pnl, exit reason)
+        stats: Summary statistics
+    """
+    positions: pd.Series
+    returns: pd.Series
+    equity: pd.Series
+    trades: pd.DataFrame
+    stats: dict
+
+    def summary(self) -> str:
+        """Stats formatted for printing."""
+        return "\n".join(
+            f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}"
+            for name, value in self.stats.items()
+        )
+
+
+def _periods_per_year(times: pd.Series) -> float:
+    """Bars per calendar year, inferred from the median bar spacing."""
+    if not pd.api.types.is_datetime64_any_dtype(times) or len(times) < 2:
+        return 252.0
+    step = times.diff().median()
+    return SECONDS_PER_YEAR / step.total_seconds() if step.total_seconds() > 0 else 252.0
+
+
+def _as_series(values, index, name: str) -> pd.Series | None:
+    if values is None:
+        return None
+    if np.ndim(values) == 0:
+        return pd.Series(float(values), index=index, name=name)
+    return pd.Series(np.asarray(values, dtype=float), index=index, name=name)
+
+
+def backtest(
+    df: pd.DataFrame,
+    signals,
+    spread: float = 0.0,
+    commission: float = 0.0,
+    stop_loss=None,
+    take_profit=None,
+) -> BacktestResult:
+    """Backtest target-position signals over an OHLC frame.
+
+    Args:
+        df: Frame with Open, High, Low, Close (and optionally Date) columns
+        signals: Target position per bar (array/Series aligned with df; NaN keeps previous)
+        spread: Bid/ask spread in price units, paid once per round trip
+        commission: Commission as a fraction of notional, paid on entry and exit
+        stop_loss: Stop distance in price units (scalar or per-bar, read at the entry bar)
+        take_profit: Target distance in price units (scalar or per-bar, read at the entry bar)
+
+    Returns:
+        BacktestResult with positions, returns, equity curve, trade list and stats
+    """
+    index = df.index
+    close = df["Close"].astype(float)
+    open_ = df["Open"].astype(float) if "Open" in df else close
+    high = df["High"].astype(float) if "High" in df else close
+    low = df["Low"].astype(float) if "Low" in df else close
+    times = df["Date"] if "Date" in df else pd.Series(index, index=index)
+    prev_close = close.shift(1)
+
+    target = pd.Series(np.asarray(signals, dtype=float), index=index).ffill().fillna(0.0)
+    position = target.shift(1).fillna(0.0)
+
+    # A trade is a run of bars with the same non-zero position
+    trade_id = (position != position.shift(1)).cumsum().where(position != 0)
+    in_trade = trade_id.notna()
+    first_bar = in_trade & (trade_id != trade_id.shift(1))
+    entry_price = prev_close.where(first_bar).groupby(trade_id).transform("first")
+    direction = np.sign(position)
+
+    stop_hit = pd.Series(False, index=index)
+    target_hit = pd.Series(False, index=index)
+    stop_price = target_price = pd.Series(np.nan, index=index)
+    stop_dist = _as_series(stop_loss, index, "stop_loss")
+    if stop_dist is not None:
+        stop_dist = stop_dist.shift(1).where(first_bar).groupby(trade_id).transform("first")
+        stop_price = entry_price - direction * stop_dist
+        stop_hit = in_trade & (((direction > 0) & (low <= stop_price)) | ((direction < 0) & (high >= stop_price)))
+    target_dist = _as_series(take_profit, index, "take_profit")
+    if target_dist is not None:
+        target_dist = target_dist.shift(1).where(first_bar).groupby(trade_id).transform("first")
+        target_price = entry_price + direction * target_dist
+        target_hit = in_trade & (((direction > 0) & (high >= target_price)) | ((direction < 0) & (low <= target_price)))
+
+    # Bars after the first stop/target hit of a trade are flat until the signal changes
+    hit = (stop_hit | target_hit).astype(int)
+    hits_before = hit.groupby(trade_id).cumsum() - hit
+    stopped_out = in_trade & (hits_before > 0)
+    exit_by_level = in_trade & ~stopped_out & (hit > 0)
+    position = position.where(~stopped_out, 0.0)
+    trade_id = trade_id.where(~stopped_out)
+    in_trade = trade_id.notna()
+
+    # Fill price on the bar a level is hit; gaps through a level fill at the open
+    stop_fill = np.where(direction > 0, np.minimum(open_, stop_price), np.maximum(open_, stop_price))
+    target_fill = np.where(direction > 0, np.maximum(open_, target_price), np.minimum(open_, target_price))
+    level_fill = pd.Series(np.where(stop_hit, stop_fill, target_fill), index=index)
+    bar_exit_price = close.where(~exit_by_level, level_fill)
+
+    gross = (position * (bar_exit_price - prev_close) / prev_close).fillna(0.0)
+    cost = (position.abs() * (spread / entry_price + 2 * commission)).where(first_bar & in_trade, 0.0).fillna(0.0)
+    returns = gross - cost
+    equity = (1 + returns).cumprod()
+
+    trades = _trade_list(trade_id, times, position, entry_price, bar_exit_price, stop_hit, exit_by_level,
+                         spread, commission, len(df))
+    stats = _stats(returns, equity, position, trades, _periods_per_year(times))
+    return BacktestResult(positions=position, returns=returns, equity=equity, trades=trades, stats=stats)
+
+
+def _trade_list(trade_id, times, position, entry_price, exit_price, stop_hit, exit_by_level,
+                spread, commission, n_bars) -> pd.DataFrame:
+    """Aggregate per-bar trade columns into one row per trade."""
+    columns = ["entry_time", "exit_time", "direction", "size", "entry_price", "exit_price",
+               "bars_held", "pnl", "return", "exit_reason"]
+    bars = pd.DataFrame({
+        "trade": trade_id,
+        "time": times.values,
+        "position": position,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "stop": stop_hit,
+        "level": exit_by_level,
+        "bar": np.arange(n_bars),
+    }).dropna(subset=["trade"])
+    if bars.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = bars.groupby("trade", sort=True)
+    first, last = grouped.first(), grouped.last()
+    entry_bar = first["bar"] - 1
+    all_times = times.reset_index(drop=True)
+
+    trades = pd.DataFrame({
+        "entry_time": all_times.iloc[entry_bar.clip(lower=0)].values,
+        "exit_time": last["time"].values,
+        "direction": np.where(first["position"] > 0, "long", "short"),
+        "size": first["position"].abs().values,
+        "entry_price": first["entry_price"].values,
+        "exit_price": last["exit_price"].values,
+        "bars_held": grouped.size().values,
+    })
+    sign = np.sign(first["position"].values)
+    costs = trades["size"] * (spread + 2 * commission * trades["entry_price"])
+    trades["pnl"] = sign * trades["size"] * (trades["exit_price"] - trades["entry_price"]) - costs
+    trades["return"] = trades["pnl"] / (trades["size"] * trades["entry_price"])
+    trades["exit_reason"] = np.select(
+        [last["level"].values & last["stop"].values, last["level"].values, last["bar"].values == n_bars - 1],
+        ["stop", "target", "open"],
+        default="signal",
+    )
+    return trades[columns]
+
+
+def _stats(returns, equity, position, trades, periods_per_year) -> dict:
+    """Summary statistics of a backtest."""
+    drawdown = equity / equity.cummax() - 1
+    std = returns.std()
+    wins = trades["pnl"][trades["pnl"] > 0].sum() if len(trades) else 0.0
+    losses = -trades["pnl"][trades["pnl"] < 0].sum() if len(trades) else 0.0
+    return {
+        "total_return": float(equity.iloc[-1] - 1) if len(equity) else 0.0,
+        "annualized_sharpe": float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "num_trades": int(len(trades)),
+        "win_rate": float((trades["pnl"] > 0).mean()) if len(trades) else 0.0,
+        "avg_trade_return": float(trades["return"].mean()) if len(trades) else 0.0,
+        "profit_factor": float(wins / losses) if losses > 0 else float("inf") if wins > 0 else 0.0,
+        "exposure": float((position != 0).mean()) if len(position) else 0.0,
+        "avg_bars_held": float(trades["bars_held"].mean()) if len(trades) else 0.0,
+    }
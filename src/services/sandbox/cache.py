@@ -0,0 +1,176 @@
+"""Result cache for deterministic sandbox snippets.
+
+An entry is keyed on the snippet's normalized AST, a fingerprint of the
+session variables it reads, and the size/mtime of every file in the session
+data directory (so a re-download invalidates it). A hit returns the earlier
+output and restores copies of the variables the snippet assigned or read
+(it may have mutated them), leaving the session as a real re-run would.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+import ast
+import builtins
+import copy
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Names whose presence makes a snippet's output depend on more than its inputs
+NONDETERMINISTIC_NAMES = {
+    "random", "default_rng", "shuffle", "permutation", "choice", "sample",
+    "now", "today", "utcnow", "time", "perf_counter", "monotonic", "uuid4",
+}
+
+
+@dataclass
+class SnippetInfo:
+    """Static facts about a snippet needed for caching."""
+    normalized: str | None
+    free_names: list[str] = field(default_factory=list)
+    assigned_names: list[str] = field(default_factory=list)
+    cacheable: bool = False
+
+
+def _names(node: ast.AST, ctx: type) -> set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ctx)}
+
+
+def _defined_names(stmt: ast.stmt) -> set[str]:
+    """Top-level names a statement binds (assignments, defs, imports)."""
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {stmt.name}
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return {(alias.asname or alias.name).split(".")[0] for alias in stmt.names}
+    return _names(stmt, ast.Store)
+
+
+def analyze_snippet(code: str, sandbox_names: set[str]) -> SnippetInfo:
+    """Find the session variables a snippet reads and the ones it assigns.
+
+    Statements are scanned in order; a name loaded before any earlier statement
+    assigned it is read from the session namespace.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return SnippetInfo(normalized=None)
+
+    attributes = {n.attr for n in ast.walk(tree) if isinstance(n, ast.Attribute)}
+    loaded_everywhere = _names(tree, ast.Load)
+    if (attributes | loaded_everywhere) & NONDETERMINISTIC_NAMES:
+        return SnippetInfo(normalized=ast.dump(tree))
+
+    known = set(sandbox_names) | set(dir(builtins))
+    free, assigned = [], []
+    for stmt in tree.body:
+        for name in sorted(_names(stmt, ast.Load) - set(assigned) - known):
+            if name not in free:
+                free.append(name)
+        for name in sorted(_defined_names(stmt)):
+            if name not in assigned:
+                assigned.append(name)
+    return SnippetInfo(normalized=ast.dump(tree), free_names=free, assigned_names=assigned, cacheable=True)
+
+
+def fingerprint_value(value) -> str | None:
+    """Content hash of a session variable, or None if it cannot be fingerprinted."""
+    # Buffers are hashed in place: a copy of a large variable would count against the
+    # snippet's memory limit
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.data)
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+        return digest.hexdigest()
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return None
+        digest = hashlib.sha256(np.ascontiguousarray(value).data)
+        digest.update(str((value.dtype, value.shape)).encode())
+        return digest.hexdigest()
+    if isinstance(value, (int, float, complex, str, bytes, bool, type(None))):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        parts = [fingerprint_value(item) for item in value]
+        return None if None in parts else hashlib.sha256(repr(parts).encode()).hexdigest()
+    if isinstance(value, dict):
+        parts = [(repr(key), fingerprint_value(item)) for key, item in value.items()]
+        return None if any(part is None for _, part in parts) else hashlib.sha256(repr(parts).encode()).hexdigest()
+    return None
+
+
+def data_dir_signature(data_dir: Path) -> str:
+    """Size and mtime of every file in the data directory."""
+    try:
+        entries = sorted((p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in Path(data_dir).iterdir() if p.is_file())
+    except OSError:
+        entries = []
+    return hashlib.sha256(repr(entries).encode()).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    output: str
+    bindings: dict
+    seconds: float
+    nbytes: int
+
+
+class ResultCache:
+    """LRU cache of snippet results for all sessions of one worker."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "uncacheable": 0, "saved_seconds": 0.0}
+
+    def key(self, session: str, info: SnippetInfo, namespace: dict, data_dir: Path) -> tuple | None:
+        """Cache key for running `info` in this session now, or None if not cacheable."""
+        if not info.cacheable:
+            return None
+        fingerprints = []
+        for name in info.free_names:
+            if name not in namespace:
+                fingerprints.append((name, "<unbound>"))
+                continue
+            fp = fingerprint_value(namespace[name])
+            if fp is None:
+                return None
+            fingerprints.append((name, fp))
+        return (session, info.normalized, tuple(fingerprints), data_dir_signature(data_dir))
+
+    def get(self, key: tuple | None) -> CacheEntry | None:
+        if key is None:
+            self.stats["uncacheable"] += 1
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        self.stats["saved_seconds"] += entry.seconds
+        return entry
+
+    def put(self, key: tuple, output: str, bindings: dict, seconds: float, nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        try:
+            bindings = copy.deepcopy(bindings)
+        except Exception:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = CacheEntry(output, bindings, seconds, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def invalidate(self, session: str) -> None:
+        """Drop every entry of a session."""
+        for key in [key for key in self._entries if key[0] == session]:
+            self._bytes -= self._entries.pop(key).nbytes
@@ -0,0 +1,141 @@
+"""Session-scoped interpreter state for the quant sandbox.
+
+Like a notebook kernel, variables defined by one write_code call stay
+available to the next call of the same session, so loaded CSVs and
+intermediate frames are not rebuilt on every iteration. Each session's user
+variables are capped in size; the largest ones are dropped when the cap is hit.
+Deterministic snippets are served from a result cache (see cache.py).
+"""
+
+from pathlib import Path
+from typing import Callable
+import copy
+import sys
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from src.services.sandbox.cache import ResultCache, analyze_snippet
+from src.services.sandbox.limits import (SandboxCancelled, SandboxLimitExceeded, SandboxLimits, format_limit_error,
+                                         time_limits)
+from src.services.sandbox.runtime import build_sandbox_globals, execute_code
+from src.services.sandbox.shared_frames import AttachedFrames
+
+
+def estimate_nbytes(value) -> int:
+    """Approximate memory held by a sandbox variable."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set, dict)):
+        items = value.values() if isinstance(value, dict) else value
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in items)
+    return sys.getsizeof(value)
+
+
+class SessionKernels:
+    """Persistent namespaces for every session handled by one worker process."""
+
+    def __init__(self, max_session_bytes: int, max_cache_bytes: int = 0):
+        self.max_session_bytes = max_session_bytes
+        self.cache = ResultCache(max_cache_bytes) if max_cache_bytes > 0 else None
+        self._namespaces: dict[str, dict] = {}
+        self._builtin_names: dict[str, set[str]] = {}
+        self._frames: dict[str, AttachedFrames] = {}
+
+    def namespace(self, session: str, data_dir: Path) -> dict:
+        """Get or create the namespace of a session."""
+        if session not in self._namespaces:
+            frames = self._frames.setdefault(session, AttachedFrames())
+            namespace = build_sandbox_globals(data_dir, frames)
+            self._namespaces[session] = namespace
+            self._builtin_names[session] = set(namespace)
+        return self._namespaces[session]
+
+    def reset(self, session: str) -> None:
+        """Forget all variables of a session."""
+        self._namespaces.pop(session, None)
+        self._builtin_names.pop(session, None)
+
+    def close(self, session: str) -> None:
+        """Forget a session's variables and cached results and detach its shared frames."""
+        self.reset(session)
+        frames = self._frames.pop(session, None)
+        if frames is not None:
+            frames.close()
+        if self.cache is not None:
+            self.cache.invalidate(session)
+
+    def user_variables(self, session: str) -> dict:
+        """Variables defined by the session's own code (no modules or injected helpers)."""
+        builtin_names = self._builtin_names.get(session, set())
+        return {
+            name: value
+            for name, value in self._namespaces.get(session, {}).items()
+            if name not in builtin_names and not name.startswith('__') and not isinstance(value, types.ModuleType)
+        }
+
+    def enforce_limit(self, session: str) -> list[str]:
+        """Drop the largest variables until the session fits its memory cap."""
+        sizes = {name: estimate_nbytes(value) for name, value in self.user_variables(session).items()}
+        total = sum(sizes.values())
+        dropped = []
+        for name in sorted(sizes, key=sizes.get, reverse=True):
+            if total <= self.max_session_bytes:
+                break
+            del self._namespaces[session][name]
+            total -= sizes[name]
+            dropped.append(name)
+        return dropped
+
+    def execute(self, session: str, code: str, data_dir: Path, reset: bool = False,
+                limits: SandboxLimits | None = None, frame_layouts: dict | None = None,
+                on_event: Callable[[str, object], None] | None = None) -> str:
+        """Run code in the session's namespace and report any evicted variables.
+
+        on_event receives streamed output and emitted results (see execute_code).
+        """
+        if reset:
+            self.reset(session)
+        self._frames.setdefault(session, AttachedFrames()).update(frame_layouts or {})
+        limits = limits or SandboxLimits()
+        namespace = self.namespace(session, data_dir)
+
+        info = cache_key = None
+        if self.cache is not None:
+            info = analyze_snippet(code, self._builtin_names[session])
+            cache_key = self.cache.key(session, info, namespace, data_dir)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                namespace.update(copy.deepcopy(entry.bindings))
+                return f"{entry.output}\n\n(Cached result: identical code and inputs already ran in this session.)"
+
+        start = time.perf_counter()
+        try:
+            with time_limits(limits):
+                output = execute_code(code, data_dir, namespace, on_event)
+        except SandboxLimitExceeded as e:
+            output = format_limit_error(e.kind, e.limit)
+        except SandboxCancelled:
+            output = "Error: Execution cancelled."
+        elapsed = time.perf_counter() - start
+
+        if cache_key is not None and not output.startswith("Error"):
+            # Read variables are stored too: the snippet may have mutated them in place
+            names = info.assigned_names + info.free_names
+            bindings = {name: namespace[name] for name in names if name in namespace}
+            self.cache.put(cache_key, output, bindings, elapsed,
+                           len(output) + sum(estimate_nbytes(value) for value in bindings.values()))
+
+        dropped = self.enforce_limit(session)
+        if dropped:
+            limit_mb = self.max_session_bytes / (1024 * 1024)
+            output += (
+                f"\n\nNote: session memory limit ({limit_mb:.0f} MB) exceeded; "
+                f"dropped variables: {', '.join(dropped)}. Recreate them if needed."
+            )
+        return output
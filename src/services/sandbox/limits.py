@@ -0,0 +1,100 @@
+"""Per-snippet resource limits for the quant sandbox.
+
+CPU and wall time are enforced inside the worker with interval timers, which
+interrupt pure-Python loops and keep the session's variables. The parent
+also applies a hard wall deadline and a cap on the worker's RSS growth
+during the snippet (memory already held by other sessions does not count),
+and kills the worker when either is crossed (e.g. inside a long C call or a
+runaway merge). A snippet
+whose task was cancelled is interrupted the same way, by CANCEL_SIGNAL.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import os
+import signal
+
+from src.config.settings import SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_WALL_SECONDS
+
+# Extra time the worker gets to honour its own wall timer before it is killed
+HARD_KILL_GRACE_SECONDS = 2.0
+
+# Sent by the parent to interrupt the running snippet of a cancelled task
+CANCEL_SIGNAL = signal.SIGUSR1
+
+LIMIT_HINTS = {
+    "cpu_time": "Vectorize loops over bars with pandas/numpy instead of iterating row by row.",
+    "wall_time": "Vectorize loops and work on a smaller date range.",
+    "memory": "Avoid cartesian merges and large intermediate copies; select only the columns you need.",
+}
+
+
+@dataclass
+class SandboxLimits:
+    """Limits applied to every snippet. A value of 0 disables that limit."""
+    wall_seconds: float = SANDBOX_WALL_SECONDS
+    cpu_seconds: float = SANDBOX_CPU_SECONDS
+    memory_mb: int = SANDBOX_MEMORY_MB
+
+
+class SandboxLimitExceeded(BaseException):
+    """Raised when a snippet exceeds a limit.
+
+    Derives from BaseException so agent code using `except Exception` cannot
+    swallow it.
+    """
+
+    def __init__(self, kind: str, limit: float):
+        super().__init__(f"{kind} limit of {limit} exceeded")
+        self.kind = kind
+        self.limit = limit
+
+
+class SandboxCancelled(BaseException):
+    """Raised when the task that ran a snippet was cancelled."""
+
+
+def format_limit_error(kind: str, limit: float, state_lost: bool = False) -> str:
+    """Error string returned to the agent when a limit is hit."""
+    unit = "MB" if kind == "memory" else "s"
+    message = f"Error: Sandbox {kind} limit exceeded ({limit:g}{unit}); execution was stopped."
+    if state_lost:
+        message += " The worker was restarted and session variables were lost."
+    return f"{message} {LIMIT_HINTS.get(kind, '')}".strip()
+
+
+@contextmanager
+def time_limits(limits: SandboxLimits):
+    """Interrupt the enclosed code once it uses too much CPU or wall time, or is cancelled (worker main thread only)."""
+    def on_cpu(signum, frame):
+        raise SandboxLimitExceeded("cpu_time", limits.cpu_seconds)
+
+    def on_wall(signum, frame):
+        raise SandboxLimitExceeded("wall_time", limits.wall_seconds)
+
+    def on_cancel(signum, frame):
+        raise SandboxCancelled()
+
+    previous = (signal.signal(signal.SIGPROF, on_cpu), signal.signal(signal.SIGALRM, on_wall),
+                signal.signal(CANCEL_SIGNAL, on_cancel))
+    if limits.cpu_seconds:
+        signal.setitimer(signal.ITIMER_PROF, limits.cpu_seconds)
+    if limits.wall_seconds:
+        signal.setitimer(signal.ITIMER_REAL, limits.wall_seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGPROF, previous[0])
+        signal.signal(signal.SIGALRM, previous[1])
+        signal.signal(CANCEL_SIGNAL, previous[2])
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,296 @@
+"""Pool of pre-warmed worker processes that execute quant sandbox snippets.
+
+Each worker is a spawned process that has already imported pandas, numpy and
+talib. A worker runs one snippet at a time and sends its captured output back
+over a pipe, so concurrent quant agents neither share stdout nor contend for
+one GIL. Sessions are pinned to a worker so their kernel state (see
+kernel.SessionKernels) is available on every call.
+"""
+
+from dataclasses import asdict
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Callable
+import atexit
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+
+from src.config.settings import SANDBOX_CACHE_MB, SANDBOX_WORKERS, SANDBOX_SESSION_MAX_MB
+from src.services.sandbox.kernel import SessionKernels
+from src.services.sandbox.shared_frames import get_shared_frames
+from src.services.sandbox.limits import (CANCEL_SIGNAL, HARD_KILL_GRACE_SECONDS, SandboxCancelled,
+                                         SandboxLimitExceeded, SandboxLimits, format_limit_error, rss_bytes)
+
+
+def _worker_main(conn: Connection, max_session_bytes: int, max_cache_bytes: int) -> None:
+    """Worker loop: receive a request, execute it, send the reply back."""
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Only a running snippet handles cancellation (see limits.time_limits); a late one is dropped
+    signal.signal(CANCEL_SIGNAL, signal.SIG_IGN)
+    kernels = SessionKernels(max_session_bytes, max_cache_bytes)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        if request["op"] == "reset":
+            kernels.close(request["session"])
+            conn.send("Session state cleared.")
+        elif request["op"] == "stats":
+            conn.send(dict(kernels.cache.stats) if kernels.cache is not None else {})
+        else:
+            if request.get("invalidate") and kernels.cache is not None:
+                kernels.cache.invalidate(request["session"])
+            on_event = (lambda kind, payload: conn.send(("event", kind, payload))) if request.get("stream") else None
+            conn.send(kernels.execute(
+                request["session"], request["code"], Path(request["data_dir"]),
+                reset=request.get("reset", False), limits=SandboxLimits(**request["limits"]),
+                frame_layouts=request.get("frames"), on_event=on_event,
+            ))
+    conn.close()
+
+
+class SandboxWorker:
+    """A single sandbox process, the parent end of its pipe and its pinned sessions."""
+
+    def __init__(self, ctx: mp.context.BaseContext, max_session_bytes: int, max_cache_bytes: int = 0):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, max_session_bytes, max_cache_bytes),
+            daemon=True, name="sandbox-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.sessions: set[str] = set()
+
+    def run(self, request: dict, limits: SandboxLimits | None = None, poll_interval: float = 0.1,
+            on_event: Callable[[str, object], None] | None = None, cancel: threading.Event | None = None) -> str:
+        """Send a request and block until the worker replies.
+
+        Events the worker streams before its reply are passed to on_event.
+        Once `cancel` is set the running snippet is interrupted, and the reply
+        is its (cancelled) output.
+
+        Raises:
+            SandboxLimitExceeded: The worker outlived its hard wall deadline or
+                grew by more than the memory limit during this request; the
+                caller must replace it.
+            SandboxCancelled: The worker did not stop after being cancelled;
+                the caller must replace it.
+        """
+        deadline = None
+        max_rss = None
+        if limits is not None:
+            deadline = time.monotonic() + limits.wall_seconds + HARD_KILL_GRACE_SECONDS if limits.wall_seconds else None
+            if limits.memory_mb:
+                # Growth from here on: sessions of other conversations pinned to this
+                # worker and its result cache are already part of the RSS
+                max_rss = (rss_bytes(self.process.pid) or 0) + limits.memory_mb * 1024 * 1024
+        self.conn.send(request)
+
+        cancelled_at = None
+        while True:
+            while not self.conn.poll(poll_interval):
+                if cancel is not None and cancel.is_set():
+                    if cancelled_at is None:
+                        os.kill(self.process.pid, CANCEL_SIGNAL)
+                        cancelled_at = time.monotonic()
+                    elif time.monotonic() - cancelled_at > HARD_KILL_GRACE_SECONDS:
+                        raise SandboxCancelled()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise SandboxLimitExceeded("wall_time", limits.wall_seconds)
+                if max_rss is not None and (rss_bytes(self.process.pid) or 0) > max_rss:
+                    raise SandboxLimitExceeded("memory", limits.memory_mb)
+            message = self.conn.recv()
+            if isinstance(message, tuple) and message[0] == "event":
+                if on_event is not None:
+                    on_event(message[1], message[2])
+                continue
+            return message
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Ask the worker to exit, terminating it if it does not."""
+        if not self.process.is_alive():
+            self.conn.close()
+            return
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class SandboxPool:
+    """Fixed-size pool of sandbox workers with per-session affinity."""
+
+    def __init__(self, size: int = SANDBOX_WORKERS, max_session_mb: int = SANDBOX_SESSION_MAX_MB,
+                 limits: SandboxLimits | None = None, cache_mb: int = SANDBOX_CACHE_MB):
+        # spawn, not fork: the parent runs asyncio and LLM client threads
+        self._ctx = mp.get_context("spawn")
+        self.limits = limits or SandboxLimits()
+        self._max_session_bytes = max_session_mb * 1024 * 1024
+        self._max_cache_bytes = cache_mb * 1024 * 1024
+        self._workers: list[SandboxWorker] = []
+        self._sessions: dict[str, SandboxWorker] = {}
+        self._stale_sessions: set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(max(1, size)):
+            self._workers.append(self._new_worker())
+
+    def _new_worker(self) -> SandboxWorker:
+        return SandboxWorker(self._ctx, self._max_session_bytes, self._max_cache_bytes)
+
+    def _worker_for(self, session: str) -> SandboxWorker:
+        """Return the session's worker, pinning new sessions to the least loaded one."""
+        with self._lock:
+            worker = self._sessions.get(session)
+            if worker is None:
+                worker = min(self._workers, key=lambda w: (len(w.sessions), w.lock.locked()))
+                worker.sessions.add(session)
+                self._sessions[session] = worker
+            return worker
+
+    def _replace_worker(self, worker: SandboxWorker) -> None:
+        """Kill a dead or runaway worker and start a fresh one; its sessions lose their state."""
+        with self._lock:
+            for session in worker.sessions:
+                self._sessions.pop(session, None)
+            if worker in self._workers:
+                self._workers.remove(worker)
+                if not self._closed:
+                    self._workers.append(self._new_worker())
+        worker.process.kill()
+        worker.close(timeout=0.1)
+
+    def execute(self, code: str, data_dir: str | Path, session: str | None = None, reset: bool = False,
+                on_event: Callable[[str, object], None] | None = None,
+                cancel: threading.Event | None = None) -> str:
+        """Run a snippet in a session's kernel and return its output.
+
+        Args:
+            code: Python code to execute
+            data_dir: Directory the snippet may read from
+            session: Kernel key; defaults to the data directory
+            reset: Clear the session's variables before running
+            on_event: Called (from this thread) with ("output", text) and
+                ("result", dict) events while the snippet runs
+            cancel: Set when the calling task is cancelled; interrupts the snippet
+        """
+        if self._closed:
+            return "Error executing code: sandbox pool is shut down."
+        if cancel is not None and cancel.is_set():
+            return "Error: Execution cancelled."
+        session = session or str(data_dir)
+        worker = self._worker_for(session)
+        with self._lock:
+            invalidate = session in self._stale_sessions
+            self._stale_sessions.discard(session)
+        with worker.lock:
+            try:
+                return worker.run({
+                    "op": "execute", "session": session, "code": code, "data_dir": str(data_dir), "reset": reset,
+                    "limits": asdict(self.limits), "invalidate": invalidate,
+                    "frames": get_shared_frames().layouts(session), "stream": on_event is not None,
+                }, self.limits, on_event=on_event, cancel=cancel)
+            except SandboxLimitExceeded as e:
+                self._replace_worker(worker)
+                return format_limit_error(e.kind, e.limit, state_lost=True)
+            except SandboxCancelled:
+                # Stuck in a C call; nobody waits for the result, so restart the worker
+                self._replace_worker(worker)
+                return "Error: Execution cancelled."
+            except (EOFError, BrokenPipeError, OSError):
+                self._replace_worker(worker)
+                return (
+                    "Error executing code: the sandbox worker exited unexpectedly and session variables were lost. "
+                    "Simplify the code and try again."
+                )
+
+    def invalidate_cache(self, session: str) -> None:
+        """Drop a session's cached results before its next snippet (e.g. after a re-download)."""
+        with self._lock:
+            self._stale_sessions.add(session)
+
+    def cache_stats(self) -> dict:
+        """Cache hits, misses, uncacheable snippets and execution seconds saved, summed over workers."""
+        totals = {"hits": 0, "misses": 0, "uncacheable": 0, "saved_seconds": 0.0}
+        for worker in list(self._workers):
+            with worker.lock:
+                try:
+                    stats = worker.run({"op": "stats"})
+                except (EOFError, BrokenPipeError, OSError):
+                    continue
+            for name, value in stats.items():
+                totals[name] += value
+        return totals
+
+    def close_session(self, session: str) -> None:
+        """Release a session's kernel state (e.g. when its data directory is removed)."""
+        with self._lock:
+            worker = self._sessions.pop(session, None)
+            self._stale_sessions.discard(session)
+            if worker is not None:
+                worker.sessions.discard(session)
+        if worker is None:
+            return
+        with worker.lock:
+            try:
+                worker.run({"op": "reset", "session": session})
+            except (EOFError, BrokenPipeError, OSError):
+                self._replace_worker(worker)
+
+    def shutdown(self) -> None:
+        """Stop all workers."""
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._sessions.clear()
+        for worker in workers:
+            worker.close()
+
+
+_sandbox_pool: SandboxPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Get or create the process-wide sandbox pool."""
+    global _sandbox_pool
+    with _pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool()
+            atexit.register(_shutdown_pool)
+    return _sandbox_pool
+
+
+def release_sandbox_session(session: str) -> None:
+    """Drop a session's kernel state and unlink its shared frames."""
+    if _sandbox_pool is not None:
+        _sandbox_pool.close_session(session)
+    get_shared_frames().release(session)
+
+
+def invalidate_sandbox_cache(session: str) -> None:
+    """Mark a session's cached results stale if the pool has been started."""
+    if _sandbox_pool is not None:
+        _sandbox_pool.invalidate_cache(session)
+
+
+def _shutdown_pool():
+    """Shutdown the pool on exit."""
+    global _sandbox_pool
+    if _sandbox_pool is not None:
+        _sandbox_pool.shutdown()
+        _sandbox_pool = None
@@ -0,0 +1,94 @@
+"""Compact structured results returned by sandbox snippets.
+
+`emit(value, name)` hands a table, series, array, dict or scalar back to the
+agent without printing it. Values are rendered as CSV / JSON rounded to a few
+significant digits, which costs far fewer tokens than pandas' padded print
+layout, and large values are cut to their first and last rows.
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+MAX_ROWS = 40
+MAX_ITEMS = 100
+SIGNIFICANT_DIGITS = 6
+
+
+def _round(value):
+    if isinstance(value, (float, np.floating)):
+        if not math.isfinite(value):
+            return str(value)
+        return float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value))
+    return value
+
+
+def _clip_rows(frame: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """First and last rows of a long frame, and how many were left out."""
+    if len(frame) <= MAX_ROWS:
+        return frame, 0
+    half = MAX_ROWS // 2
+    return pd.concat([frame.head(half), frame.tail(half)]), len(frame) - MAX_ROWS
+
+
+def _table_text(frame: pd.DataFrame) -> tuple[str, int]:
+    clipped, omitted = _clip_rows(frame)
+    text = clipped.to_csv(float_format=f"%.{SIGNIFICANT_DIGITS}g", lineterminator="\n").rstrip("\n")
+    return text, omitted
+
+
+def encode_result(value, name: str | None = None) -> dict:
+    """Render a value for the agent.
+
+    Returns:
+        Dict with name, kind, shape and text (the compact rendering)
+    """
+    omitted = 0
+    if isinstance(value, pd.DataFrame):
+        kind, shape = "table", list(value.shape)
+        text, omitted = _table_text(value)
+    elif isinstance(value, pd.Series):
+        kind, shape = "series", [len(value)]
+        text, omitted = _table_text(value.to_frame(value.name if value.name is not None else "value"))
+    elif isinstance(value, np.ndarray):
+        kind, shape = "array", list(value.shape)
+        flat = value.ravel()
+        if value.ndim == 2 and len(value) <= MAX_ROWS:
+            text = json.dumps([[_round(v) for v in row] for row in value.tolist()])
+        else:
+            omitted = max(0, flat.size - MAX_ITEMS)
+            text = json.dumps([_round(v) for v in flat[:MAX_ITEMS].tolist()])
+    elif isinstance(value, dict):
+        kind, shape = "dict", [len(value)]
+        items = list(value.items())
+        omitted = max(0, len(items) - MAX_ITEMS)
+        text = json.dumps({str(k): _round(v) for k, v in items[:MAX_ITEMS]}, default=str)
+    elif isinstance(value, (list, tuple)):
+        kind, shape = "list", [len(value)]
+        omitted = max(0, len(value) - MAX_ITEMS)
+        text = json.dumps([_round(v) for v in value[:MAX_ITEMS]], default=str)
+    else:
+        kind, shape = "value", []
+        text = json.dumps(_round(value), default=str)
+
+    if omitted:
+        text += f"\n... ({omitted} more omitted)"
+    return {"name": name, "kind": kind, "shape": shape, "text": text}
+
+
+def format_results(results: list[dict]) -> str:
+    """Tool-output section listing emitted results."""
+    blocks = []
+    for index, result in enumerate(results, 1):
+        label = result["name"] or f"result_{index}"
+        shape = "x".join(str(n) for n in result["shape"])
+        blocks.append(f"[{label}] {result['kind']}{f' {shape}' if shape else ''}\n{result['text']}")
+    return "Results:\n" + "\n\n".join(blocks)
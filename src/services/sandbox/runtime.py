@@ -0,0 +1,287 @@
+"""Restricted execution namespace for quant sandbox snippets.
+
+This module is imported by every sandbox worker process, so the heavy
+libraries below are loaded once when a worker starts, not per snippet.
+"""
+
+from pathlib import Path
+from typing import Callable
+import builtins
+import io
+import math
+import sys
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+import talib
+
+from src.services.sandbox import backtest as backtest_lib
+from src.services.sandbox import sweep as sweep_lib
+from src.services.sandbox.results import encode_result, format_results
+from src.services.sandbox.shared_frames import AttachedFrames
+from src.services.sandbox.validator import ALLOWED_MODULES, BLOCKED_NAMES, compile_snippet, is_blocked_attribute
+
+BLOCKED_BUILTINS = {
+    'eval',
+    'exec',
+    'compile',
+    'open',
+    'input',
+    'breakpoint',
+}
+
+
+def _create_safe_open(allowed_dir: Path):
+    """Create a safe open function that only allows reading from allowed directory."""
+    def safe_open(filepath: str, mode: str = 'r', *args, **kwargs):
+        if 'w' in mode or 'a' in mode or 'x' in mode or '+' in mode:
+            raise PermissionError("Write operations are not allowed. Only reading is permitted.")
+
+        resolved_path = Path(filepath).resolve()
+        allowed_resolved = allowed_dir.resolve()
+
+        try:
+            resolved_path.relative_to(allowed_resolved)
+        except ValueError:
+            raise PermissionError(
+                f"Access denied. Only files in {allowed_dir} can be read. "
+                f"Attempted to access: {filepath}"
+            )
+
+        if not str(resolved_path).endswith('.csv'):
+            raise PermissionError("Only .csv files can be read.")
+
+        return open(resolved_path, mode, *args, **kwargs)
+
+    return safe_open
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ for snippet code: only allow-listed modules.
+
+    Library internals (pandas, numpy, talib) import through their own module
+    globals and are not affected.
+    """
+    parts = name.split('.')
+    if level or parts[0] not in ALLOWED_MODULES or any(is_blocked_attribute(part) for part in parts[1:]):
+        raise ImportError(f"Import of '{name}' is not allowed in the sandbox.")
+    for attr in fromlist or ():
+        if is_blocked_attribute(attr):
+            raise ImportError(f"Import of '{attr}' from '{name}' is not allowed in the sandbox.")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def _create_safe_builtins():
+    """Create a restricted builtins dictionary."""
+    safe_builtins = {}
+
+    for name in dir(builtins):
+        # Names the validator rejects are left out too, should a snippet reach them anyway
+        if name not in BLOCKED_BUILTINS and name not in BLOCKED_NAMES and not name.startswith('_'):
+            safe_builtins[name] = getattr(builtins, name)
+
+    safe_builtins['True'] = True
+    safe_builtins['False'] = False
+    safe_builtins['None'] = None
+
+    # Snippets may import allow-listed modules; everything else is rejected
+    # statically by the validator and again here at runtime
+    safe_builtins['__import__'] = _safe_import
+
+    return safe_builtins
+
+
+# Built once per worker process and shared by every namespace; snippets
+# cannot reach it because `__builtins__` is rejected by the validator
+SAFE_BUILTINS = _create_safe_builtins()
+
+
+def _create_safe_read_csv(data_dir: Path, shared_frames: AttachedFrames | None = None):
+    """Create a read_csv restricted to the session data directory.
+
+    Files published to shared memory by download_market_data are served from
+    there when no read options are given, skipping the CSV parse.
+    """
+    def safe_read_csv(filepath, **kwargs):
+        """Read CSV file from the session data directory.
+
+        Automatically parses the Date column as datetime and sets it as index.
+        """
+        resolved = Path(filepath)
+        if not resolved.is_absolute():
+            resolved = data_dir / filepath
+
+        try:
+            relative = resolved.resolve().relative_to(data_dir.resolve())
+        except ValueError:
+            raise PermissionError(f"Access denied. Only files in {data_dir} can be read.")
+
+        if shared_frames is not None and not kwargs:
+            df = shared_frames.frame(str(relative))
+            if df is not None:
+                return df
+
+        return read_market_csv(resolved, **kwargs)
+
+    return safe_read_csv
+
+
+def read_market_csv(filepath, **kwargs) -> pd.DataFrame:
+    """Parse a market data CSV the way read_csv() serves it to snippets."""
+    # Set smart defaults for market data CSVs
+    # Use first column as index (which is numeric), but also parse Date column
+    if 'index_col' not in kwargs:
+        kwargs['index_col'] = 0
+
+    df = pd.read_csv(filepath, **kwargs)
+
+    # Auto-convert Date column to datetime if it exists
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'])
+
+    return df
+
+
+class OutputCapture(io.StringIO):
+    """stdout replacement that also forwards complete lines while a snippet runs.
+
+    Lines are batched: at most one "output" event per `interval` seconds.
+    """
+
+    def __init__(self, on_event: Callable[[str, object], None] | None = None, interval: float = 0.25):
+        super().__init__()
+        self.on_event = on_event
+        self.interval = interval
+        self.results: list[dict] = []
+        self._pending: list[str] = []
+        self._last_sent = 0.0
+
+    def write(self, text: str) -> int:
+        written = super().write(text)
+        if self.on_event is not None and text:
+            self._pending.append(text)
+            if "\n" in text and time.monotonic() - self._last_sent >= self.interval:
+                self.send_pending()
+        return written
+
+    def send_pending(self) -> None:
+        """Forward buffered complete lines (a trailing partial line waits)."""
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        cut = text.rfind("\n") + 1
+        self._pending = [text[cut:]] if cut < len(text) else []
+        if cut:
+            self.on_event("output", text[:cut])
+        self._last_sent = time.monotonic()
+
+    def finish(self) -> None:
+        """Forward whatever is still buffered, including a partial last line."""
+        if self.on_event is not None and self._pending:
+            self.on_event("output", "".join(self._pending))
+            self._pending = []
+
+    def add_result(self, value, name: str | None) -> None:
+        result = encode_result(value, name)
+        self.results.append(result)
+        if self.on_event is not None:
+            self.send_pending()
+            self.on_event("result", result)
+
+
+def _emit(value, name: str | None = None) -> None:
+    """Return a table, series, array, dict or scalar to the agent in compact form.
+
+    Use instead of print() for structured results, e.g. emit(stats_df, "stats").
+    """
+    if not isinstance(sys.stdout, OutputCapture):
+        print(value)
+        return
+    sys.stdout.add_result(value, name)
+
+
+def build_sandbox_globals(data_dir: Path, shared_frames: AttachedFrames | None = None) -> dict:
+    """Build the globals a snippet runs with (libraries, safe I/O, DATA_DIR)."""
+    safe_globals = {
+        '__builtins__': SAFE_BUILTINS,
+        '__name__': '__sandbox__',
+    }
+
+    safe_globals['pd'] = pd
+    safe_globals['pandas'] = pd
+    safe_globals['np'] = np
+    safe_globals['numpy'] = np
+    safe_globals['math'] = math
+    safe_globals['talib'] = talib
+
+    safe_globals['backtest'] = backtest_lib.backtest
+    safe_globals['crossover'] = backtest_lib.crossover
+    safe_globals['crossunder'] = backtest_lib.crossunder
+    safe_globals['positions_from_events'] = backtest_lib.positions_from_events
+    safe_globals['sweep'] = sweep_lib.sweep
+    safe_globals['parameter_grid'] = sweep_lib.parameter_grid
+
+    safe_globals['open'] = _create_safe_open(data_dir)
+    safe_globals['read_csv'] = _create_safe_read_csv(data_dir, shared_frames)
+    safe_globals['emit'] = _emit
+    safe_globals['DATA_DIR'] = str(data_dir)
+
+    return safe_globals
+
+
+def execute_code(code: str, data_dir: Path, namespace: dict | None = None,
+                 on_event: Callable[[str, object], None] | None = None) -> str:
+    """Execute Python code in the restricted namespace and return its captured output.
+
+    Output is captured by swapping sys.stdout/sys.stderr, which is only safe
+    because each sandbox worker process runs one snippet at a time.
+
+    Args:
+        code: Python code to execute
+        data_dir: Directory where data files are stored (session-specific)
+        namespace: Persistent namespace to run in (see kernel.SessionKernels);
+            a fresh one is built when omitted
+        on_event: Called with ("output", text) as lines are printed and
+            ("result", dict) for each emit() while the snippet runs
+    """
+
+    old_stdout = sys.stdout
+    old_stderr = sys.stderr
+    capture = OutputCapture(on_event)
+    sys.stdout = capture
+    sys.stderr = io.StringIO()
+
+    try:
+        if namespace is None:
+            namespace = build_sandbox_globals(Path(data_dir))
+
+        # A single dict for globals and locals so functions defined in the
+        # snippet can see its top-level variables, and state can persist
+        exec(compile_snippet(code), namespace)
+        capture.finish()
+
+        stdout_output = capture.getvalue()
+        stderr_output = sys.stderr.getvalue()
+
+        output = ""
+        if stdout_output:
+            output += stdout_output
+        if capture.results:
+            output += ("\n" if output else "") + format_results(capture.results)
+        if stderr_output:
+            output += f"\nStderr:\n{stderr_output}"
+
+        if not output.strip():
+            output = "Code executed successfully (no output)."
+
+        return output
+
+    except Exception as e:
+        error_msg = f"Error executing code:\n{traceback.format_exc()}"
+        return error_msg
+
+    finally:
+        sys.stdout = old_stdout
+        sys.stderr = old_stderr
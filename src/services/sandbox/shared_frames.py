@@ -0,0 +1,205 @@
+"""Shared-memory handoff of downloaded frames to sandbox workers.
+
+download_market_data publishes each frame, as parsed back from the CSV it
+wrote, into one shared memory segment (columns laid out back to back) and
+records its layout in a registry keyed by session and file name. Workers receive the layouts with each request and
+attach to the segment instead of re-parsing the CSV; the segments are
+unlinked when the task releases the session.
+"""
+
+from dataclasses import asdict, dataclass
+from multiprocessing import shared_memory
+import atexit
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Without Copy-on-Write, frames handed to snippets must not share the
+# read-only segment, so they get a (fast) memcpy instead of a view
+ZERO_COPY = int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+# Resolution read_csv parses dates to (us on pandas 3, ns before), so shared
+# frames match what the CSV fallback would return
+DATETIME_UNIT = np.datetime_data(pd.to_datetime(pd.Series(["2000-01-01 00:00:00"])).dtype)[0]
+
+
+@dataclass
+class SharedColumn:
+    name: str
+    dtype: str
+    offset: int
+    is_datetime: bool = False
+    tz: str | None = None
+
+
+@dataclass
+class SharedFrameLayout:
+    """Where a published frame lives and how to rebuild it."""
+    shm_name: str
+    nrows: int
+    columns: list[SharedColumn]
+    index: SharedColumn
+    index_name: str | None = None
+    index_range: tuple[int, int] | None = None  # (start, step) of a RangeIndex
+
+
+def _column_array(series: pd.Series) -> tuple[np.ndarray, bool, str | None] | None:
+    """Fixed-width array for a column (datetimes as naive UTC), or None if not shareable."""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        utc = series.dt.tz_convert("UTC").dt.tz_localize(None)
+        return utc.to_numpy(f"datetime64[{DATETIME_UNIT}]"), True, str(series.dt.tz)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(f"datetime64[{DATETIME_UNIT}]"), True, None
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.to_numpy(), False, None
+    return None
+
+
+class SharedFrameRegistry:
+    """Parent-side owner of published segments."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames: dict[str, dict[str, tuple[SharedFrameLayout, shared_memory.SharedMemory]]] = {}
+
+    def publish(self, session: str, filename: str, df: pd.DataFrame) -> SharedFrameLayout | None:
+        """Copy a frame into a new segment; returns None if a column cannot be shared."""
+        arrays = []
+        for name, series in [("__index__", df.index.to_series()), *df.items()]:
+            converted = _column_array(series)
+            if converted is None:
+                return None
+            arrays.append((str(name), *converted))
+
+        size = max(1, sum(array.nbytes for _, array, _, _ in arrays))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        columns, offset = [], 0
+        for name, array, is_datetime, tz in arrays:
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=offset)
+            target[:] = array
+            columns.append(SharedColumn(name, array.dtype.str, offset, is_datetime, tz))
+            offset += array.nbytes
+        index_range = (df.index.start, df.index.step) if isinstance(df.index, pd.RangeIndex) else None
+        layout = SharedFrameLayout(shm.name, len(df), columns[1:], columns[0], df.index.name, index_range)
+
+        with self._lock:
+            previous = self._frames.setdefault(session, {}).pop(filename, None)
+            self._frames[session][filename] = (layout, shm)
+        if previous is not None:
+            _unlink(previous[1])
+        return layout
+
+    def layouts(self, session: str) -> dict[str, dict]:
+        """Picklable layouts of a session's frames, sent to the worker with each request."""
+        with self._lock:
+            return {filename: asdict(layout) for filename, (layout, _) in self._frames.get(session, {}).items()}
+
+    def release(self, session: str) -> None:
+        """Unlink every segment of a session."""
+        with self._lock:
+            frames = self._frames.pop(session, {})
+        for _, shm in frames.values():
+            _unlink(shm)
+
+    def release_all(self) -> None:
+        """Unlink every segment (on exit)."""
+        with self._lock:
+            sessions = list(self._frames)
+        for session in sessions:
+            self.release(session)
+
+
+def _unlink(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# Global registry of frames published by this process
+_registry: SharedFrameRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_shared_frames() -> SharedFrameRegistry:
+    """Get or create the process-wide shared frame registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SharedFrameRegistry()
+            atexit.register(_registry.release_all)
+    return _registry
+
+
+class AttachedFrames:
+    """Worker-side view of a session's published frames."""
+
+    def __init__(self):
+        self.layouts: dict[str, dict] = {}
+        self._attached: dict[str, tuple[shared_memory.SharedMemory, pd.DataFrame]] = {}
+
+    def update(self, layouts: dict[str, dict]) -> None:
+        """Adopt the latest layouts; segments no longer listed are detached."""
+        self.layouts = layouts
+        live = {layout["shm_name"] for layout in layouts.values()}
+        for shm_name in [name for name in self._attached if name not in live]:
+            self._detach(shm_name)
+
+    def frame(self, filename: str) -> pd.DataFrame | None:
+        """The published frame for a file name, or None if it was not published."""
+        layout = self.layouts.get(filename)
+        if layout is None:
+            return None
+        if layout["shm_name"] not in self._attached:
+            try:
+                self._attached[layout["shm_name"]] = _attach(layout)
+            except FileNotFoundError:
+                return None
+        base = self._attached[layout["shm_name"]][1]
+        return base.copy(deep=not ZERO_COPY)
+
+    def _detach(self, shm_name: str) -> None:
+        shm, _ = self._attached.pop(shm_name)
+        try:
+            shm.close()
+        except BufferError:
+            # Snippet variables still view the segment; the mapping lives until they are gone
+            pass
+
+    def close(self) -> None:
+        """Detach from every segment."""
+        for shm_name in list(self._attached):
+            self._detach(shm_name)
+        self.layouts = {}
+
+
+def _rebuild(shm: shared_memory.SharedMemory, column: dict, nrows: int):
+    array = np.ndarray((nrows,), dtype=np.dtype(column["dtype"]), buffer=shm.buf, offset=column["offset"])
+    array.flags.writeable = False
+    return array
+
+
+def _attach(layout: dict) -> tuple[shared_memory.SharedMemory, pd.DataFrame]:
+    """Map a segment and wrap its columns without copying."""
+    shm = shared_memory.SharedMemory(name=layout["shm_name"])
+    nrows = layout["nrows"]
+    columns = {column["name"]: _column(shm, column, nrows) for column in layout["columns"]}
+    if layout["index_range"] is not None:
+        start, step = layout["index_range"]
+        index = pd.RangeIndex(start, start + nrows * step, step, name=layout["index_name"])
+    else:
+        index = pd.Index(_column(shm, layout["index"], nrows), name=layout["index_name"])
+    return shm, pd.DataFrame(columns, index=index, copy=False)
+
+
+def _column(shm: shared_memory.SharedMemory, column: dict, nrows: int):
+    array = _rebuild(shm, column, nrows)
+    if not column["is_datetime"]:
+        return array
+    values = pd.DatetimeIndex(array)
+    return values.tz_localize("UTC").tz_convert(column["tz"]) if column["tz"] else values
@@ -0,0 +1,133 @@
+"""Parameter sweeps over strategy grids in the quant sandbox.
+
+A sweep calls the strategy once per parameter combination to get its signals,
+screens every distinct signal set in one matrix pass (no stops, costs charged
+on turnover), prunes the weak ones and runs the full `backtest` only for the
+survivors. Combinations that differ only in stop/target settings share a
+signal set, so they are screened once.
+"""
+
+from itertools import product
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.services.sandbox.backtest import _periods_per_year, backtest
+
+SCREEN_METRICS = {"annualized_sharpe", "total_return"}
+
+
+def parameter_grid(grid: dict[str, list]) -> list[dict]:
+    """Expand {"fast": [5, 10], "slow": [50, 100]} into a list of parameter dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def _screen(close: np.ndarray, targets: np.ndarray, spread: float, commission: float,
+            periods_per_year: float) -> pd.DataFrame:
+    """Score many target-position vectors at once (bars x strategies)."""
+    positions = np.vstack([np.zeros((1, targets.shape[1])), targets[:-1]])
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    bar_returns = np.nan_to_num((close - prev_close) / prev_close)
+
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    per_side_cost = np.nan_to_num(spread / 2 / prev_close + commission)
+    net = positions * bar_returns[:, None] - turnover * per_side_cost[:, None]
+
+    std = net.std(axis=0, ddof=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(std > 0, net.mean(axis=0) / std * np.sqrt(periods_per_year), 0.0)
+    previous = np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]])
+    return pd.DataFrame({
+        "annualized_sharpe": sharpe,
+        "total_return": np.prod(1 + net, axis=0) - 1,
+        "num_trades": ((positions != 0) & (positions != previous)).sum(axis=0),
+    })
+
+
+def sweep(
+    df: pd.DataFrame,
+    strategy: Callable[..., object],
+    grid: dict[str, list],
+    metric: str = "annualized_sharpe",
+    constraint: Callable[..., bool] | None = None,
+    min_trades: int = 5,
+    keep_fraction: float = 0.25,
+    min_keep: int = 10,
+    spread: float = 0.0,
+    commission: float = 0.0,
+    max_combinations: int = 5000,
+) -> pd.DataFrame:
+    """Evaluate a strategy over a parameter grid and rank the results.
+
+    Args:
+        df: OHLC frame shared by every combination
+        strategy: strategy(df, **params) returning signals, or a dict with
+            "signals" and optional "stop_loss"/"take_profit" for backtest()
+        grid: Parameter name -> list of values
+        metric: Stats key to rank by (higher is better)
+        constraint: Optional constraint(**params) -> bool to skip combinations (e.g. fast < slow)
+        min_trades: Signal sets with fewer screened trades are pruned
+        keep_fraction: Share of distinct signal sets kept after screening
+        min_keep: Always keep at least this many signal sets
+        spread: Passed to backtest()
+        commission: Passed to backtest()
+        max_combinations: Refuse larger grids
+
+    Returns:
+        DataFrame with one row per fully backtested combination (parameters + stats),
+        best first. `result.attrs` holds evaluated/pruned/skipped counts.
+    """
+    combos = parameter_grid(grid)
+    if len(combos) > max_combinations:
+        raise ValueError(f"Grid has {len(combos)} combinations; the limit is {max_combinations}. Narrow the grid.")
+    if constraint is not None:
+        kept = [params for params in combos if constraint(**params)]
+        skipped, combos = len(combos) - len(kept), kept
+    else:
+        skipped = 0
+    if not combos:
+        return pd.DataFrame()
+
+    # Strategy outputs, grouped by identical signal vectors
+    runs, signal_keys, signal_sets = [], {}, []
+    for params in combos:
+        out = strategy(df, **params)
+        spec = dict(out) if isinstance(out, dict) else {"signals": out}
+        target = pd.Series(np.asarray(spec["signals"], dtype=float), index=df.index).ffill().fillna(0.0).to_numpy()
+        key = target.tobytes()
+        if key not in signal_keys:
+            signal_keys[key] = len(signal_sets)
+            signal_sets.append(target)
+        runs.append((params, spec, signal_keys[key]))
+
+    times = df["Date"] if "Date" in df else pd.Series(df.index, index=df.index)
+    screen = _screen(df["Close"].to_numpy(dtype=float), np.column_stack(signal_sets), spread, commission,
+                     _periods_per_year(times))
+    screen_metric = metric if metric in SCREEN_METRICS else "annualized_sharpe"
+    eligible = screen[screen["num_trades"] >= min_trades]
+    n_keep = max(min_keep, int(np.ceil(len(screen) * keep_fraction)))
+    survivors = set(eligible.sort_values(screen_metric, ascending=False).index[:n_keep])
+
+    rows = []
+    for params, spec, signal_id in runs:
+        if signal_id not in survivors:
+            continue
+        result = backtest(
+            df, spec["signals"], spread=spread, commission=commission,
+            stop_loss=spec.get("stop_loss"), take_profit=spec.get("take_profit"),
+        )
+        rows.append({**params, **result.stats})
+
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table = table.sort_values(metric, ascending=False).reset_index(drop=True)
+    table.attrs.update({
+        "combinations": len(runs) + skipped,
+        "skipped_by_constraint": skipped,
+        "distinct_signal_sets": len(signal_sets),
+        "pruned": len(runs) - len(rows),
+        "backtested": len(rows),
+    })
+    return table
@@ -0,0 +1,122 @@
+"""Static validation of sandbox snippets.
+
+Snippets are parsed once and walked with an allow-list: imports must name an
+allowed module, dunder and private attributes and a few introspection
+builtins are rejected. Unlike the old substring scan this only looks at real
+code, so a string or column name such as "requests." no longer trips it.
+
+Attribute names are also looked up from strings by some library helpers
+(format fields, annotations evaluated by typing, pandas eval), so string
+constants naming a dunder are rejected too, and the helpers that evaluate
+runtime-built strings are blocked as attributes.
+"""
+
+from functools import lru_cache
+import ast
+import re
+
+ALLOWED_MODULES = {
+    "math", "cmath", "statistics", "decimal", "fractions", "random",
+    "numpy", "pandas", "talib",
+    "itertools", "functools", "collections", "copy",
+    "datetime", "calendar", "re", "string", "json", "typing", "dataclasses", "warnings",
+}
+
+BLOCKED_NAMES = {
+    "__import__", "__builtins__", "__loader__", "__spec__",
+    "eval", "exec", "compile", "globals", "locals", "vars",
+    "getattr", "setattr", "delattr", "breakpoint", "input", "memoryview",
+}
+
+# Attributes (and names imported from allowed modules) that reach the OS,
+# unpickle data or evaluate strings even through allowed modules
+BLOCKED_ATTRIBUTES = {
+    "os", "sys", "subprocess", "builtins", "system", "popen",
+    "read_pickle", "to_pickle", "load_library",
+    "inspect", "importlib", "import_module", "ctypes", "ctypeslib", "f2py", "distutils",
+    "CodeType", "FunctionType", "LambdaType",
+    "get_type_hints", "ForwardRef", "Formatter", "get_field",
+    "eval", "query", "style", "Styler",
+}
+
+# Private attributes are blocked (e.g. random._os), except namedtuple's API
+ALLOWED_PRIVATE_ATTRIBUTES = {"_asdict", "_replace", "_fields", "_field_defaults", "_make"}
+
+# Keyword arguments that turn a loader into an unpickler (np.load)
+BLOCKED_KEYWORDS = {"allow_pickle"}
+
+DUNDER_PATTERN = re.compile(r"__\w+__")
+
+
+class SandboxValidationError(ValueError):
+    """Raised when a snippet uses a construct the sandbox does not allow."""
+
+
+def is_blocked_attribute(name: str) -> bool:
+    """Whether snippets may not access (or import) this attribute name."""
+    if name.startswith("_"):
+        return name not in ALLOWED_PRIVATE_ATTRIBUTES
+    return name in BLOCKED_ATTRIBUTES
+
+
+def _check_module(name: str | None, lineno: int) -> None:
+    parts = (name or "").split(".")
+    if parts[0] not in ALLOWED_MODULES:
+        raise SandboxValidationError(
+            f"line {lineno}: import of '{name}' is not allowed. "
+            f"Allowed modules: {', '.join(sorted(ALLOWED_MODULES))}."
+        )
+    if any(is_blocked_attribute(part) for part in parts[1:]):
+        raise SandboxValidationError(f"line {lineno}: import of '{name}' is not allowed.")
+
+
+def _check_node(node: ast.AST) -> None:
+    lineno = getattr(node, "lineno", "?")
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            _check_module(alias.name, lineno)
+    elif isinstance(node, ast.ImportFrom):
+        if node.level:
+            raise SandboxValidationError(f"line {lineno}: relative imports are not allowed.")
+        _check_module(node.module, lineno)
+        for alias in node.names:
+            if is_blocked_attribute(alias.name):
+                raise SandboxValidationError(f"line {lineno}: importing '{alias.name}' is not allowed.")
+    elif isinstance(node, ast.Name) and node.id in BLOCKED_NAMES:
+        raise SandboxValidationError(f"line {lineno}: '{node.id}' is not allowed.")
+    elif isinstance(node, ast.Attribute):
+        if node.attr.startswith("__") and node.attr.endswith("__"):
+            raise SandboxValidationError(f"line {lineno}: dunder attribute '{node.attr}' is not allowed.")
+        if is_blocked_attribute(node.attr):
+            raise SandboxValidationError(f"line {lineno}: attribute '{node.attr}' is not allowed.")
+    elif isinstance(node, ast.keyword) and node.arg in BLOCKED_KEYWORDS:
+        raise SandboxValidationError(f"line {lineno}: argument '{node.arg}' is not allowed.")
+    elif isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value != "__main__":
+        if DUNDER_PATTERN.search(node.value):
+            raise SandboxValidationError(f"line {lineno}: strings naming dunder attributes are not allowed.")
+    elif isinstance(node, (ast.Global, ast.Nonlocal)) and "__builtins__" in node.names:
+        raise SandboxValidationError(f"line {lineno}: '__builtins__' is not allowed.")
+
+
+@lru_cache(maxsize=512)
+def validate_code(code: str) -> str | None:
+    """Return an error message if the snippet is not allowed, else None.
+
+    Syntax errors are left to execution so the agent sees the usual traceback.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    try:
+        for node in ast.walk(tree):
+            _check_node(node)
+    except SandboxValidationError as e:
+        return str(e)
+    return None
+
+
+@lru_cache(maxsize=256)
+def compile_snippet(code: str):
+    """Compile a snippet once; repeated snippets reuse the code object."""
+    return compile(code, "<sandbox>", "exec")
@@ -0,0 +1,188 @@
+"""Admission control for subagent tasks.
+
+Every `task` tool call waits here for a slot before it starts. A task runs
+when both the process-wide limit and its conversation's limit (the context's
+max_concurrent_tasks) allow it. Waiting tasks are served round-robin across
+conversations so one user's fan-out cannot starve the others; within a
+conversation chart tasks go before quantitative ones (they are short and
+unblock the orchestrator sooner).
+
+Conversations run on different event loops (Streamlit runs every query in
+its own), so the state is guarded by a thread lock and waiters are woken on
+their own loop.
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from src.config.settings import TASK_MAX_CONCURRENT
+
+# Lower runs first within a conversation
+TASK_PRIORITIES = {"chart": 0, "quantitative": 1}
+
+# Queue waits kept per task type for the metrics
+WAIT_SAMPLES = 1000
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    conversation: str = field(compare=False)
+    task_type: str = field(compare=False)
+    limit: int = field(compare=False)
+    loop: asyncio.AbstractEventLoop = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+
+
+class TaskScheduler:
+    """Process-wide and per-conversation concurrency limits for subagent tasks."""
+
+    def __init__(self, max_concurrent: int = TASK_MAX_CONCURRENT):
+        self.max_concurrent = max(1, max_concurrent)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_by_conversation: dict[str, int] = {}
+        self._queues: dict[str, list[_Waiter]] = {}
+        self._turns: deque[str] = deque()  # conversations with waiting tasks, next to serve first
+        self._waits: dict[str, deque[float]] = {}
+
+    @asynccontextmanager
+    async def slot(self, conversation: str, task_type: str, max_per_conversation: int):
+        """Hold a slot for the duration of a task; yields the seconds spent queued."""
+        queued = await self.acquire(conversation, task_type, max_per_conversation)
+        try:
+            yield queued
+        finally:
+            self.release(conversation)
+
+    async def acquire(self, conversation: str, task_type: str, max_per_conversation: int) -> float:
+        """Wait for a slot; returns the seconds spent queued."""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(
+            priority=TASK_PRIORITIES.get(task_type, len(TASK_PRIORITIES)),
+            seq=next(self._seq),
+            conversation=conversation,
+            task_type=task_type,
+            limit=max(1, max_per_conversation),
+            loop=loop,
+            future=loop.create_future(),
+            enqueued=time.monotonic(),
+        )
+        with self._lock:
+            if conversation not in self._queues:
+                self._queues[conversation] = []
+                self._turns.append(conversation)
+            heapq.heappush(self._queues[conversation], waiter)
+            self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(conversation)
+                else:
+                    self._remove(waiter)
+            raise
+        return time.monotonic() - waiter.enqueued
+
+    def release(self, conversation: str) -> None:
+        with self._lock:
+            self._release_locked(conversation)
+
+    def _release_locked(self, conversation: str) -> None:
+        self._running -= 1
+        remaining = self._running_by_conversation.get(conversation, 1) - 1
+        if remaining > 0:
+            self._running_by_conversation[conversation] = remaining
+        else:
+            self._running_by_conversation.pop(conversation, None)
+        self._dispatch()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.conversation)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        heapq.heapify(queue)
+        if not queue:
+            del self._queues[waiter.conversation]
+            self._turns.remove(waiter.conversation)
+
+    def _dispatch(self) -> None:
+        """Start queued tasks while slots are free, one conversation turn at a time."""
+        while self._running < self.max_concurrent and self._turns:
+            for _ in range(len(self._turns)):
+                conversation = self._turns[0]
+                self._turns.rotate(-1)
+                queue = self._queues[conversation]
+                if self._running_by_conversation.get(conversation, 0) < queue[0].limit:
+                    break
+            else:
+                return  # every waiting conversation is at its own limit
+
+            waiter = heapq.heappop(queue)
+            if not queue:
+                del self._queues[conversation]
+                self._turns.remove(conversation)
+            if waiter.future.cancelled():
+                continue
+            try:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            except RuntimeError:
+                # The waiter's event loop is gone; nobody will run this task
+                continue
+            waiter.granted = True
+            self._running += 1
+            self._running_by_conversation[conversation] = self._running_by_conversation.get(conversation, 0) + 1
+            self._waits.setdefault(waiter.task_type, deque(maxlen=WAIT_SAMPLES)).append(
+                time.monotonic() - waiter.enqueued
+            )
+
+    def stats(self) -> dict:
+        """Running and queued counts plus queue-wait seconds per task type."""
+        with self._lock:
+            waits = {}
+            for task_type, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[task_type] = {
+                    "count": len(ordered),
+                    "mean": sum(ordered) / len(ordered),
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max": ordered[-1],
+                }
+            return {
+                "running": self._running,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "conversations": len(set(self._running_by_conversation) | set(self._queues)),
+                "queue_wait_seconds": waits,
+            }
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# Global scheduler shared by all conversations of this process
+_task_scheduler: TaskScheduler | None = None
+_task_scheduler_lock = threading.Lock()
+
+
+def get_task_scheduler() -> TaskScheduler:
+    """Get or create the process-wide task scheduler."""
+    global _task_scheduler
+    with _task_scheduler_lock:
+        if _task_scheduler is None:
+            _task_scheduler = TaskScheduler()
+    return _task_scheduler
@@ -1,6 +1,7 @@
 from src.utils.twelve_data import TwelveData, AssetType
 from src.utils.yfinance_data import YFinanceData
 from src.utils.charts import TechnicalCharts
+from src.utils.chart_spec import ANALYSIS_INDICATORS
 from typing import Literal
 import pandas as pd
 
@@ -83,34 +84,48 @@ class TechnicalIndicatorService:
             pivot_levels: dict = None,
             fibonacci_levels: dict = None,
             ) -> str:
-        chart_name = f"{self.symbol}_{self.interval}_{analysis_type}"
+        return self.prepare_charts(
+            df=df,
+            size=size,
+            analysis_types=[analysis_type],
+            pivot_levels=pivot_levels,
+            fibonacci_levels=fibonacci_levels,
+        )[analysis_type]
+
+    def prepare_charts(
+            self,
+            df: pd.DataFrame,
+            size: int,
+            analysis_types: list[Literal["ema", "rsi", "macd", "atr", "bb", "pivot", "fibonacci", "none"]],
+            pivot_levels: dict = None,
+            fibonacci_levels: dict = None,
+            ) -> dict[str, str]:
+        """Render charts for several analysis types of one frame in a single pass.
+
+        The frame is trimmed once and charts with the same panel layout share one
+        figure, candlestick base and axis formatting, so rendering "ema", "bb" and
+        "pivot" together costs little more than rendering one of them.
+
+        Returns:
+            Mapping of analysis type to base64-encoded PNG.
+        """
+        for analysis_type in analysis_types:
+            if analysis_type not in ANALYSIS_INDICATORS:
+                raise ValueError("Invalid analysis type. Choose 'ema', 'rsi', 'macd', 'atr', 'bb', 'pivot', 'fibonacci' or 'none'.")
+
         chart = TechnicalCharts(
             symbol=self.symbol,
             interval=self.interval,
             df=df,
             size=size,
-            chart_name=chart_name
+            chart_name=f"{self.symbol}_{self.interval}"
         )
-        if analysis_type == "ema":
-            _, encoded_chart = chart.plot_chart(EMA20=True, EMA50=True, EMA100=True)
-        elif analysis_type == "rsi":
-            _, encoded_chart = chart.plot_chart(RSI14=True)
-        elif analysis_type == "macd":
-            _, encoded_chart = chart.plot_chart(MACD=True)
-        elif analysis_type == "atr":
-            _, encoded_chart = chart.plot_chart(ATR14=True)
-        elif analysis_type == "bb":
-            _, encoded_chart = chart.plot_chart(BB=True)
-        elif analysis_type == "pivot":
-            _, encoded_chart = chart.plot_chart(pivot_levels=pivot_levels)
-        elif analysis_type == "fibonacci":
-            _, encoded_chart = chart.plot_chart(fibonacci_levels=fibonacci_levels)
-        elif analysis_type == "none":
-            _, encoded_chart = chart.plot_chart()
-        else:
-            raise ValueError("Invalid analysis type. Choose 'ema', 'rsi', 'macd', 'atr', 'bb', 'pivot', or 'fibonacci'. or 'normal'.")
-        
-        return encoded_chart
+        results = chart.plot_charts(
+            analysis_types,
+            pivot_levels=pivot_levels,
+            fibonacci_levels=fibonacci_levels,
+        )
+        return {analysis_type: encoded_chart for analysis_type, (_, encoded_chart) in results.items()}
     
     def prepare_extra_context(
             self,
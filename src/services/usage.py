@@ -0,0 +1,160 @@
+"""Token and latency accounting per conversation, agent, tool and task.
+
+Agent middleware records every model call (input / output tokens, latency)
+and tool call (latency) under the conversation's thread_id and, for
+subagents, the orchestrator task they run for. The task tool adds each
+task's queue time and run time. summary() returns the aggregates of a thread
+so iteration limits and model choices can be tuned for cost and latency.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+import threading
+
+# Orchestrator task (its tool_call_id) the current subagent code runs for
+_current_task: ContextVar[str | None] = ContextVar("current_task", default=None)
+
+# Threads kept in memory, least recently updated dropped first
+MAX_THREADS = 256
+
+
+@contextmanager
+def task_scope(task_call_id: str | None):
+    """Attribute usage recorded inside the block to an orchestrator task."""
+    token = _current_task.set(task_call_id)
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+def current_task() -> str | None:
+    return _current_task.get()
+
+
+@dataclass
+class UsageStats:
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    seconds: float = 0.0
+
+    def add(self, input_tokens: int = 0, output_tokens: int = 0, seconds: float = 0.0) -> None:
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.seconds += seconds
+
+
+@dataclass
+class TaskUsage:
+    task_type: str | None = None
+    queue_seconds: float = 0.0
+    seconds: float = 0.0
+    models: dict[str, UsageStats] = field(default_factory=dict)  # agent name -> model calls
+    tools: dict[str, UsageStats] = field(default_factory=dict)  # tool name -> tool calls
+
+
+@dataclass
+class ThreadUsage:
+    models: dict[str, UsageStats] = field(default_factory=dict)
+    tools: dict[str, UsageStats] = field(default_factory=dict)
+    tasks: dict[str, TaskUsage] = field(default_factory=dict)  # task tool_call_id -> usage
+
+
+def _totals(models: dict[str, UsageStats]) -> dict:
+    return {
+        "model_calls": sum(stats.calls for stats in models.values()),
+        "input_tokens": sum(stats.input_tokens for stats in models.values()),
+        "output_tokens": sum(stats.output_tokens for stats in models.values()),
+        "model_seconds": sum(stats.seconds for stats in models.values()),
+    }
+
+
+class UsageTracker:
+    """Thread-safe in-memory aggregates of model and tool usage."""
+
+    def __init__(self, max_threads: int = MAX_THREADS):
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._threads: OrderedDict[str, ThreadUsage] = OrderedDict()
+
+    def _thread(self, thread_id: str) -> ThreadUsage:
+        usage = self._threads.get(thread_id)
+        if usage is None:
+            usage = self._threads[thread_id] = ThreadUsage()
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(thread_id)
+        return usage
+
+    def record_model(self, thread_id: str, agent: str, input_tokens: int, output_tokens: int, seconds: float) -> None:
+        task_call_id = current_task()
+        with self._lock:
+            usage = self._thread(thread_id)
+            usage.models.setdefault(agent, UsageStats()).add(input_tokens, output_tokens, seconds)
+            if task_call_id:
+                task = usage.tasks.setdefault(task_call_id, TaskUsage())
+                task.models.setdefault(agent, UsageStats()).add(input_tokens, output_tokens, seconds)
+
+    def record_tool(self, thread_id: str, tool: str, seconds: float) -> None:
+        task_call_id = current_task()
+        with self._lock:
+            usage = self._thread(thread_id)
+            usage.tools.setdefault(tool, UsageStats()).add(seconds=seconds)
+            if task_call_id:
+                task = usage.tasks.setdefault(task_call_id, TaskUsage())
+                task.tools.setdefault(tool, UsageStats()).add(seconds=seconds)
+
+    def record_task(self, thread_id: str, task_call_id: str, task_type: str, queue_seconds: float, seconds: float) -> None:
+        with self._lock:
+            task = self._thread(thread_id).tasks.setdefault(task_call_id, TaskUsage())
+            task.task_type = task_type
+            task.queue_seconds = queue_seconds
+            task.seconds = seconds
+
+    def task_summary(self, thread_id: str, task_call_id: str) -> dict | None:
+        """Usage of one task: queue / run seconds, totals and per-agent / per-tool stats."""
+        with self._lock:
+            usage = self._threads.get(thread_id)
+            task = usage.tasks.get(task_call_id) if usage else None
+            if task is None:
+                return None
+            return {**asdict(task), **_totals(task.models)}
+
+    def summary(self, thread_id: str) -> dict | None:
+        """Usage of a conversation: totals, per-agent / per-tool stats and per-task usage."""
+        with self._lock:
+            usage = self._threads.get(thread_id)
+            if usage is None:
+                return None
+            return {
+                **_totals(usage.models),
+                "models": {agent: asdict(stats) for agent, stats in usage.models.items()},
+                "tools": {tool: asdict(stats) for tool, stats in usage.tools.items()},
+                "tasks": {task_call_id: {**asdict(task), **_totals(task.models)}
+                          for task_call_id, task in usage.tasks.items()},
+            }
+
+    def clear(self, thread_id: str | None = None) -> None:
+        with self._lock:
+            if thread_id is None:
+                self._threads.clear()
+            else:
+                self._threads.pop(thread_id, None)
+
+
+# Global tracker shared by all conversations of this process
+_usage_tracker: UsageTracker | None = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Get or create the process-wide usage tracker."""
+    global _usage_tracker
+    with _usage_tracker_lock:
+        if _usage_tracker is None:
+            _usage_tracker = UsageTracker()
+    return _usage_tracker
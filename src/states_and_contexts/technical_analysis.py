@@ -28,6 +28,7 @@ class QuantAgentContext:
     max_iterations: int = 10
     session_data_dir: str | None = None  # Session-specific temp directory for data files
     asset_type: AssetType | None = None  # Asset type for market hours filtering
+    task_call_id: str | None = None  # Orchestrator task call this agent runs for (tags streamed events)
 
 # ========================================
 # Chart Agent
@@ -1,23 +1,92 @@
 from langchain.tools import ToolRuntime, tool
-from langchain_core.messages import HumanMessage
-from typing import Literal
+from langchain_core.messages import AIMessage, HumanMessage
+from typing import Callable, Literal
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import asyncio
+import atexit
+import contextvars
 import random
 import shutil
+import time
 from pathlib import Path
 
 from src.agents.chart_agent import chart_analysis_agent, chart_description_agent
 from src.agents.quant_agent import quant_agent
 from src.services.technical.technical_indicator import TechnicalIndicatorService
-from src.prompts.technical_analysis import CHART_DESCRIPTION_USER_PROMPT, CHART_ANALYSIS_USER_PROMPT, TASK_DESCRIPTION
+from src.services.sandbox.pool import release_sandbox_session
+from src.services.response_cache import bar_ttl, get_response_cache, response_key
+from src.services.task_scheduler import TASK_PRIORITIES, get_task_scheduler
+from src.services.usage import get_usage_tracker, task_scope
+from src.services.cancellation import cancel_scope
+from src.prompts.technical_analysis import (CHART_DESCRIPTION_USER_PROMPT, CHART_ANALYSIS_USER_PROMPT,
+                                            CHART_MERGED_USER_PROMPT, TASK_DESCRIPTION)
 from src.utils.constants import get_decimal_places
 from src.utils.llm import parse_langchain_ai_message
 from src.states_and_contexts.technical_analysis import ChartAnalysisInput, QuantAgentContext, ChartAgentContext
-from src.config.settings import BASE_DIR
+from src.config.settings import BASE_DIR, CHART_TASK_MODE
 
 # Base directory for session temp directories
 QUANT_DATA_BASE_DIR = BASE_DIR / "data" / "time_series"
 
 
+_render_executor: ThreadPoolExecutor | None = None
+
+
+def _get_render_executor() -> ThreadPoolExecutor:
+    """Get or create the thread that renders task charts.
+
+    pyplot's figure registry is not thread-safe, so renders are serialized on
+    one thread while data fetches and LLM calls of other tasks run concurrently.
+    """
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+        atexit.register(_render_executor.shutdown, wait=False)
+    return _render_executor
+
+
+@dataclass
+class _ChartBatch:
+    """Chart tasks of one event loop sharing a data fetch and a prepare_charts call."""
+    result: asyncio.Future
+    indicators: set[str] = field(default_factory=set)
+    closed: bool = False  # data fetched; later tasks start a new batch
+
+
+# Open batches by (loop, asset, interval, size, end_date, asset_type)
+_chart_batches: dict[tuple, _ChartBatch] = {}
+
+
+def _text_of(content) -> str:
+    """Text of a message or chunk content (a string or a list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content
+                   if isinstance(block, dict) and block.get("type", "text") == "text")
+
+
+async def astream_agent(agent, inputs: dict, context, on_text: Callable[[str], None] | None = None) -> dict:
+    """Run a subagent like ainvoke, passing the text of its model output to on_text as it streams.
+
+    Returns the agent's final state.
+    """
+    if on_text is None:
+        return await agent.ainvoke(inputs, context=context)
+
+    final_state = None
+    async for mode, chunk in agent.astream(inputs, context=context, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = chunk
+            continue
+        message, metadata = chunk
+        if isinstance(message, AIMessage) and metadata.get("langgraph_node") == "model":
+            text = _text_of(message.content)
+            if text:
+                on_text(text)
+    return final_state
+
+
 class ChartAnalysisTask:
     def __init__(
             self,
@@ -28,8 +97,10 @@ class ChartAnalysisTask:
             # indicator: Literal["ema", "rsi", "macd", "atr", "bb", "pivot", "none"],
             # size: int,
             # end_date: str,
-            context: ChartAgentContext | None = None
+            context: ChartAgentContext | None = None,
+            on_token: Callable[[str, str], None] | None = None
     ):  
+        """on_token(kind, text) receives the subagents' replies as they stream."""
         
         self.task_description = task_description
         self.asset = analysis_input.asset
@@ -38,50 +109,149 @@ class ChartAnalysisTask:
         self.size = analysis_input.size
         self.end_date = analysis_input.end_date
         self.context = context
+        self.on_token = on_token
     
-    def prepare_chart_and_context(self) -> tuple[str, str, float]:  # encoded_chart, extra_context, current_price
-        service = TechnicalIndicatorService(
+    def _service(self) -> TechnicalIndicatorService:
+        return TechnicalIndicatorService(
             symbol=self.asset,
             interval=self.interval,
             timezone="UTC",
             asset_type=self.context.asset_type if self.context else None
         )
-        df = service.prepare_data(
+
+    def _fetch_data(self, service: TechnicalIndicatorService):
+        return service.prepare_data(
             data_source="TwelveData",
             outputsize=self.size,
             end_date=self.end_date
         )
 
+    def _render(self, service: TechnicalIndicatorService, df, indicators: list[str],
+                pivot_levels: dict | None) -> dict[str, tuple[str, str, float]]:
+        """Charts of several indicators of one frame, rendered by one prepare_charts call."""
         decimal_places = get_decimal_places(self.asset)
         current_price = df["Close"].round(decimal_places).iloc[-1]
 
-        pivot_levels = None
+        encoded_charts = service.prepare_charts(
+            df=df,
+            size=self.size,
+            analysis_types=indicators,
+            pivot_levels=pivot_levels
+        )
 
-        if self.indicator == "pivot":
-            pivot_levels = service.get_pivot_levels(end_date=self.end_date)
-            encoded_chart = service.prepare_chart(
-                df=df,
-                size=self.size,
-                analysis_type=self.indicator,
-                pivot_levels=pivot_levels
+        return {
+            indicator: (
+                encoded_charts[indicator],
+                service.prepare_extra_context(
+                    df=df,
+                    analysis_type=indicator,
+                    decimal_places=decimal_places,
+                    pivot_levels=pivot_levels
+                ),
+                current_price,
             )
+            for indicator in indicators
+        }
+
+    def prepare_chart_and_context(self) -> tuple[str, str, float]:  # encoded_chart, extra_context, current_price
+        service = self._service()
+        df = self._fetch_data(service)
+        pivot_levels = service.get_pivot_levels(end_date=self.end_date) if self.indicator == "pivot" else None
+        return self._render(service, df, [self.indicator], pivot_levels)[self.indicator]
+
+    async def aprepare_chart_and_context(self) -> tuple[str, str, float]:
+        """prepare_chart_and_context without blocking the event loop.
+
+        Concurrent chart tasks for the same asset, interval, size and end date
+        (e.g. "ema", "rsi" and "pivot" delegated in one step) join one batch:
+        the data is fetched once on a worker thread and all their indicators
+        are rendered by one prepare_charts call on the shared render thread.
+        """
+        loop = asyncio.get_running_loop()
+        key = (loop, self.asset, self.interval, self.size, self.end_date,
+               self.context.asset_type if self.context else None)
+        batch = _chart_batches.get(key)
+        if batch is None or batch.closed:
+            batch = _ChartBatch(result=loop.create_future())
+            _chart_batches[key] = batch
+            # Own context: cancelling the task that opened the batch (and its cancel
+            # scope) must not fail the tasks that joined it
+            loop.create_task(self._run_batch(key, batch), context=contextvars.Context())
+        batch.indicators.add(self.indicator)
+        # shield: a cancelled task must not cancel the batch other tasks wait for
+        return (await asyncio.shield(batch.result))[self.indicator]
+
+    async def _run_batch(self, key: tuple, batch: _ChartBatch) -> None:
+        """Fetch the data once, then render every indicator that joined the batch."""
+        try:
+            service = self._service()
+            fetch_df = asyncio.to_thread(self._fetch_data, service)
+            # Pivot levels are fetched alongside the data when the opening task needs them
+            if self.indicator == "pivot":
+                df, pivot_levels = await asyncio.gather(
+                    fetch_df, asyncio.to_thread(service.get_pivot_levels, end_date=self.end_date)
+                )
+            else:
+                df, pivot_levels = await fetch_df, None
+
+            batch.closed = True
+            if _chart_batches.get(key) is batch:
+                del _chart_batches[key]
+            indicators = sorted(batch.indicators)
+            if pivot_levels is None and "pivot" in indicators:
+                pivot_levels = await asyncio.to_thread(service.get_pivot_levels, end_date=self.end_date)
+
+            loop = asyncio.get_running_loop()
+            batch.result.set_result(await loop.run_in_executor(
+                _get_render_executor(), self._render, service, df, indicators, pivot_levels
+            ))
+        except Exception as e:
+            batch.result.set_exception(e)
+            # Retrieved here too, in case every task of the batch was cancelled
+            batch.result.exception()
+        finally:
+            batch.closed = True
+            if _chart_batches.get(key) is batch:
+                del _chart_batches[key]
+            if not batch.result.done():
+                batch.result.cancel()
+
+    async def _invoke_agent(self, agent, kind: str, text_prompt: str, encoded_chart: str) -> str:
+        """Run a chart subagent on the prompt and chart.
+
+        The reply is shared through the response cache with identical calls
+        (same chart, prompt and model) until the current bar closes. A reply
+        served by another call is passed to on_token whole.
+        """
+        streamed = False
 
-        else:
-            encoded_chart = service.prepare_chart(
-                df=df,
-                size=self.size,
-                analysis_type=self.indicator,
+        def on_text(text: str) -> None:
+            nonlocal streamed
+            streamed = True
+            self.on_token(kind, text)
+
+        async def call() -> str:
+            human_message = HumanMessage(
+                content=[
+                    {"type": "text", "text": text_prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:image/jpeg;base64,{encoded_chart}"},
+                    },
+                ]
+            )
+            result = await astream_agent(
+                agent, {"messages": [human_message]}, self.context, on_text if self.on_token else None
             )
+            return _text_of(result["messages"][-1].content)
 
-        extra_context = service.prepare_extra_context(
-            df=df,
-            analysis_type=self.indicator,
-            decimal_places=decimal_places,
-            pivot_levels=pivot_levels
-        )
+        model_name = self.context.model_name if self.context else ""
+        key = response_key(kind, model_name, text_prompt, encoded_chart)
+        text = await get_response_cache().get_or_call(key, bar_ttl(self.interval), call)
+        if self.on_token and not streamed:
+            self.on_token(kind, text)
+        return text
 
-        return encoded_chart, extra_context, current_price
-    
     async def synthesize_chart_description(self, encoded_chart: str, extra_context: str, current_price: float) -> str:
 
         text_prompt = CHART_DESCRIPTION_USER_PROMPT.format(
@@ -92,21 +262,7 @@ class ChartAnalysisTask:
             current_price=current_price,
             extra_context=extra_context
         )
-        human_message = HumanMessage(
-        content=[
-            {"type": "text", "text": text_prompt},
-            {
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{encoded_chart}"},
-            },
-            ]
-        )
-        result = await chart_description_agent.ainvoke(
-            {"messages": [human_message]},
-            context=self.context
-        )
-        chart_description = result["messages"][-1].content[0]["text"]
-        return chart_description
+        return await self._invoke_agent(chart_description_agent, "description", text_prompt, encoded_chart)
     
     async def synthesize_technical_analysis(self, encoded_chart: str, chart_description: str, current_price: float) -> str:
 
@@ -120,24 +276,32 @@ class ChartAnalysisTask:
             current_price=current_price,
     
         )
-        human_message = HumanMessage(
-        content=[
-            {"type": "text", "text": text_prompt},
-            {
-                "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{encoded_chart}"},
-            },
-            ]
-        )
-        result = await chart_analysis_agent.ainvoke(
-            {"messages": [human_message]},
-            context=self.context
-        )
-        technical_analysis = result["messages"][-1].content[0]["text"]
-        return technical_analysis
+        return await self._invoke_agent(chart_analysis_agent, "analysis", text_prompt, encoded_chart)
     
+    async def synthesize_merged_analysis(self, encoded_chart: str, extra_context: str, current_price: float) -> str:
+        """Describe and analyse the chart in one multimodal call (CHART_TASK_MODE="merged")."""
+        text_prompt = CHART_MERGED_USER_PROMPT.format(
+            task_description=self.task_description,
+            size=self.size,
+            interval=self.interval,
+            asset=self.asset,
+            analysis_type=self.indicator,
+            current_price=current_price,
+            extra_context=extra_context
+        )
+        text = await self._invoke_agent(chart_analysis_agent, "merged", text_prompt, encoded_chart)
+        # Only the analysis is returned, as in the two-step mode
+        _, marker, analysis = text.partition("</chart description>")
+        return analysis.strip() if marker and analysis.strip() else text
+
     async def execute(self) -> str:
-        encoded_chart, extra_context, current_price = self.prepare_chart_and_context()
+        encoded_chart, extra_context, current_price = await self.aprepare_chart_and_context()
+        if CHART_TASK_MODE == "merged":
+            return await self.synthesize_merged_analysis(
+                encoded_chart=encoded_chart,
+                extra_context=extra_context,
+                current_price=current_price
+            )
         chart_description = await self.synthesize_chart_description(
             encoded_chart=encoded_chart,
             extra_context=extra_context,
@@ -169,7 +333,46 @@ async def task(
     Returns:
         The analysis result as a string.
     """
+    if task_type not in TASK_PRIORITIES:
+        return f"Error: Unknown task_type '{task_type}'. Must be 'chart' or 'quantitative'."
+
+    # Tasks of one conversation share its thread's limit; all conversations share the global one
+    conversation = str((runtime.config or {}).get("configurable", {}).get("thread_id", "default"))
+    async with get_task_scheduler().slot(conversation, task_type, runtime.context.max_concurrent_tasks) as queued:
+        start = time.perf_counter()
+        try:
+            with task_scope(runtime.tool_call_id):
+                return await _run_task(runtime, task_type, task_description, chart_analysis_input)
+        finally:
+            tracker = get_usage_tracker()
+            tracker.record_task(conversation, runtime.tool_call_id, task_type, queued, time.perf_counter() - start)
+            if runtime.stream_writer is not None:
+                # Shown under the task in the chat's iteration panel
+                runtime.stream_writer({
+                    "type": "task_usage",
+                    "content": tracker.task_summary(conversation, runtime.tool_call_id),
+                    "task_call_id": runtime.tool_call_id,
+                })
+
+
+async def _run_task(
+    runtime: ToolRuntime,
+    task_type: str,
+    task_description: str,
+    chart_analysis_input: ChartAnalysisInput | None
+) -> str:
+    """Run a chart or quantitative task once it holds a scheduler slot.
+
+    Cancelling the task (the user cleared the conversation or loaded a new
+    chart) also stops its data downloads and sandbox snippets: the agents run
+    in a cancel scope, exited before the sandbox session is released.
+    """
     context = runtime.context
+    writer = runtime.stream_writer
+
+    def on_token(agent: str, text: str) -> None:
+        # Rendered incrementally under the task until its result arrives
+        writer({"type": "subagent_token", "content": text, "agent": agent, "task_call_id": runtime.tool_call_id})
     if task_type == "chart":
         if chart_analysis_input is None:
             return "Error: chart_analysis_input is required for chart analysis tasks."
@@ -182,11 +385,13 @@ async def task(
         chart_task = ChartAnalysisTask(
             task_description=task_description,
             analysis_input=chart_analysis_input,
-            context=chart_context
+            context=chart_context,
+            on_token=on_token if writer is not None else None
         )
 
         try:
-            return await chart_task.execute()
+            with cancel_scope():
+                return await chart_task.execute()
         except ValueError as e:
             return f"Error: Unable to fetch data for asset '{chart_analysis_input.asset}'. {str(e)}. Verify the asset symbol. Positive: 'AAPL' for stocks, 'EUR/USD' for forex, 'BTC/USD' for crypto, XAU/USD for commodity."
         except Exception as e:
@@ -196,8 +401,6 @@ async def task(
             return f"Error: Failed to complete chart analysis for '{chart_analysis_input.asset}'. {error_msg}"
 
     elif task_type == "quantitative":
-        from langchain_core.messages import HumanMessage
-
         # Create session-specific temp directory with random 6-digit number
         session_id = f"{random.randint(100000, 999999)}"
         session_data_dir = QUANT_DATA_BASE_DIR / session_id
@@ -208,21 +411,25 @@ async def task(
             model_name=context.subagent_model_name,
             session_data_dir=str(session_data_dir),
             asset_type=context.asset_type,
+            task_call_id=runtime.tool_call_id,
         )
 
         try:
-            result = await quant_agent.ainvoke(
-                {"messages": [HumanMessage(content=task_description)], "downloaded_files": []},
-                context=quant_context
-            )
+            with cancel_scope():
+                result = await astream_agent(
+                    quant_agent,
+                    {"messages": [HumanMessage(content=task_description)], "downloaded_files": []},
+                    quant_context,
+                    (lambda text: on_token("quantitative", text)) if writer is not None else None
+                )
 
             messages = result.get("messages", [])
             if messages:
-                last_msg = messages[-1]
-                return last_msg.content[0]["text"]
+                return _text_of(messages[-1].content)
             return "No response from quantitative agent."
         finally:
-            # Clean up session temp directory
+            # Release the sandbox kernel and clean up session temp directory
+            await asyncio.to_thread(release_sandbox_session, str(session_data_dir))
             if session_data_dir.exists():
                 shutil.rmtree(session_data_dir, ignore_errors=True)
 
@@ -0,0 +1,93 @@
+"""Local columnar store of raw OHLC bars downloaded from TwelveData.
+
+Each series (symbol, interval, timezone) is a directory of Parquet files, one
+per downloaded batch, written as soon as the batch arrives. Reading
+concatenates the parts; once a series has many parts they are compacted into
+a single file. Parquet needs pyarrow; without it the store stays empty and
+every download goes to the API.
+"""
+
+from pathlib import Path
+import os
+import uuid
+
+import pandas as pd
+
+from src.config.settings import BAR_STORE_DIR
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class BarStore:
+    """Parquet files of raw bars (DatetimeIndex, Open/High/Low/Close[/Volume])."""
+
+    MAX_PARTS = 16
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _series_dir(self, symbol: str, interval: str, timezone: str) -> Path:
+        name = f"{symbol}_{interval}_{timezone}".replace("/", "_").replace(" ", "_")
+        return self.root / name
+
+    def load(self, symbol: str, interval: str, timezone: str) -> pd.DataFrame:
+        """All stored bars of a series, oldest first (empty if none)."""
+        series_dir = self._series_dir(symbol, interval, timezone)
+        parts = sorted(series_dir.glob("*.parquet")) if PARQUET_AVAILABLE else []
+        frames = []
+        for part in parts:
+            try:
+                frames.append(pd.read_parquet(part))
+            except (OSError, ValueError):
+                # Half-written or corrupt part; the bars are fetched again
+                continue
+        if not frames:
+            return pd.DataFrame()
+
+        bars = pd.concat(frames, axis=0).sort_index()
+        bars = bars[~bars.index.duplicated(keep="last")]
+        if len(parts) > self.MAX_PARTS:
+            self._compact(series_dir, parts, bars)
+        return bars
+
+    def append(self, symbol: str, interval: str, timezone: str, bars: pd.DataFrame) -> None:
+        """Write one downloaded batch as a new part."""
+        if not PARQUET_AVAILABLE or bars is None or bars.empty:
+            return
+        series_dir = self._series_dir(symbol, interval, timezone)
+        series_dir.mkdir(parents=True, exist_ok=True)
+        self._write(series_dir, bars.sort_index())
+
+    def _write(self, series_dir: Path, bars: pd.DataFrame) -> Path:
+        # Written under a temporary name so readers never see a partial part
+        start = bars.index.min().strftime("%Y%m%d%H%M")
+        path = series_dir / f"{start}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = path.with_suffix(".tmp")
+        bars.to_parquet(tmp)
+        os.replace(tmp, path)
+        return path
+
+    def _compact(self, series_dir: Path, parts: list[Path], bars: pd.DataFrame) -> None:
+        """Replace the given parts with one file holding `bars`."""
+        try:
+            self._write(series_dir, bars)
+        except OSError:
+            return
+        for part in parts:
+            part.unlink(missing_ok=True)
+
+
+# Global store, configured via BAR_STORE_DIR
+_bar_store: BarStore | None = None
+
+
+def get_bar_store() -> BarStore:
+    """Get or create the process-wide bar store."""
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore(BAR_STORE_DIR)
+    return _bar_store
@@ -0,0 +1,138 @@
+"""Pluggable persistence sinks for rendered chart images.
+
+Rendering returns the chart as base64 for the agents; persisting the PNG is
+optional and happens on a background writer thread so it never sits on the
+request path.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import atexit
+import hashlib
+import os
+import re
+import uuid
+
+from src.config.settings import CHART_SINK, CHART_SINK_DIR
+
+
+def sanitize_chart_name(name: str) -> str:
+    """Remove characters invalid for file names on most OSes."""
+    sanitized = re.sub(r"[\\/:*?\"<>|]+", "_", name.strip())
+    return sanitized or "chart"
+
+
+_writer: ThreadPoolExecutor | None = None
+
+
+def _get_writer() -> ThreadPoolExecutor:
+    """Get or create the background writer used by all sinks."""
+    global _writer
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-sink")
+        atexit.register(_shutdown_writer)
+    return _writer
+
+
+def _shutdown_writer():
+    """Flush pending writes on exit."""
+    global _writer
+    if _writer is not None:
+        _writer.shutdown(wait=True)
+        _writer = None
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write to a temp file and rename so readers never see partial PNGs."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink(missing_ok=True)
+
+
+class ChartSink:
+    """Base sink. Discards charts; subclasses decide where bytes go."""
+
+    def key_for(self, chart_name: str, chart_bytes: bytes) -> str | None:
+        """Return the storage key a chart would be written under."""
+        return None
+
+    def submit(self, chart_name: str, chart_bytes: bytes) -> Future | None:
+        """Schedule a chart for persistence and return immediately."""
+        return None
+
+
+class NullChartSink(ChartSink):
+    """Does not persist charts at all."""
+
+
+class LocalDirectoryChartSink(ChartSink):
+    """Writes each chart under a unique, timestamped file name.
+
+    Concurrent renders of the same symbol/interval/indicator never overwrite
+    each other because every key carries a UTC timestamp and a random suffix.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def key_for(self, chart_name: str, chart_bytes: bytes) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        return f"{sanitize_chart_name(chart_name)}_{stamp}_{uuid.uuid4().hex[:8]}.png"
+
+    def submit(self, chart_name: str, chart_bytes: bytes) -> Future:
+        path = self.root / self.key_for(chart_name, chart_bytes)
+        return _get_writer().submit(_atomic_write, path, chart_bytes)
+
+
+class ContentAddressedChartSink(ChartSink):
+    """Stores charts by SHA-256 of their bytes; identical renders are stored once."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def key_for(self, chart_name: str, chart_bytes: bytes) -> str:
+        digest = hashlib.sha256(chart_bytes).hexdigest()
+        return f"{digest[:2]}/{digest}.png"
+
+    def _write_if_missing(self, path: Path, chart_bytes: bytes) -> None:
+        if not path.exists():
+            _atomic_write(path, chart_bytes)
+
+    def submit(self, chart_name: str, chart_bytes: bytes) -> Future:
+        path = self.root / self.key_for(chart_name, chart_bytes)
+        return _get_writer().submit(self._write_if_missing, path, chart_bytes)
+
+
+CHART_SINKS = {
+    "none": NullChartSink,
+    "local": LocalDirectoryChartSink,
+    "content": ContentAddressedChartSink,
+}
+
+
+def create_chart_sink(kind: str, root: str | Path | None = None) -> ChartSink:
+    """Create a sink by name ("none", "local" or "content")."""
+    if kind not in CHART_SINKS:
+        raise ValueError(f"Unknown chart sink: {kind}. Choose one of {list(CHART_SINKS)}.")
+    if kind == "none":
+        return NullChartSink()
+    return CHART_SINKS[kind](root or CHART_SINK_DIR)
+
+
+# Global default sink, configured via CHART_SINK / CHART_SINK_DIR
+_chart_sink: ChartSink | None = None
+
+
+def get_chart_sink() -> ChartSink:
+    """Get or create the process-wide default chart sink."""
+    global _chart_sink
+    if _chart_sink is None:
+        _chart_sink = create_chart_sink(CHART_SINK)
+    return _chart_sink
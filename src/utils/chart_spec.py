@@ -0,0 +1,366 @@
+"""Backend-neutral chart specification shared by the agent and Streamlit charts.
+
+`build_chart_spec` turns an indicator frame into panels, overlays and price
+levels once. The matplotlib renderer (`src.utils.charts`) and the Plotly
+renderer (`src.utils.plotly_charts`) both draw from the same spec, so the
+image a chart agent analyses uses the same series, colours and levels as the
+chart the user sees.
+"""
+
+from dataclasses import dataclass, field
+from typing import Literal
+import re
+
+import pandas as pd
+
+# Shared palette for every chart backend
+CHART_COLORS = {
+    "candle_up": "#26a69a",
+    "candle_down": "#ef5350",
+    "ema_10": "#2196F3",
+    "ema_20": "#FF9800",
+    "ema_50": "#9C27B0",
+    "ema_100": "#E91E63",
+    "bb_band": "#607D8B",
+    "bb_middle": "#2196F3",
+    "rsi": "#9C27B0",
+    "rsi_overbought": "#ef5350",
+    "rsi_oversold": "#26a69a",
+    "macd_line": "#2196F3",
+    "macd_signal": "#FF9800",
+    "macd_hist_pos": "#26a69a",
+    "macd_hist_neg": "#ef5350",
+    "atr": "#29b6f6",
+    "roc": "#26a69a",
+    "volume_up": "rgba(38, 166, 154, 0.5)",
+    "volume_down": "rgba(239, 83, 80, 0.5)",
+    "pivot": "#2196F3",
+    "resistance": "#ef5350",
+    "support": "#26a69a",
+}
+
+# Theme-dependent settings (Plotly template, backgrounds, reference lines)
+CHART_THEME = {
+    "light": {
+        "template": "plotly_white",
+        "paper_bg": "#ffffff",
+        "plot_bg": "#ffffff",
+        "grid": "#e0e0e0",
+        "font_color": "#1a1a1a",
+        "legend_bg": "rgba(255,255,255,0.8)",
+        "ref_line": "#404040",
+        "bb_fill_opacity": 0.1,
+        "atr_fill_opacity": 0.2,
+    },
+    "dark": {
+        "template": "plotly_dark",
+        "paper_bg": "#1a1a2e",
+        "plot_bg": "#1a1a2e",
+        "grid": "#2d2d3d",
+        "font_color": "#e8e8f0",
+        "legend_bg": "rgba(26,26,46,0.95)",
+        "ref_line": "#808090",
+        "bb_fill_opacity": 0.15,
+        "atr_fill_opacity": 0.3,
+    },
+}
+
+FIBONACCI_STYLES = {
+    'fib_0': ("0%", "#9E9E9E"),
+    'fib_236': ("23.6%", "#9C27B0"),
+    'fib_382': ("38.2%", "#2196F3"),
+    'fib_500': ("50%", "#26a69a"),
+    'fib_618': ("61.8%", "#FF9800"),
+    'fib_786': ("78.6%", "#ef5350"),
+    'fib_1': ("100%", "#9E9E9E"),
+}
+
+PIVOT_DASHES = {
+    'Pivot': "solid",
+    'R1': "dash", 'R2': "dashdot", 'R3': "dot",
+    'S1': "dash", 'S2': "dashdot", 'S3': "dot",
+}
+
+# Indicator toggles used for each chart agent analysis type
+ANALYSIS_INDICATORS = {
+    "ema": {"ema_20": True, "ema_50": True, "ema_100": True},
+    "rsi": {"rsi": True},
+    "macd": {"macd": True},
+    "atr": {"atr": True},
+    "bb": {"bb": True},
+    "pivot": {},
+    "fibonacci": {},
+    "none": {},
+}
+
+# Bars shaded at the right edge when `shading` is requested
+SHADING_BARS = {"5min": 0, "15min": 0, "1h": 6, "4h": 5}
+
+Dash = Literal["solid", "dash", "dot", "dashdot"]
+
+
+@dataclass
+class SeriesSpec:
+    """One plotted series inside a panel.
+
+    `columns` holds Open/High/Low/Close for candlesticks, the upper and lower
+    column for bands, and a single y column for lines and bars.
+    """
+    kind: Literal["candlestick", "line", "band", "bar"]
+    label: str
+    columns: tuple[str, ...]
+    color: str
+    color_name: str | None = None  # Spelled out in the legend for the vision model
+    width: float = 1.5
+    dash: Dash = "solid"
+    fill_opacity: float = 0.0  # band fill, or area to zero for lines
+    down_color: str | None = None  # bars: colour for negative / bearish bars
+    color_by: Literal["sign", "candle"] | None = None
+
+
+@dataclass
+class LevelSpec:
+    """Horizontal reference line (pivots, Fibonacci, RSI bounds)."""
+    value: float
+    color: str
+    dash: Dash = "dash"
+    width: float = 1.0
+    text: str | None = None
+
+
+@dataclass
+class PanelSpec:
+    """A stacked chart panel sharing the x-axis with the others."""
+    key: str
+    title: str
+    height: float
+    series: list[SeriesSpec] = field(default_factory=list)
+    levels: list[LevelSpec] = field(default_factory=list)
+    y_range: tuple[float, float] | None = None
+
+
+@dataclass
+class ChartSpec:
+    """Everything a backend needs to draw a chart."""
+    symbol: str
+    interval: str
+    frame: pd.DataFrame  # Trimmed, positional index 0..n-1, normalized Date column
+    date_labels: pd.Series  # Unique category labels for the x-axis
+    panels: list[PanelSpec]
+    decimal_places: int
+    latest: dict = field(default_factory=dict)  # Latest values of the plotted series
+    shade_bars: int = 0
+    theme_mode: str = "light"
+
+    @property
+    def price_panel(self) -> PanelSpec:
+        return self.panels[0]
+
+
+def parse_color(color: str) -> tuple[float, float, float, float]:
+    """Convert "#rrggbb" or "rgba(r, g, b, a)" into an RGBA tuple in 0..1."""
+    if color.startswith("#") and len(color) == 7:
+        r, g, b = (int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+        return r, g, b, 1.0
+    match = re.match(r"rgba?\(([^)]*)\)", color.replace(" ", ""))
+    if match:
+        parts = [float(p) for p in match.group(1).split(",")]
+        alpha = parts[3] if len(parts) == 4 else 1.0
+        return parts[0] / 255, parts[1] / 255, parts[2] / 255, alpha
+    raise ValueError(f"Unsupported color format: {color}")
+
+
+def with_alpha(color: str, alpha: float) -> str:
+    """Return `color` as an rgba() string with the given opacity."""
+    r, g, b, _ = parse_color(color)
+    return f"rgba({round(r * 255)}, {round(g * 255)}, {round(b * 255)}, {alpha})"
+
+
+def normalize_chart_frame(df: pd.DataFrame, size: int | None = None) -> pd.DataFrame:
+    """Keep the last `size` rows with a positional index and a datetime Date column."""
+    frame = df.tail(size) if size else df
+    frame = frame.reset_index(drop="Date" in frame.columns)
+    if "Date" not in frame.columns:
+        # Date lived in the index; reset_index moved it into the first column
+        frame = frame.rename(columns={frame.columns[0]: "Date"})
+    frame["Date"] = pd.to_datetime(frame["Date"], errors="coerce")
+    return frame
+
+
+def format_date_labels(dates: pd.Series, interval: str) -> pd.Series:
+    """Readable, unique x-axis category labels (year included to avoid collisions)."""
+    if interval in ["1day", "1week", "1month"]:
+        return dates.dt.strftime("%Y-%m-%d")
+    return dates.dt.strftime("%Y-%m-%d %H:%M")
+
+
+def build_chart_spec(
+        df: pd.DataFrame,
+        symbol: str,
+        interval: str,
+        indicators: dict,
+        size: int | None = None,
+        pivot_levels: dict | None = None,
+        fibonacci_levels: dict | None = None,
+        decimal_places: int | None = None,
+        shading: bool = False,
+        theme_mode: str = "light",
+        prepared: bool = False,
+        ) -> ChartSpec:
+    """Build a chart spec from an indicator frame.
+
+    Args:
+        df: OHLC data with indicator columns (as produced by TwelveData.get_data_with_ti)
+        symbol: Trading symbol for the title
+        interval: Bar interval
+        indicators: Toggles keyed like the Streamlit sidebar ("ema_20", "bb", "rsi",
+            "macd", "atr", "roc", "volume")
+        size: Keep only the last `size` bars (None keeps all)
+        pivot_levels: Optional pivot levels drawn on the price panel
+        fibonacci_levels: Optional Fibonacci levels drawn on the price panel
+        decimal_places: Price precision; looked up from the symbol when omitted
+        shading: Shade the most recent bars (agent charts)
+        theme_mode: "light" or "dark"
+        prepared: `df` is already the output of normalize_chart_frame; it is used
+            as-is so several specs can share one frame
+    """
+    if decimal_places is None:
+        from src.utils.constants import get_decimal_places
+        decimal_places = get_decimal_places(symbol)
+
+    ct = CHART_THEME.get(theme_mode, CHART_THEME["light"])
+    frame = df if prepared else normalize_chart_frame(df, size)
+    last = frame.iloc[-1]
+    latest = {"Close": round(last["Close"], decimal_places)}
+
+    # --- Price panel ---
+    price = PanelSpec(key="price", title=f"{symbol} ({interval})", height=10)
+    price.series.append(SeriesSpec(
+        kind="candlestick", label="OHLC", columns=("Open", "High", "Low", "Close"),
+        color=CHART_COLORS["candle_up"], down_color=CHART_COLORS["candle_down"],
+    ))
+
+    ema_configs = [
+        ("ema_10", "EMA10", "blue", 1),
+        ("ema_20", "EMA20", "orange", 1),
+        ("ema_50", "EMA50", "purple", 1.5),
+        ("ema_100", "EMA100", "pink", 1.5),
+    ]
+    for key, col, color_name, width in ema_configs:
+        if indicators.get(key) and col in frame.columns:
+            price.series.append(SeriesSpec(
+                kind="line", label=col, columns=(col,), color=CHART_COLORS[key],
+                color_name=color_name, width=width,
+            ))
+            latest[col] = round(last[col], decimal_places)
+
+    if indicators.get("bb") and "BB_Upper" in frame.columns:
+        price.series.append(SeriesSpec(
+            kind="band", label="BB Upper/Lower", columns=("BB_Upper", "BB_Lower"),
+            color=CHART_COLORS["bb_band"], color_name="gray", width=1, dash="dash",
+            fill_opacity=ct["bb_fill_opacity"],
+        ))
+        price.series.append(SeriesSpec(
+            kind="line", label="BB Middle", columns=("BB_Middle",),
+            color=CHART_COLORS["bb_middle"], color_name="blue", width=1,
+        ))
+        for col in ("BB_Upper", "BB_Middle", "BB_Lower"):
+            latest[col] = round(last[col], decimal_places)
+
+    if pivot_levels:
+        for name, value in pivot_levels.items():
+            if name == "Pivot":
+                color = CHART_COLORS["pivot"]
+            elif name.startswith("R"):
+                color = CHART_COLORS["resistance"]
+            else:
+                color = CHART_COLORS["support"]
+            price.levels.append(LevelSpec(
+                value=value, color=color, dash=PIVOT_DASHES.get(name, "dash"),
+                width=1.2, text=f"{name}: {value:.{decimal_places}f}",
+            ))
+        latest["pivot_levels"] = pivot_levels
+
+    if fibonacci_levels:
+        for name, value in fibonacci_levels.items():
+            label, color = FIBONACCI_STYLES.get(name, (name, "#9E9E9E"))
+            price.levels.append(LevelSpec(
+                value=value, color=color, dash="dash", width=1.2,
+                text=f"{label}: {value:.{decimal_places}f}",
+            ))
+        latest["fibonacci_levels"] = fibonacci_levels
+
+    # Price range from candles only so distant levels do not squash the chart
+    low, high = frame["Low"].min(), frame["High"].max()
+    padding = (high - low) * 0.02
+    price.y_range = (low - padding, high + padding)
+
+    panels = [price]
+
+    # --- Subplot panels ---
+    has_volume = "Volume" in frame.columns and frame["Volume"].notna().any()
+    if indicators.get("volume") and has_volume:
+        panels.append(PanelSpec(key="volume", title="Volume", height=3, series=[SeriesSpec(
+            kind="bar", label="Volume", columns=("Volume",), color=CHART_COLORS["volume_up"],
+            down_color=CHART_COLORS["volume_down"], color_by="candle",
+        )]))
+
+    if indicators.get("rsi") and "RSI14" in frame.columns:
+        panels.append(PanelSpec(
+            key="rsi", title="RSI", height=3, y_range=(0, 100),
+            series=[SeriesSpec(kind="line", label="RSI(14)", columns=("RSI14",),
+                               color=CHART_COLORS["rsi"], color_name="purple")],
+            levels=[
+                LevelSpec(value=70, color=CHART_COLORS["rsi_overbought"]),
+                LevelSpec(value=30, color=CHART_COLORS["rsi_oversold"]),
+                LevelSpec(value=50, color=ct["ref_line"], dash="dot"),
+            ],
+        ))
+        latest["RSI14"] = round(last["RSI14"], 2)
+
+    if indicators.get("macd") and "MACD" in frame.columns:
+        panels.append(PanelSpec(
+            key="macd", title="MACD", height=3,
+            series=[
+                SeriesSpec(kind="line", label="MACD", columns=("MACD",),
+                           color=CHART_COLORS["macd_line"], color_name="blue"),
+                SeriesSpec(kind="line", label="Signal", columns=("MACD_Signal",),
+                           color=CHART_COLORS["macd_signal"], color_name="orange"),
+                SeriesSpec(kind="bar", label="Histogram", columns=("MACD_Diff",),
+                           color=CHART_COLORS["macd_hist_pos"], color_name="green/red",
+                           down_color=CHART_COLORS["macd_hist_neg"], color_by="sign"),
+            ],
+            levels=[LevelSpec(value=0, color=ct["ref_line"], dash="solid")],
+        ))
+        for col in ("MACD", "MACD_Signal", "MACD_Diff"):
+            latest[col] = round(last[col], decimal_places)
+
+    if indicators.get("roc") and "ROC12" in frame.columns:
+        panels.append(PanelSpec(
+            key="roc", title="ROC", height=3,
+            series=[SeriesSpec(kind="line", label="ROC(12)", columns=("ROC12",),
+                               color=CHART_COLORS["roc"], color_name="green")],
+            levels=[LevelSpec(value=0, color=ct["ref_line"])],
+        ))
+        latest["ROC12"] = round(last["ROC12"], 2)
+
+    if indicators.get("atr") and "ATR" in frame.columns:
+        panels.append(PanelSpec(
+            key="atr", title="ATR", height=3,
+            series=[SeriesSpec(kind="line", label="ATR(14)", columns=("ATR",),
+                               color=CHART_COLORS["atr"], color_name="light blue",
+                               fill_opacity=ct["atr_fill_opacity"])],
+        ))
+        latest["ATR14"] = round(last["ATR"], decimal_places)
+
+    return ChartSpec(
+        symbol=symbol,
+        interval=interval,
+        frame=frame,
+        date_labels=format_date_labels(frame["Date"], interval),
+        panels=panels,
+        decimal_places=decimal_places,
+        latest=latest,
+        shade_bars=SHADING_BARS.get(interval, 0) if shading else 0,
+        theme_mode=theme_mode,
+    )
@@ -1,56 +1,139 @@
 import matplotlib
 matplotlib.use('Agg')
-from matplotlib.ticker import FuncFormatter
 from matplotlib.ticker import MaxNLocator
 from matplotlib import pyplot as plt
 from mplfinance.original_flavor import candlestick_ohlc
 import pandas as pd
-import os
-import re
 import numpy as np
-import math
 import base64
 import io
+from dataclasses import dataclass
 from src.utils.constants import get_decimal_places
+from src.utils.chart_sinks import ChartSink, get_chart_sink
+from src.utils.chart_spec import ANALYSIS_INDICATORS, ChartSpec, PanelSpec, SeriesSpec, build_chart_spec, normalize_chart_frame, parse_color
+from src.config.settings import CHART_RENDERER
+
+MPL_DASHES = {"solid": "-", "dash": "--", "dot": ":", "dashdot": "-."}
+
+
+@dataclass
+class AxisLayout:
+    """Precomputed tick positions and labels applied as fixed ticks."""
+    x_limits: tuple[float, float]
+    x_ticks: np.ndarray
+    x_labels: list[str]
+    y_limits: tuple[float, float]
+    y_ticks: np.ndarray
+    y_labels: list[str]
+
+
+def compute_price_ticks(y_min: float, y_max: float, decimal_places: int, max_ticks: int = 10) -> tuple[np.ndarray, float, float]:
+    """Derive "nice" price ticks so we draw at most `max_ticks` labels.
+
+    The base interval is the smallest 1/2/5 x 10^k step covering the span; if
+    the aligned bounds still need too many ticks it is doubled (up to 6 times).
+    All candidates are evaluated in one vectorized pass instead of a retry loop.
+
+    Returns the tick values and the bounds aligned to the chosen interval.
+    """
+    min_step = 10.0 ** (-decimal_places)
+    span = max(y_max - y_min, min_step)
+    target = span / max(max_ticks - 1, 1)
+    if not np.isfinite(target) or target <= 0:
+        target = min_step
+
+    exponent = np.floor(np.log10(target))
+    ladder = np.array([1.0, 2.0, 5.0, 10.0]) * 10.0 ** exponent
+    base = max(ladder[np.argmax(target <= ladder)], min_step)
+    base = max(1, np.ceil(base / min_step)) * min_step
+
+    candidates = base * 2.0 ** np.arange(7)
+    lows = np.floor(y_min / candidates) * candidates
+    highs = np.ceil(y_max / candidates) * candidates
+    counts = np.rint((highs - lows) / candidates).astype(int) + 1
+    fits = counts <= max_ticks
+    best = int(np.argmax(fits)) if fits.any() else len(candidates) - 1
+
+    interval, low, high = candidates[best], lows[best], highs[best]
+    ticks = low + interval * np.arange(counts[best])
+    return ticks, low, high
+
+
+def compute_axis_layout(spec: ChartSpec, max_y_ticks: int = 10, max_x_ticks: int = 20) -> AxisLayout:
+    """Compute price ticks and date labels once, with vectorized formatting."""
+    n_bars = len(spec.frame)
+    x_limits = (-1, n_bars + 1)
+    x_ticks = MaxNLocator(integer=True, prune='both', nbins=max_x_ticks).tick_values(*x_limits)
+    x_ticks = x_ticks[(x_ticks >= 0) & (x_ticks < n_bars)].astype(int)
+    x_labels = spec.frame['Date'].iloc[x_ticks].dt.strftime('%m-%d %H:%M').tolist()
+
+    # y-axis limits come from OHLC data only (pivot/fibonacci levels are ignored)
+    y_ticks, y_min, y_max = compute_price_ticks(*spec.price_panel.y_range, spec.decimal_places, max_ticks=max_y_ticks)
+    y_labels = np.char.mod(f"%.{spec.decimal_places}f", y_ticks).tolist()
+
+    return AxisLayout(
+        x_limits=x_limits,
+        x_ticks=x_ticks,
+        x_labels=x_labels,
+        y_limits=(y_min, y_max),
+        y_ticks=y_ticks,
+        y_labels=y_labels,
+    )
+
 
 class TechnicalCharts:
-    def __init__(self, symbol: str, interval: str, df: pd.DataFrame, size: int, chart_name: str):
+    def __init__(self, symbol: str, interval: str, df: pd.DataFrame, size: int, chart_name: str, sink: ChartSink | None = None):
         self.symbol = symbol
         self.interval = interval
         self.df = df
         self.size = size
         self.chart_name = chart_name
-        self.chart_root_path = "data/chart"
-
-    @staticmethod
-    def _sanitize_chart_name(name: str) -> str:
-        """Remove characters invalid for file names on most OSes."""
-        sanitized = re.sub(r"[\\/:*?\"<>|]+", "_", name.strip())
-        return sanitized or "chart"
-    
-    @staticmethod
-    def _compute_pip_interval(y_min: float, y_max: float, decimal_places: int, max_ticks: int = 10) -> float:
-        """Derive a "nice" tick interval so we draw at most `max_ticks` labels."""
-        min_step = 10 ** (-decimal_places)
-        span = max(y_max - y_min, min_step)
-        target_interval = span / max(max_ticks - 1, 1)
-        if not math.isfinite(target_interval) or target_interval <= 0:
-            target_interval = min_step
-
-        exponent = math.floor(math.log10(target_interval)) if target_interval > 0 else 0
-        base = 10 ** exponent
-        for multiplier in (1, 2, 5):
-            candidate = multiplier * base
-            if target_interval <= candidate:
-                interval = candidate
-                break
-        else:
-            interval = 10 * base
-
-        interval = max(interval, min_step)
-        step_count = max(1, math.ceil(interval / min_step))
-        return step_count * min_step
-    
+        self.sink = sink if sink is not None else get_chart_sink()
+        self._frame: pd.DataFrame | None = None
+
+    def _prepared_frame(self) -> pd.DataFrame:
+        """Trim and normalize the frame once; every spec of this chart shares it."""
+        if self._frame is None:
+            self._frame = normalize_chart_frame(self.df, self.size)
+        return self._frame
+
+    def build_spec(self,
+               EMA10: bool = False,
+               EMA20: bool = False,
+               EMA50: bool = False,
+               EMA100: bool = False,
+               RSI14: bool = False,
+               MACD: bool = False,
+               ROC12: bool = False,
+               ATR14: bool = False,
+               BB: bool = False,
+               pivot_levels: dict = None,
+               fibonacci_levels: dict = None,
+               shading: bool = False) -> ChartSpec:
+        """Build the shared chart spec for the requested indicators."""
+        indicators = {
+            'ema_10': EMA10,
+            'ema_20': EMA20,
+            'ema_50': EMA50,
+            'ema_100': EMA100,
+            'rsi': RSI14,
+            'macd': MACD,
+            'roc': ROC12,
+            'atr': ATR14,
+            'bb': BB,
+        }
+        return build_chart_spec(
+            self._prepared_frame(),
+            symbol=self.symbol,
+            interval=self.interval,
+            indicators=indicators,
+            pivot_levels=pivot_levels,
+            fibonacci_levels=fibonacci_levels,
+            decimal_places=get_decimal_places(self.symbol),
+            shading=shading,
+            prepared=True,
+        )
+
     def plot_chart(self,
                EMA10: bool = False,
                EMA20: bool = False,
@@ -64,280 +147,216 @@ class TechnicalCharts:
                pivot_levels: dict = None,
                fibonacci_levels: dict = None,
                shading: bool = False):
-        # collect current data
-        # NOTE: `return_binary` retained for backward compatibility; output is always base64.
-        data = {}
+        # NOTE: output is always base64; `data` holds the latest plotted values.
+        spec = self.build_spec(
+            EMA10=EMA10, EMA20=EMA20, EMA50=EMA50, EMA100=EMA100,
+            RSI14=RSI14, MACD=MACD, ROC12=ROC12, ATR14=ATR14, BB=BB,
+            pivot_levels=pivot_levels, fibonacci_levels=fibonacci_levels,
+            shading=shading,
+        )
+        return spec.latest, self.render(spec)
+
+    def plot_charts(self,
+                    analysis_types: list[str],
+                    pivot_levels: dict = None,
+                    fibonacci_levels: dict = None) -> dict[str, tuple[dict, str]]:
+        """Render one chart per analysis type ("ema", "rsi", ...) in a single pass.
+
+        All charts share the prepared frame, the candlestick base and the axis
+        layout. Returns {analysis_type: (latest_values, base64_png)}.
+        """
         decimal_places = get_decimal_places(self.symbol)
+        specs = {}
+        for analysis_type in dict.fromkeys(analysis_types):
+            specs[analysis_type] = build_chart_spec(
+                self._prepared_frame(),
+                symbol=self.symbol,
+                interval=self.interval,
+                indicators=ANALYSIS_INDICATORS[analysis_type],
+                pivot_levels=pivot_levels if analysis_type == "pivot" else None,
+                fibonacci_levels=fibonacci_levels if analysis_type == "fibonacci" else None,
+                decimal_places=decimal_places,
+                prepared=True,
+            )
 
-        # --- Data Preparation ---
-        ohlc_df = self.df.copy()
-        ohlc_df = ohlc_df.tail(self.size)
-        data["Close"] = ohlc_df.iloc[-1]["Close"].round(decimal_places)
+        results = {}
+        for analysis_type, chart_bytes in render_charts_png(specs).items():
+            self.sink.submit(f"{self.chart_name}_{analysis_type}", chart_bytes)
+            encoded_chart = base64.b64encode(chart_bytes).decode('utf-8')
+            results[analysis_type] = (specs[analysis_type].latest, encoded_chart)
+        return results
 
-        # Create a new sequential index column
-        ohlc_df.loc[:, 'Index'] = range(len(ohlc_df))
-        ohlc_data = ohlc_df[['Index', 'Open', 'High', 'Low', 'Close']].copy()
+    def render(self, spec: ChartSpec, renderer: str = CHART_RENDERER) -> str:
+        """Render a spec to base64 PNG and hand the bytes to the chart sink."""
+        chart_bytes = render_chart_png(spec, renderer=renderer)
+        encoded_chart = base64.b64encode(chart_bytes).decode('utf-8')
+
+        # Persistence is optional and runs on the sink's background writer
+        self.sink.submit(self.chart_name, chart_bytes)
+        return encoded_chart
+
+
+def render_chart_png(spec: ChartSpec, renderer: str = CHART_RENDERER) -> bytes:
+    """Render a spec to PNG bytes with the configured backend ("matplotlib" or "plotly")."""
+    return render_charts_png({"chart": spec}, renderer=renderer)["chart"]
 
-        # --- Define the Indicator Settings from Input Parameters ---
-        indicators = {
-            'EMA10': EMA10,
-            'EMA20': EMA20,
-            'EMA50': EMA50,
-            'EMA100': EMA100,
-            'RSI14': RSI14,
-            'MACD': MACD,
-            'ROC12': ROC12,
-            'ATR14': ATR14,
-            'BB': BB,
-        }
 
-        # Determine which additional subplots to create.
-        additional_indicators = []
-        if indicators.get('RSI14'):
-            additional_indicators.append('RSI')
-        if indicators.get('MACD'):
-            additional_indicators.append('MACD')
-        if indicators.get('ROC12'):
-            additional_indicators.append('ROC')
-        if indicators.get('ATR14'):
-            additional_indicators.append('ATR')
+def render_charts_png(specs: dict[str, ChartSpec], renderer: str = CHART_RENDERER) -> dict[str, bytes]:
+    """Render several specs to PNG bytes, sharing work between specs of the same frame."""
+    if renderer == "plotly":
+        from src.utils.plotly_charts import render_plotly_png
+        return {name: render_plotly_png(spec) for name, spec in specs.items()}
+    return render_matplotlib_batch(specs)
+
+
+def render_matplotlib_png(spec: ChartSpec) -> bytes:
+    """Render a chart spec with matplotlib (the default backend for agent charts)."""
+    return render_matplotlib_batch({"chart": spec})["chart"]
+
+
+def _draw_candles(ax, series: SeriesSpec, frame: pd.DataFrame, positions: np.ndarray) -> None:
+    ohlc_data = np.column_stack([positions] + [frame[col].to_numpy() for col in series.columns])
+    down_color = parse_color(series.down_color) if series.down_color else parse_color(series.color)
+    candlestick_ohlc(ax, ohlc_data, width=0.6, colorup=parse_color(series.color), colordown=down_color, alpha=0.8)
+    # adjust wick width
+    for line in ax.get_lines():
+        x_data = line.get_xdata()
+        if len(x_data) == 2 and x_data[0] == x_data[1]:
+            line.set_linewidth(2.5)
+
+
+def _draw_panel(ax, panel: PanelSpec, frame: pd.DataFrame, positions: np.ndarray) -> list:
+    """Draw a panel's overlays, levels and legend; return the created artists.
+
+    Candlesticks are skipped here because batch rendering draws them once per figure.
+    """
+    created = []
+    legend_lines = []
+    legend_labels = []
+    for series in panel.series:
+        if series.kind == "candlestick":
+            continue
+        color = parse_color(series.color)
+        down_color = parse_color(series.down_color) if series.down_color else color
+        linestyle = MPL_DASHES[series.dash]
+        if series.kind == "line":
+            line, = ax.plot(positions, frame[series.columns[0]], color=color,
+                            linewidth=series.width * 1.5, linestyle=linestyle)
+            created.append(line)
+            if series.fill_opacity:
+                created.append(ax.fill_between(positions, frame[series.columns[0]], 0,
+                                               color=color, alpha=series.fill_opacity))
+        elif series.kind == "band":
+            upper, lower = (frame[col] for col in series.columns)
+            line, = ax.plot(positions, upper, color=color, linewidth=series.width * 1.5, linestyle=linestyle)
+            lower_line, = ax.plot(positions, lower, color=color, linewidth=series.width * 1.5, linestyle=linestyle)
+            created += [line, lower_line, ax.fill_between(positions, upper, lower, color=color, alpha=series.fill_opacity)]
+        elif series.kind == "bar":
+            values = frame[series.columns[0]]
+            if series.color_by == "candle":
+                is_up = (frame["Close"] >= frame["Open"]).to_numpy()
+            else:
+                is_up = (values >= 0).to_numpy()
+            bar_colors = [color if up else down_color for up in is_up]
+            line = ax.bar(positions, values, color=bar_colors, width=0.6)
+            created.append(line)
+        legend_lines.append(line)
+        legend_labels.append(f"{series.label}: {series.color_name}" if series.color_name else series.label)
+
+    for level in panel.levels:
+        level_color = parse_color(level.color)
+        created.append(ax.axhline(y=level.value, color=level_color, linestyle=MPL_DASHES[level.dash],
+                                  linewidth=level.width, alpha=0.8))
+        if level.text:
+            created.append(ax.text(len(frame) + 0.5, level.value, level.text,
+                                   va='center', ha='left', fontsize=9, color=level_color))
+
+    if legend_lines:
+        created.append(ax.legend(legend_lines, legend_labels, loc='upper left', fontsize=12))
+    if panel.y_range is not None and panel.key != "price":
+        ax.set_ylim(*panel.y_range)
+    return created
+
+
+def _apply_axis_layout(ax, layout: AxisLayout, is_price: bool) -> None:
+    """Apply the precomputed fixed ticks to one axis."""
+    ax.set_xlim(*layout.x_limits)
+    ax.yaxis.tick_right()
+    ax.yaxis.set_label_position("right")
+    if is_price:
+        ax.set_xticks(layout.x_ticks, layout.x_labels)
+        ax.set_yticks(layout.y_ticks, layout.y_labels)
+        ax.set_ylim(*layout.y_limits)  # Explicitly set limits to exclude pivot/fib levels
+        ax.tick_params(axis='x', rotation=0)
+    else:
+        ax.set_xticks(layout.x_ticks, [])
+        ax.tick_params(axis='x', length=0)
+    ax.grid(True, alpha=0.4)
+
+
+def render_matplotlib_batch(specs: dict[str, ChartSpec]) -> dict[str, bytes]:
+    """Render several chart specs, reusing one figure per frame and panel layout.
+
+    Specs that share a frame and panel heights (e.g. "ema", "bb" and "pivot" of one
+    symbol) share the figure, the candlesticks and the axis layout; only their
+    overlays and indicator panels are redrawn between saves.
+    """
+    groups: dict[tuple, list[str]] = {}
+    for name, spec in specs.items():
+        key = (id(spec.frame), spec.price_panel.title, tuple(panel.height for panel in spec.panels))
+        groups.setdefault(key, []).append(name)
+
+    layouts: dict[int, AxisLayout] = {}
+    results = {}
+    for names in groups.values():
+        base = specs[names[0]]
+        frame = base.frame
+        positions = np.arange(len(frame))
+        layout = layouts.get(id(frame))
+        if layout is None:
+            layout = layouts[id(frame)] = compute_axis_layout(base)
 
         # --- Figure Setup: Dynamic Subplots ---
-        # Fixed size for the candlestick chart and each additional indicator chart
-        price_chart_height_inch = 10      # Fixed height for the price chart
-        indicator_height_inch = 3         # Fixed height for each additional indicator
-        total_height = price_chart_height_inch + indicator_height_inch * len(additional_indicators)
-        n_subplots = 1 + len(additional_indicators)
-        height_ratios = [price_chart_height_inch] + [indicator_height_inch] * len(additional_indicators)
-
-        fig, axes = plt.subplots(nrows=n_subplots, figsize=(20, total_height),
-                                gridspec_kw={'height_ratios': height_ratios}, sharex=False)
-        if n_subplots == 1:
+        # Price panel is 10 inches tall, each indicator panel 3 inches (from the spec heights)
+        height_ratios = [panel.height for panel in base.panels]
+        fig, axes = plt.subplots(nrows=len(base.panels), figsize=(20, sum(height_ratios)),
+                                 gridspec_kw={'height_ratios': height_ratios}, sharex=False)
+        if len(base.panels) == 1:
             axes = [axes]
         ax_price = axes[0]
+        initial_margins = vars(fig.subplotpars).copy()
 
-        # Map additional indicators to their dedicated axes in order (top to bottom)
-        indicator_axes = {}
-        for i, indicator in enumerate(additional_indicators):
-            indicator_axes[indicator] = axes[i + 1]
-
-        # --- Plot 1: Price Chart (Candlestick with Optional EMA Lines) ---
-        lines = []
-        labels = []
-        candlestick_ohlc(ax_price, ohlc_data.values, width=0.6, colorup='green', colordown='red', alpha=0.8)
-        # adjust wick width
-        for line in ax_price.get_lines():
-            x_data = line.get_xdata()
-            # Check if the line is vertical (both x values are the same)
-            if len(x_data) == 2 and x_data[0] == x_data[1]:
-                line.set_linewidth(2.5) 
-
-        if indicators.get('EMA10'):
-            line, = ax_price.plot(ohlc_df['Index'], ohlc_df['EMA10'], label='EMA 10', color='blue', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 10: blue")
-            data["EMA10"] = ohlc_df.iloc[-1]["EMA10"].round(decimal_places)
-        if indicators.get('EMA20'):
-            line, = ax_price.plot(ohlc_df['Index'], ohlc_df['EMA20'], label='EMA 20', color='orange', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 20: orange")
-            data["EMA20"] = ohlc_df.iloc[-1]["EMA20"].round(decimal_places)
-        if indicators.get('EMA50'):
-            line, = ax_price.plot(ohlc_df['Index'], ohlc_df['EMA50'], label='EMA 50', color='purple', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 50: purple")
-            data["EMA50"] = ohlc_df.iloc[-1]["EMA50"].round(decimal_places)
-        if indicators.get('EMA100'):
-            line, = ax_price.plot(ohlc_df['Index'], ohlc_df['EMA100'], label='EMA 100', color='violet', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 100: violet")
-            data["EMA100"] = ohlc_df.iloc[-1]["EMA100"].round(decimal_places)
-        # Bollinger Bands
-        if indicators.get('BB'):
-            ax_price.plot(ohlc_df['Index'], ohlc_df['BB_Upper'], label='BB Upper', color='gray', linewidth=1.5, linestyle='--')
-            ax_price.plot(ohlc_df['Index'], ohlc_df['BB_Middle'], label='BB Middle', color='blue', linewidth=1.5)
-            ax_price.plot(ohlc_df['Index'], ohlc_df['BB_Lower'], label='BB Lower', color='gray', linewidth=1.5, linestyle='--')
-            ax_price.fill_between(ohlc_df['Index'], ohlc_df['BB_Upper'], ohlc_df['BB_Lower'], alpha=0.15, color='blue')
-            lines.append(ax_price.plot([], [], color='blue', linewidth=1.5)[0])
-            labels.append("BB Middle: blue")
-            lines.append(ax_price.plot([], [], color='gray', linewidth=1.5, linestyle='--')[0])
-            labels.append("BB Upper/Lower: gray")
-            data["BB_Upper"] = ohlc_df.iloc[-1]["BB_Upper"].round(decimal_places)
-            data["BB_Middle"] = ohlc_df.iloc[-1]["BB_Middle"].round(decimal_places)
-            data["BB_Lower"] = ohlc_df.iloc[-1]["BB_Lower"].round(decimal_places)
-        # Pivot Points
-        if pivot_levels:
-            pivot_colors = {
-                'Pivot': 'blue',
-                'R1': 'red', 'R2': 'red', 'R3': 'red',
-                'S1': 'green', 'S2': 'green', 'S3': 'green',
-            }
-            pivot_styles = {
-                'Pivot': '-',
-                'R1': '--', 'R2': '-.', 'R3': ':',
-                'S1': '--', 'S2': '-.', 'S3': ':',
-            }
-            for level_name, level_value in pivot_levels.items():
-                color = pivot_colors.get(level_name, 'gray')
-                style = pivot_styles.get(level_name, '--')
-                ax_price.axhline(y=level_value, color=color, linestyle=style, linewidth=1.2, alpha=0.8)
-                ax_price.text(len(ohlc_df) + 0.5, level_value, f'{level_name}: {level_value:.{decimal_places}f}',
-                             va='center', ha='left', fontsize=9, color=color)
-            data["pivot_levels"] = pivot_levels
-        # Fibonacci Levels
-        if fibonacci_levels:
-            fib_colors = {
-                'fib_0': 'gray', 'fib_236': 'purple', 'fib_382': 'blue',
-                'fib_500': 'green', 'fib_618': 'orange', 'fib_786': 'red', 'fib_1': 'gray',
-            }
-            fib_labels = {
-                'fib_0': '0%', 'fib_236': '23.6%', 'fib_382': '38.2%',
-                'fib_500': '50%', 'fib_618': '61.8%', 'fib_786': '78.6%', 'fib_1': '100%',
-            }
-            for level_name, level_value in fibonacci_levels.items():
-                color = fib_colors.get(level_name, 'gray')
-                label = fib_labels.get(level_name, level_name)
-                ax_price.axhline(y=level_value, color=color, linestyle='--', linewidth=1.2, alpha=0.7)
-                ax_price.text(len(ohlc_df) + 0.5, level_value, f'{label}: {level_value:.{decimal_places}f}',
-                             va='center', ha='left', fontsize=9, color=color)
-            data["fibonacci_levels"] = fibonacci_levels
-        if lines:
-            ax_price.legend(lines, labels, loc='upper left', fontsize=12)
-        ax_price.set_title(f"{self.symbol}")
-        ax_price.grid(True)
-
-        # --- Plot Additional Indicators ---
-        # RSI Plot
-        if 'RSI' in indicator_axes:
-            ax_rsi = indicator_axes['RSI']
-            ax_rsi.plot(ohlc_df['Index'], ohlc_df['RSI14'], label='RSI (14)', color='purple')
-            ax_rsi.axhline(70, color='red', linestyle='--')
-            ax_rsi.axhline(30, color='green', linestyle='--')
-            ax_rsi.legend(loc='upper left')
-            ax_rsi.grid(True)
-            data["RSI14"] = ohlc_df.iloc[-1]["RSI14"].round(2)
-        # MACD Plot
-        if 'MACD' in indicator_axes:
-            ax_macd = indicator_axes['MACD']
-            lines = []
-            labels = []
-            line, = ax_macd.plot(ohlc_df['Index'], ohlc_df['MACD'], label='MACD', color='red')
-            lines.append(line)
-            labels.append("MACD: red")
-            line, = ax_macd.plot(ohlc_df['Index'], ohlc_df['MACD_Signal'], label='Signal', color='green')
-            lines.append(line)
-            labels.append("Signal: green")
-            macd_diff = ohlc_df['MACD_Diff']
-            pos_diff = macd_diff.copy()
-            neg_diff = macd_diff.copy()
-            pos_diff[pos_diff <= 0] = 0  # Only positive values
-            neg_diff[neg_diff >= 0] = 0  # Only negative values
-            ax_macd.bar(ohlc_df['Index'], pos_diff, color='peru', label='Divergence', width=0.6)
-            ax_macd.bar(ohlc_df['Index'], neg_diff, color='black', width=0.6)
-            ax_macd.legend(lines, labels, loc='upper left', fontsize=12)
-            ax_macd.grid(True)
-            data["MACD"] = ohlc_df.iloc[-1]["MACD"].round(decimal_places)
-            data["MACD_Signal"] = ohlc_df.iloc[-1]["MACD_Signal"].round(decimal_places)
-            data["MACD_Diff"] = ohlc_df.iloc[-1]["MACD_Diff"].round(decimal_places)
-        # ROC Plot
-        if 'ROC' in indicator_axes:
-            ax_roc = indicator_axes['ROC']
-            ax_roc.plot(ohlc_df['Index'], ohlc_df['ROC12'], label='ROC (12)', color='green')
-            ax_roc.axhline(0, color='black', linestyle='--')
-            ax_roc.legend(loc='upper left')
-            ax_roc.grid(True)
-            data["ROC12"] = ohlc_df.iloc[-1]["ROC12"].round(2)
-        # ATR Plot
-        if 'ATR' in indicator_axes:
-            ax_atr = indicator_axes['ATR']
-            ax_atr.plot(ohlc_df['Index'], ohlc_df['ATR'], label='ATR (14)', color='blue')
-            ax_atr.legend(loc='upper left')
-            ax_atr.grid(True)
-            data["ATR14"] = ohlc_df.iloc[-1]["ATR"].round(decimal_places)
-
-        # --- Formatting: Axis Labels, Ticks, and Grids ---
-        def make_price_formatter(decimal_places):
-            def price_formatter(x, pos):
-                return f"{x:.{decimal_places}f}"
-            return price_formatter
-        formatter = make_price_formatter(decimal_places)
-
-        # Calculate y-axis limits based on OHLC data only (ignore pivot/fibonacci levels)
-        raw_y_min = ohlc_df['Low'].min()
-        raw_y_max = ohlc_df['High'].max()
-        # Add small padding (2% of range) for visual comfort
-        y_padding = (raw_y_max - raw_y_min) * 0.02
-        raw_y_min -= y_padding
-        raw_y_max += y_padding
-        max_ticks = 10
-        pip_interval = self._compute_pip_interval(raw_y_min, raw_y_max, decimal_places, max_ticks=max_ticks)
-
-        def _align_bounds(interval: float):
-            min_aligned = math.floor(raw_y_min / interval) * interval
-            max_aligned = math.ceil(raw_y_max / interval) * interval
-            return min_aligned, max_aligned
-
-        y_min, y_max = _align_bounds(pip_interval)
-        tick_count = int(round((y_max - y_min) / pip_interval)) + 1
-        guard = 0
-        while tick_count > max_ticks and guard < 6:
-            pip_interval *= 2
-            y_min, y_max = _align_bounds(pip_interval)
-            tick_count = int(round((y_max - y_min) / pip_interval)) + 1
-            guard += 1
-
-        y_ticks = np.arange(y_min, y_max + (pip_interval / 2), pip_interval)
-        # num_ticks = int(round((y_max - y_min) / pip_interval)) + 1
-        # y_ticks = np.linspace(y_min, y_max, num_ticks)
-
-        def date_formatter(x, pos):
-            index = int(round(x))
-            if index < len(ohlc_df):
-                return ohlc_df['Date'].iloc[index].strftime('%m-%d %H:%M')
-            return ''
-
-        # Combine all axes (price chart + additional) for common formatting.
-        all_axes = [ax_price] + [indicator_axes[ind] for ind in additional_indicators]
-        for i, ax in enumerate(all_axes):
-            ax.xaxis.set_major_formatter(FuncFormatter(date_formatter))
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True, prune='both', nbins=20))
-            ax.set_xlim(-1, len(ohlc_df) + 1)
-            ax.yaxis.tick_right()
-            ax.yaxis.set_label_position("right")
-            if i == 0:
-                ax.yaxis.set_major_formatter(FuncFormatter(formatter))
-                ax.set_yticks(y_ticks)
-                ax.set_ylim(y_min, y_max)  # Explicitly set limits to exclude pivot/fib levels
-                ax.tick_params(axis='x', rotation=0)
-            else:
-                ax.set_xticklabels([])
-                ax.tick_params(axis='x', length=0)
-            ax.grid(True, alpha=0.4)
-
-        # --- Shading ---
-        if shading:
-            time_intervals_dict = {"5min": 0, "15min": 0, "1h": 6, "4h": 5}
-            bars_to_mark = time_intervals_dict[self.interval]
-            start_shade = max(0, len(ohlc_df) - bars_to_mark)
-            end_shade = len(ohlc_df)
-            for ax in all_axes:
-                ax.axvspan(start_shade, end_shade, facecolor='blue', alpha=0.2, zorder=-1)
-
-        # Save and close the figure
-        plt.tight_layout()
-
-        os.makedirs(self.chart_root_path, exist_ok=True)
-        safe_name = self._sanitize_chart_name(self.chart_name)
-        chart_path = os.path.join(self.chart_root_path, f"{safe_name}.png")
-
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-        chart_bytes = buf.getvalue()
-        encoded_chart = base64.b64encode(chart_bytes).decode('utf-8')
-        with open(chart_path, 'wb') as chart_file:
-            chart_file.write(chart_bytes)
-        buf.close()
+        # --- Shared base: candlesticks, title and price axis ---
+        _draw_candles(ax_price, base.price_panel.series[0], frame, positions)
+        ax_price.set_title(base.price_panel.title)
+        _apply_axis_layout(ax_price, layout, is_price=True)
+
+        for name in names:
+            spec = specs[name]
+            created = _draw_panel(ax_price, spec.price_panel, frame, positions)
+            for ax, panel in zip(axes[1:], spec.panels[1:]):
+                ax.cla()
+                _draw_panel(ax, panel, frame, positions)
+                _apply_axis_layout(ax, layout, is_price=False)
+
+            # --- Shading ---
+            if spec.shade_bars:
+                start_shade = max(0, len(frame) - spec.shade_bars)
+                for ax in axes:
+                    created.append(ax.axvspan(start_shade, len(frame), facecolor='blue', alpha=0.2, zorder=-1))
+
+            # Start tight_layout from the original margins so every chart lays out as if rendered alone
+            fig.subplots_adjust(**initial_margins)
+            fig.tight_layout()
+            buf = io.BytesIO()
+            fig.savefig(buf, format='png')
+            results[name] = buf.getvalue()
+            buf.close()
+
+            # Remove this spec's overlays so the next one starts from the shared base
+            for artist in created:
+                artist.remove()
 
         plt.close(fig)
-        return data, encoded_chart
\ No newline at end of file
+
+    return results
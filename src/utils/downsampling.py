@@ -0,0 +1,146 @@
+"""Server-side downsampling for large interactive charts.
+
+Beyond a point budget, bars are grouped into equal-width buckets: candles are
+aggregated to coarser OHLC bars and every other trace is reduced to points
+that fall inside the same buckets, so all traces still share one categorical
+x-axis (the label of each bucket's first bar).
+"""
+
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+DownsampleMethod = Literal["lttb", "minmax"]
+
+
+def bucket_edges(n_points: int, n_buckets: int) -> np.ndarray:
+    """Edges of `n_buckets` contiguous, non-empty buckets covering `n_points` rows."""
+    n_buckets = max(1, min(n_buckets, n_points))
+    return np.unique(np.linspace(0, n_points, n_buckets + 1).round().astype(int))
+
+
+def _argmax_or_first(values: np.ndarray) -> int:
+    if np.isnan(values).all():
+        return 0
+    return int(np.nanargmax(values))
+
+
+def lttb_indices(y: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: one representative index per bucket.
+
+    The first and last points are always kept; every other bucket keeps the
+    point forming the largest triangle with the previously selected point and
+    the average of the next bucket.
+    """
+    y = np.asarray(y, dtype=float)
+    n_buckets = len(edges) - 1
+    selected = np.empty(n_buckets, dtype=int)
+    selected[0] = edges[0]
+    selected[-1] = edges[-1] - 1
+    if n_buckets <= 2:
+        return selected
+
+    x = np.arange(len(y), dtype=float)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    valid = ~np.isnan(y)
+    valid_counts = np.add.reduceat(valid.astype(int), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_y = np.add.reduceat(np.where(valid, y, 0.0), starts) / valid_counts
+    avg_x = starts + (counts - 1) / 2
+
+    prev = selected[0]
+    for b in range(1, n_buckets - 1):
+        lo, hi = edges[b], edges[b + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[prev] - avg_x[b + 1]) * (ys - y[prev]) - (x[prev] - xs) * (avg_y[b + 1] - y[prev]))
+        prev = selected[b] = lo + _argmax_or_first(area)
+    return selected
+
+
+def minmax_indices(y: np.ndarray, edges: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Min-max decimation: the minimum and maximum of each bucket, in time order.
+
+    Returns (bucket_ids, indices) so callers can place both points on the bucket's x.
+    """
+    y = np.asarray(y, dtype=float)
+    buckets, indices = [], []
+    for b in range(len(edges) - 1):
+        lo, hi = edges[b], edges[b + 1]
+        window = y[lo:hi]
+        if np.isnan(window).all():
+            picks = [lo]
+        else:
+            picks = sorted({lo + int(np.nanargmin(window)), lo + int(np.nanargmax(window))})
+        buckets += [b] * len(picks)
+        indices += picks
+    return np.array(buckets, dtype=int), np.array(indices, dtype=int)
+
+
+class ChartDownsampler:
+    """Maps full-resolution chart columns onto at most `point_budget` buckets.
+
+    With `point_budget=None` or a frame within budget every method is the identity,
+    so renderers can route all traces through it unconditionally.
+    """
+
+    def __init__(self, frame: pd.DataFrame, labels: pd.Series, point_budget: int | None = None,
+                 method: DownsampleMethod = "lttb"):
+        self.frame = frame
+        self.labels = np.asarray(labels)
+        self.method = method
+        n_points = len(frame)
+        self.active = point_budget is not None and n_points > point_budget
+        self.edges = bucket_edges(n_points, point_budget) if self.active else np.arange(n_points + 1)
+        self.starts = self.edges[:-1]
+        self.x = self.labels[self.starts]
+
+    def _values(self, column: str) -> np.ndarray:
+        return self.frame[column].to_numpy(dtype=float)
+
+    def candles(self, columns: tuple[str, str, str, str]) -> tuple[np.ndarray, ...]:
+        """Aggregate OHLC columns per bucket (first open, max high, min low, last close)."""
+        open_, high, low, close = (self._values(col) for col in columns)
+        if not self.active:
+            return self.x, open_, high, low, close
+        return (
+            self.x,
+            open_[self.starts],
+            np.fmax.reduceat(high, self.starts),
+            np.fmin.reduceat(low, self.starts),
+            close[self.edges[1:] - 1],
+        )
+
+    def candle_up(self) -> np.ndarray:
+        """Bullish mask of the (aggregated) candles, used to colour volume bars."""
+        _, open_, _, _, close = self.candles(("Open", "High", "Low", "Close"))
+        return close >= open_
+
+    def line(self, column: str) -> tuple[np.ndarray, np.ndarray]:
+        """Reduce a line trace with LTTB (one point per bucket) or min-max (two)."""
+        y = self._values(column)
+        if not self.active:
+            return self.x, y
+        if self.method == "minmax":
+            buckets, indices = minmax_indices(y, self.edges)
+            return self.x[buckets], y[indices]
+        return self.x, y[lttb_indices(y, self.edges)]
+
+    def band(self, upper: str, lower: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Envelope of a band per bucket (max of upper, min of lower)."""
+        upper_y, lower_y = self._values(upper), self._values(lower)
+        if not self.active:
+            return self.x, upper_y, lower_y
+        return self.x, np.fmax.reduceat(upper_y, self.starts), np.fmin.reduceat(lower_y, self.starts)
+
+    def bars(self, column: str, how: Literal["sum", "extreme"]) -> tuple[np.ndarray, np.ndarray]:
+        """One bar per bucket: summed (volume) or the value with the largest magnitude."""
+        y = self._values(column)
+        if not self.active:
+            return self.x, y
+        if how == "sum":
+            return self.x, np.add.reduceat(np.nan_to_num(y), self.starts)
+        highs = np.fmax.reduceat(y, self.starts)
+        lows = np.fmin.reduceat(y, self.starts)
+        return self.x, np.where(np.abs(highs) >= np.abs(lows), highs, lows)
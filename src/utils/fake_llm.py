@@ -0,0 +1,173 @@
+"""Scripted stand-in chat model for offline runs and benchmarks.
+
+get_chat_model returns a ScriptedChatModel for any model name starting with
+"fake" ("fake", or "fake:0.5" for 0.5 s per call), so setting the model names
+of an OrchestratorContext is enough to run every agent without network. It
+answers deterministically from the conversation:
+
+* orchestrator (has the `task` tool): writes todos, delegates one chart and
+  one quantitative task, reflects with think_tool, then answers;
+* quant agent: downloads the data, runs one snippet, then reports;
+* tool-less agents (chart description / analysis, compaction): a canned text.
+
+Token usage is estimated so usage accounting still works. When streamed,
+text replies arrive word by word over the call's latency.
+"""
+
+from typing import Any
+import asyncio
+import json
+import re
+import time
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+FAKE_MODEL_PREFIX = "fake"
+
+ASSET_PATTERN = re.compile(r"\b([A-Z]{3}/[A-Z]{3})\b")
+INTERVAL_PATTERN = re.compile(r"\b(1min|5min|15min|1h|4h|1day|1week)\b")
+CSV_PATTERN = re.compile(r'read_csv\("([^"]+)"\)')
+
+CANNED_TEXT = (
+    "Price trended higher over the window, holding above the EMA20 with higher lows. "
+    "Momentum faded into the latest bars as the range narrowed below recent resistance; "
+    "support sits at the last swing low. Bias: mildly bullish while support holds."
+)
+
+QUANT_SNIPPET = '''df = read_csv("{filename}")
+returns = df["Close"].pct_change().dropna()
+print(f"bars={{len(df)}} last_close={{df['Close'].iloc[-1]:.5f}}")
+emit(returns.describe(), "returns")
+'''
+
+
+def is_fake_model(model_name: str) -> bool:
+    return model_name.startswith(FAKE_MODEL_PREFIX)
+
+
+def fake_model_latency(model_name: str) -> float:
+    """Per-call latency encoded in a model name such as "fake:0.5"."""
+    _, _, latency = model_name.partition(":")
+    try:
+        return float(latency) if latency else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model that plays the agents' usual tool sequences."""
+
+    latency: float = 0.0
+    tool_names: tuple[str, ...] = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs) -> "ScriptedChatModel":
+        names = tuple(getattr(t, "name", None) or (t.get("name") if isinstance(t, dict) else "") for t in tools)
+        return self.model_copy(update={"tool_names": names})
+
+    def _reply(self, messages: list[BaseMessage]) -> AIMessage:
+        last_user = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        query = _text(messages[last_user].content) if messages else ""
+        steps = sum(isinstance(m, AIMessage) for m in messages[last_user:])
+        asset = (ASSET_PATTERN.search(query) or [None, "EUR/USD"])[1]
+        interval = (INTERVAL_PATTERN.search(query) or [None, "1h"])[1]
+
+        if "task" in self.tool_names:
+            reply = self._orchestrator_step(steps, asset, interval, messages[last_user:])
+        elif "write_code" in self.tool_names:
+            reply = self._quant_step(steps, asset, interval, messages[last_user:])
+        else:
+            reply = AIMessage(content=[{"type": "text", "text": CANNED_TEXT}])
+
+        reply.usage_metadata = {
+            "input_tokens": count_tokens_approximately(messages),
+            "output_tokens": count_tokens_approximately([reply]),
+            "total_tokens": 0,
+        }
+        reply.usage_metadata["total_tokens"] = reply.usage_metadata["input_tokens"] + reply.usage_metadata["output_tokens"]
+        return reply
+
+    @staticmethod
+    def _call(name: str, **args) -> dict:
+        return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+
+    def _orchestrator_step(self, steps: int, asset: str, interval: str, turn: list[BaseMessage]) -> AIMessage:
+        if steps == 0:
+            return AIMessage(content="", tool_calls=[self._call("write_todos", todos=[
+                {"content": f"Chart analysis of {asset} {interval}", "status": "in_progress"},
+                {"content": f"Quantitative analysis of {asset} {interval}", "status": "pending"},
+            ])])
+        if steps == 1:
+            return AIMessage(content="", tool_calls=[
+                self._call("task", task_type="chart", task_description=f"Assess the {asset} {interval} trend and key levels.",
+                           chart_analysis_input={"asset": asset, "interval": interval, "indicator": "ema", "size": 80}),
+                self._call("task", task_type="quantitative",
+                           task_description=f"Download {asset} {interval} data and summarize recent returns."),
+            ])
+        if steps == 2:
+            results = sum(isinstance(m, ToolMessage) and m.name == "task" for m in turn)
+            return AIMessage(content="", tool_calls=[self._call(
+                "think_tool", reflection=f"Received {results} task results for {asset}; enough to synthesize."
+            )])
+        return AIMessage(content=[{"type": "text", "text": f"**{asset} {interval} plan.** {CANNED_TEXT}"}])
+
+    def _quant_step(self, steps: int, asset: str, interval: str, turn: list[BaseMessage]) -> AIMessage:
+        if steps == 0:
+            return AIMessage(content="", tool_calls=[self._call(
+                "download_market_data", ticker=asset, interval=interval, outputsize=1000
+            )])
+        downloaded = next((CSV_PATTERN.search(_text(m.content)) for m in reversed(turn)
+                           if isinstance(m, ToolMessage) and CSV_PATTERN.search(_text(m.content))), None)
+        if steps == 1 and downloaded:
+            return AIMessage(content="", tool_calls=[self._call(
+                "write_code", code=QUANT_SNIPPET.format(filename=downloaded[1])
+            )])
+        return AIMessage(content=[{"type": "text", "text": f"{asset} {interval} returns summary: {CANNED_TEXT}"}])
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs):
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i, "type": "tool_call_chunk"}
+                    for i, c in enumerate(reply.tool_calls)
+                ],
+                usage_metadata=reply.usage_metadata,
+            ))
+            return
+
+        words = _text(reply.content).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                await asyncio.sleep(self.latency / len(words))
+            text = word if i == 0 else f" {word}"
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=[{"type": "text", "text": text, "index": 0}],
+                usage_metadata=reply.usage_metadata if i == len(words) - 1 else None,
+            ))
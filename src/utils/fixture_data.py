@@ -0,0 +1,111 @@
+"""Offline stand-in for the TwelveData client.
+
+With MARKET_DATA_SOURCE=fixture the data services get a FixtureTDClient
+instead of a TDClient. time_series() answers from
+`<FIXTURE_DATA_DIR>/<SYMBOL>_<interval>.csv` when that file exists (columns
+datetime, open, high, low, close[, volume]) and otherwise from a synthetic
+series ending at the current bar. Synthetic bars are a pure function of the
+bar's timestamp, so every run, batch and end_date sees the same price for a
+given bar, and no network is needed.
+"""
+
+from pathlib import Path
+import zlib
+
+import numpy as np
+import pandas as pd
+
+INTERVAL_DELTAS = {
+    "1min": pd.Timedelta(minutes=1), "5min": pd.Timedelta(minutes=5), "15min": pd.Timedelta(minutes=15),
+    "30min": pd.Timedelta(minutes=30), "45min": pd.Timedelta(minutes=45), "1h": pd.Timedelta(hours=1),
+    "2h": pd.Timedelta(hours=2), "4h": pd.Timedelta(hours=4), "1day": pd.Timedelta(days=1),
+    "1week": pd.Timedelta(weeks=1), "1month": pd.Timedelta(days=30),
+}
+
+BASE_PRICES = {
+    "EUR/USD": 1.08, "GBP/USD": 1.27, "AUD/USD": 0.66, "USD/JPY": 150.0, "USD/CNH": 7.2,
+    "XAU/USD": 2300.0, "BTC/USD": 60000.0, "ETH/USD": 3000.0,
+}
+
+
+def _noise(k: np.ndarray, seed: int) -> np.ndarray:
+    """Deterministic pseudo-random values in [0, 1) per bar number."""
+    return np.modf(np.abs(np.sin(k * 12.9898 + seed * 78.233) * 43758.5453))[0]
+
+
+def _close(k: np.ndarray, seed: int) -> np.ndarray:
+    # Slow and fast cycles plus per-bar noise: trends, swings and chop for the agents to find
+    phase = seed % 1000
+    return 1 + 0.04 * np.sin((k + phase) / 240) + 0.012 * np.sin((k + phase) / 31) + 0.002 * (_noise(k, seed) - 0.5)
+
+
+def synthetic_bars(symbol: str, interval: str, outputsize: int, end: pd.Timestamp,
+                   start: pd.Timestamp | None = None) -> pd.DataFrame:
+    """Newest-first bars up to `end`, shaped like TDClient.time_series().as_pandas()."""
+    delta = INTERVAL_DELTAS.get(interval, pd.Timedelta(hours=1))
+    seed = zlib.crc32(f"{symbol}|{interval}".encode())
+    last = (end - pd.Timestamp(0)) // delta
+    first = last - outputsize + 1
+    if start is not None:
+        first = max(first, -((pd.Timestamp(0) - start) // delta))
+    k = np.arange(first, last + 1, dtype=np.float64)
+    if k.size == 0:
+        return pd.DataFrame(columns=["open", "high", "low", "close"])
+
+    base = BASE_PRICES.get(symbol, 100.0)
+    close = base * _close(k, seed)
+    open_ = base * _close(k - 1, seed)
+    wick = base * 0.0015
+    frame = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + wick * _noise(k, seed + 1),
+        "low": np.minimum(open_, close) - wick * _noise(k, seed + 2),
+        "close": close,
+    }, index=pd.DatetimeIndex(pd.Timestamp(0) + delta * k.astype(np.int64), name="datetime"))
+    if "/" not in symbol:
+        frame["volume"] = np.round(1e6 * (0.5 + _noise(k, seed + 3)))
+    return frame.iloc[::-1]
+
+
+class _FixtureSeries:
+    def __init__(self, frame: pd.DataFrame):
+        self._frame = frame
+
+    def as_pandas(self) -> pd.DataFrame:
+        return self._frame.copy()
+
+
+class FixtureTDClient:
+    """Answers TDClient.time_series() calls from fixture files or synthetic bars."""
+
+    def __init__(self, fixture_dir: str | Path | None = None):
+        self.fixture_dir = Path(fixture_dir) if fixture_dir else None
+
+    def _fixture(self, symbol: str, interval: str) -> pd.DataFrame | None:
+        if self.fixture_dir is None:
+            return None
+        path = self.fixture_dir / f"{symbol.replace('/', '_')}_{interval}.csv"
+        if not path.exists():
+            return None
+        return pd.read_csv(path, index_col="datetime", parse_dates=True).sort_index(ascending=False)
+
+    def time_series(self, symbol: str, interval: str, outputsize: int = 30, exchange: str | None = None,
+                    timezone: str = "UTC", start_date: str | None = None, end_date: str | None = None,
+                    **kwargs) -> _FixtureSeries:
+        delta = INTERVAL_DELTAS.get(interval, pd.Timedelta(hours=1))
+        # Latest bar is the current one, as with the live API (pivots are relative to now)
+        end = pd.Timestamp(end_date) if end_date else pd.Timestamp.now(tz="UTC").tz_localize(None).floor(delta)
+        start = pd.Timestamp(start_date) if start_date else None
+
+        frame = self._fixture(symbol, interval)
+        if frame is None:
+            frame = synthetic_bars(symbol, interval, outputsize, end, start)
+        else:
+            frame = frame[frame.index <= end]
+            if start is not None:
+                frame = frame[frame.index >= start]
+            frame = frame.head(outputsize)
+
+        if timezone and timezone != "UTC" and not frame.empty:
+            frame.index = frame.index.tz_localize("UTC").tz_convert(timezone).tz_localize(None).rename("datetime")
+        return _FixtureSeries(frame)
@@ -1,8 +1,18 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import hashlib
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
 from langchain_core.messages import BaseMessage, AIMessage
 from typing import Literal
 from dotenv import load_dotenv
+
+from src.config.settings import LLM_POOL_IDLE_SECONDS, LLM_POOL_SIZE
+from src.utils.fake_llm import ScriptedChatModel, fake_model_latency, is_fake_model
 load_dotenv()
 
 gemini_model_map = {
@@ -12,6 +22,102 @@ gemini_model_map = {
     "3_flash": "models/gemini-3-flash-preview"
 }
 
+@dataclass
+class _PooledModel:
+    model: ChatGoogleGenerativeAI
+    loop: weakref.ref | None
+    last_used: float
+
+
+class ChatModelPool:
+    """Reusable Gemini chat models, so agent steps skip client setup and TLS handshakes.
+
+    Models are keyed by model name, a hash of the API key, their settings and
+    the running event loop (async HTTP connections cannot move between loops;
+    Streamlit runs every query in a new one). The pool is an LRU of bounded
+    size; models unused for `idle_seconds` or whose loop has closed are dropped.
+    """
+
+    def __init__(self, max_size: int = LLM_POOL_SIZE, idle_seconds: float = LLM_POOL_IDLE_SECONDS):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._models: OrderedDict[tuple, _PooledModel] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, model: str, api_key: str, **settings) -> ChatGoogleGenerativeAI:
+        """Get a pooled model, creating it on first use."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        key = (
+            model,
+            hashlib.sha256(api_key.encode()).hexdigest(),
+            tuple(sorted((name, repr(value)) for name, value in settings.items())),
+            id(loop) if loop is not None else None,
+        )
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict(now)
+            entry = self._models.get(key)
+            if entry is not None and (entry.loop() if entry.loop else None) is loop:
+                self._models.move_to_end(key)
+                entry.last_used = now
+                self.stats["hits"] += 1
+                return entry.model
+            self.stats["misses"] += 1
+
+        # Created outside the lock: client setup takes tens of milliseconds
+        chat_model = ChatGoogleGenerativeAI(model=model, api_key=api_key, **settings)
+        with self._lock:
+            self._models[key] = _PooledModel(chat_model, weakref.ref(loop) if loop is not None else None, now)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.stats["evictions"] += 1
+        return chat_model
+
+    def _evict(self, now: float) -> None:
+        """Drop idle models and models bound to a closed event loop."""
+        for key, entry in list(self._models.items()):
+            loop = entry.loop() if entry.loop else None
+            stale_loop = entry.loop is not None and (loop is None or loop.is_closed())
+            if stale_loop or now - entry.last_used > self.idle_seconds:
+                del self._models[key]
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+# Process-wide pool used by the agents and the helpers below
+_model_pool: ChatModelPool | None = None
+_model_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ChatModelPool:
+    """Get or create the process-wide chat model pool."""
+    global _model_pool
+    with _model_pool_lock:
+        if _model_pool is None:
+            _model_pool = ChatModelPool()
+    return _model_pool
+
+
+def get_chat_model(model: str, api_key: str, **settings) -> ChatGoogleGenerativeAI:
+    """A pooled ChatGoogleGenerativeAI for these arguments (see ChatModelPool).
+
+    Model names starting with "fake" (e.g. "fake:0.5") give the offline
+    ScriptedChatModel instead (see src.utils.fake_llm).
+    """
+    if is_fake_model(model):
+        return ScriptedChatModel(latency=fake_model_latency(model))
+    return get_model_pool().get(model, api_key, **settings)
+
+
 async def ainvoke_gemini_model(
     input: str | list[BaseMessage] | list[tuple[str, str]],
     model_type: Literal["2.5_pro", "2.5_flash", "3_pro"],
@@ -25,9 +131,9 @@ async def ainvoke_gemini_model(
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY environment variable not set")
 
-    llm = ChatGoogleGenerativeAI(
-        model=gemini_model_map[model_type],
-        api_key=api_key,
+    llm = get_chat_model(
+        gemini_model_map[model_type],
+        api_key,
         max_retries=0,
         **llm_kwargs,
     )
@@ -47,9 +153,9 @@ def invoke_gemini_model(
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY environment variable not set")
 
-    llm = ChatGoogleGenerativeAI(
-        model=gemini_model_map[model_type],
-        api_key=api_key,
+    llm = get_chat_model(
+        gemini_model_map[model_type],
+        api_key,
         max_retries=0,
         **llm_kwargs,
     )
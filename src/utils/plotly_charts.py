@@ -0,0 +1,217 @@
+"""Plotly backend for `ChartSpec` (interactive figure and optional static PNG)."""
+
+import importlib.util
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from src.utils.chart_spec import CHART_THEME, ChartSpec, with_alpha
+from src.utils.downsampling import ChartDownsampler, DownsampleMethod
+
+
+def create_plotly_figure(spec: ChartSpec, point_budget: int | None = None,
+                         downsample_method: DownsampleMethod = "lttb") -> go.Figure:
+    """Render a chart spec as an interactive Plotly figure.
+
+    When the frame holds more than `point_budget` bars, candles are aggregated
+    into coarser OHLC buckets, other traces are decimated onto the same buckets
+    and line traces switch to WebGL.
+    """
+    ds = ChartDownsampler(spec.frame, spec.date_labels, point_budget, downsample_method)
+    Line = go.Scattergl if ds.active else go.Scatter
+    num_rows = len(spec.panels)
+    total_height = sum(panel.height for panel in spec.panels)
+
+    fig = make_subplots(
+        rows=num_rows,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.03,
+        row_heights=[panel.height / total_height for panel in spec.panels],
+        subplot_titles=[panel.title for panel in spec.panels],
+    )
+
+    hover_format = f".{spec.decimal_places}f"
+
+    for row, panel in enumerate(spec.panels, start=1):
+        for series in panel.series:
+            if series.kind == "candlestick":
+                x, open_, high, low, close = ds.candles(series.columns)
+                fig.add_trace(
+                    go.Candlestick(
+                        x=x,
+                        open=open_,
+                        high=high,
+                        low=low,
+                        close=close,
+                        name=series.label,
+                        increasing_line_color=series.color,
+                        decreasing_line_color=series.down_color,
+                        increasing_fillcolor=series.color,
+                        decreasing_fillcolor=series.down_color,
+                    ),
+                    row=row, col=1
+                )
+            elif series.kind == "line":
+                x, y = ds.line(series.columns[0])
+                # Filled areas stay on SVG; scattergl fills are unreliable on category axes
+                trace = go.Scatter if series.fill_opacity else Line
+                fig.add_trace(
+                    trace(
+                        x=x,
+                        y=y,
+                        name=series.label,
+                        line=dict(color=series.color, width=series.width, dash=series.dash),
+                        fill="tozeroy" if series.fill_opacity else None,
+                        fillcolor=with_alpha(series.color, series.fill_opacity) if series.fill_opacity else None,
+                        hovertemplate=f"{series.label}: %{{y:{hover_format}}}<extra></extra>",
+                    ),
+                    row=row, col=1
+                )
+            elif series.kind == "band":
+                upper_col, lower_col = series.columns
+                x, upper, lower = ds.band(upper_col, lower_col)
+                line = dict(color=series.color, width=series.width, dash=series.dash)
+                fig.add_trace(
+                    go.Scatter(
+                        x=x,
+                        y=upper,
+                        name=upper_col.replace("_", " "),
+                        line=line,
+                        hovertemplate=f"{upper_col.replace('_', ' ')}: %{{y:{hover_format}}}<extra></extra>",
+                    ),
+                    row=row, col=1
+                )
+                fig.add_trace(
+                    go.Scatter(
+                        x=x,
+                        y=lower,
+                        name=lower_col.replace("_", " "),
+                        line=line,
+                        fill="tonexty",
+                        fillcolor=with_alpha(series.color, series.fill_opacity),
+                        hovertemplate=f"{lower_col.replace('_', ' ')}: %{{y:{hover_format}}}<extra></extra>",
+                    ),
+                    row=row, col=1
+                )
+            elif series.kind == "bar":
+                col = series.columns[0]
+                if series.color_by == "candle":
+                    x, y = ds.bars(col, "sum")
+                    is_up = ds.candle_up()
+                else:
+                    x, y = ds.bars(col, "extreme")
+                    is_up = y >= 0
+                colors = np.where(is_up, series.color, series.down_color or series.color)
+                value_format = ",.0f" if series.color_by == "candle" else hover_format
+                fig.add_trace(
+                    go.Bar(
+                        x=x,
+                        y=y,
+                        name=series.label,
+                        marker_color=colors,
+                        hovertemplate=f"{series.label}: %{{y:{value_format}}}<extra></extra>",
+                    ),
+                    row=row, col=1
+                )
+
+        for level in panel.levels:
+            fig.add_hline(
+                y=level.value,
+                line=dict(color=level.color, width=level.width, dash=level.dash),
+                annotation_text=level.text,
+                annotation_position="right",
+                annotation_font=dict(size=10, color=level.color),
+                row=row, col=1
+            )
+
+        if panel.y_range is not None:
+            fig.update_yaxes(range=list(panel.y_range), row=row, col=1)
+
+    if spec.shade_bars:
+        bucket = np.searchsorted(ds.starts, max(0, len(spec.frame) - spec.shade_bars), side="right") - 1
+        fig.add_vrect(
+            x0=ds.x[bucket],
+            x1=ds.x[-1],
+            fillcolor="blue", opacity=0.2, layer="below", line_width=0,
+        )
+
+    return apply_chart_theme(fig, num_rows, spec.theme_mode)
+
+
+def apply_chart_theme(fig: go.Figure, num_rows: int, theme_mode: str = "light") -> go.Figure:
+    """Apply theme styling to the chart."""
+    ct = CHART_THEME.get(theme_mode, CHART_THEME["light"])
+
+    fig.update_layout(
+        template=ct["template"],
+        paper_bgcolor=ct["paper_bg"],
+        plot_bgcolor=ct["plot_bg"],
+        font=dict(family="Inter, sans-serif", color=ct["font_color"], size=12),
+        xaxis_rangeslider_visible=False,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            bgcolor=ct["legend_bg"],
+            font=dict(size=10, color=ct["font_color"]),
+        ),
+        margin=dict(l=60, r=60, t=80, b=40),
+        hovermode="x unified",
+        height=600 + (num_rows - 1) * 180,
+    )
+
+    # Update all axes
+    for i in range(1, num_rows + 1):
+        fig.update_xaxes(
+            gridcolor=ct["grid"],
+            showgrid=True,
+            zeroline=False,
+            showline=True,
+            linecolor=ct["grid"],
+            type="category",
+            nticks=10,
+            tickangle=-45,
+            row=i, col=1
+        )
+        fig.update_yaxes(
+            gridcolor=ct["grid"],
+            showgrid=True,
+            zeroline=False,
+            showline=True,
+            linecolor=ct["grid"],
+            side="right",
+            row=i, col=1
+        )
+
+    # Hide x-axis labels for all but last row
+    for i in range(1, num_rows):
+        fig.update_xaxes(showticklabels=False, row=i, col=1)
+
+    # Timezone label
+    fig.add_annotation(
+        text="🕐 UTC+0",
+        xref="paper", yref="paper",
+        x=1, y=-0.06,
+        xanchor="right", yanchor="top",
+        showarrow=False,
+        font=dict(size=12, color=ct["font_color"]),
+        bgcolor=ct["legend_bg"],
+        bordercolor=ct["grid"],
+        borderwidth=1,
+        borderpad=4,
+        opacity=0.9,
+    )
+
+    return fig
+
+
+def render_plotly_png(spec: ChartSpec, width: int = 1600, scale: float = 1.0) -> bytes:
+    """Render the spec to PNG bytes through Plotly's static export (requires kaleido)."""
+    if importlib.util.find_spec("kaleido") is None:
+        raise RuntimeError("Plotly static export requires the 'kaleido' package. Install it or use the matplotlib renderer.")
+    fig = create_plotly_figure(spec)
+    return fig.to_image(format="png", width=width, scale=scale)
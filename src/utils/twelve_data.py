@@ -7,14 +7,28 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from typing import Literal
 import asyncio
-import time
+
+from src.utils.bar_store import BarStore
+from src.services.cancellation import check_cancelled, sleep_unless_cancelled
+from src.config.settings import FIXTURE_DATA_DIR, MARKET_DATA_SOURCE
 
 AssetType = Literal["forex", "commodity", "crypto", "stock"]
 
 
+def create_td_client():
+    """TwelveData client, or the offline fixture client when MARKET_DATA_SOURCE is "fixture"."""
+    if MARKET_DATA_SOURCE == "fixture":
+        from src.utils.fixture_data import FixtureTDClient
+        return FixtureTDClient(FIXTURE_DATA_DIR)
+    api_key = os.getenv("TD_API_KEY", None)
+    if not api_key:
+        raise ValueError("API key for TwelveData is not set in environment variables.")
+    return TDClient(apikey=api_key)
+
+
 class TwelveData:
 
-    def __init__(self, symbol: str, interval: str, outputsize: int = 400, exchange: str = None, start_date: str = None, end_date: str = None, timezone: str = "UTC", asset_type: AssetType = None):
+    def __init__(self, symbol: str, interval: str, outputsize: int = 400, exchange: str = None, start_date: str = None, end_date: str = None, timezone: str = "UTC", asset_type: AssetType = None, paginate: bool = False, bar_store: BarStore | None = None):
         self.symbol = symbol
         self.interval = interval
         self.outputsize = outputsize
@@ -23,14 +37,14 @@ class TwelveData:
         self.end_date = end_date
         self.timezone = timezone
         self.asset_type = asset_type
+        # Above one request (5000 bars), paginate and read/write the local bar store
+        self.paginate = paginate
+        self.bar_store = bar_store
         load_dotenv()
         self._init_client()
 
     def _init_client(self):
-        api_key = os.getenv("TD_API_KEY", None)
-        if not api_key:
-            raise ValueError("API key for TwelveData is not set in environment variables.")
-        self.client = TDClient(apikey=api_key)
+        self.client = create_td_client()
 
     def _filter_non_trading_hours(self, df: pd.DataFrame) -> pd.DataFrame:
         """Filter out non-trading hours for forex/commodity assets.
@@ -172,19 +186,22 @@ class TwelveData:
                 # For other assets, just add warmup buffer
                 fetch_size = self.outputsize + 200
 
-            # TwelveData API has a max of 5000 data points per request
-            fetch_size = min(fetch_size, 5000)
+            if self.paginate and fetch_size > TimeSeriesDownloader.MAX_BATCH_SIZE:
+                data = self._get_paginated_data(fetch_size)
+            else:
+                # TwelveData API has a max of 5000 data points per request
+                fetch_size = min(fetch_size, TimeSeriesDownloader.MAX_BATCH_SIZE)
 
-            # Fetch raw OHLC data
-            data = self.client.time_series(
-                symbol=self.symbol,
-                interval=self.interval,
-                outputsize=fetch_size,
-                exchange=self.exchange,
-                timezone=self.timezone,
-                start_date=self.start_date,
-                end_date=self.end_date,
-            ).as_pandas()
+                # Fetch raw OHLC data
+                data = self.client.time_series(
+                    symbol=self.symbol,
+                    interval=self.interval,
+                    outputsize=fetch_size,
+                    exchange=self.exchange,
+                    timezone=self.timezone,
+                    start_date=self.start_date,
+                    end_date=self.end_date,
+                ).as_pandas()
 
             # Reverse to oldest-first and reset index
             df = data[::-1].reset_index()
@@ -220,6 +237,54 @@ class TwelveData:
             print(f"Error fetching data with technical indicators: {e}")
             return None
 
+    def _get_paginated_data(self, fetch_size: int) -> pd.DataFrame:
+        """Raw bars beyond the 5000-per-request limit, newest first like the API.
+
+        Stored bars are used first: the API is only asked for bars newer than
+        the store, then for history older than it if still short. Each batch
+        is written to the store as it arrives.
+        """
+        store = self.bar_store
+        stored = store.load(self.symbol, self.interval, self.timezone) if store is not None else pd.DataFrame()
+        end = pd.Timestamp(self.end_date) if self.end_date else None
+        if end is not None and not stored.empty:
+            stored = stored[stored.index <= end]
+
+        downloader = TimeSeriesDownloader(
+            symbol=self.symbol,
+            interval=self.interval,
+            end_date=self.end_date,
+            output_size=fetch_size,
+            exchange=self.exchange,
+            timezone=self.timezone,
+        )
+
+        def fetch(**kwargs) -> list[pd.DataFrame]:
+            batches = []
+            for batch in downloader.iter_batches(**kwargs):
+                if store is not None:
+                    store.append(self.symbol, self.interval, self.timezone, batch)
+                batches.append(batch)
+            return batches
+
+        # Newest bars, back to where the stored range ends
+        batches = fetch(end_date=end, stop_at=stored.index.max() if not stored.empty else None)
+        combined = pd.concat([*batches, stored], axis=0) if batches or not stored.empty else pd.DataFrame()
+        if combined.empty:
+            return combined
+        combined = combined[~combined.index.duplicated(keep="first")].sort_index()
+
+        # Older history the store does not cover yet
+        if len(combined) < fetch_size and not stored.empty:
+            older_end = combined.index.min() - TimeSeriesDownloader.INTERVAL_DELTAS[self.interval]
+            older = fetch(end_date=older_end, output_size=fetch_size - len(combined))
+            if older:
+                combined = pd.concat([*older, combined], axis=0)
+                combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+
+        combined.index.name = "datetime"
+        return combined.tail(fetch_size)[::-1]
+
     def calculate_fibonacci_levels(self, df: pd.DataFrame, lookback: int = 50) -> dict:
         """Calculate Fibonacci retracement levels from recent high/low"""
         high = df['High'].iloc[-lookback:].max()
@@ -437,7 +502,7 @@ class TimeSeriesDownloader:
         self,
         symbol: str,
         interval: str,
-        end_date: str,
+        end_date: str | None,
         output_size: int = None,
         months: int = None,
         exchange: str = None,
@@ -450,7 +515,7 @@ class TimeSeriesDownloader:
         Args:
             symbol: Trading symbol (e.g., "EUR/USD", "AAPL", "BTC/USD")
             interval: Time interval (e.g., "1min", "1h", "1day")
-            end_date: End date in format "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"
+            end_date: End date in format "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" (None for latest)
             output_size: Total number of datapoints to download (ignored if months is set)
             months: Number of months of data to download (takes priority over output_size)
             exchange: Exchange name (default: None, auto-detected)
@@ -471,10 +536,7 @@ class TimeSeriesDownloader:
         self.output_size = self._calculate_output_size(output_size, months)
 
     def _init_client(self):
-        api_key = os.getenv("TD_API_KEY", None)
-        if not api_key:
-            raise ValueError("API key for TwelveData is not set in environment variables.")
-        self.client = TDClient(apikey=api_key)
+        self.client = create_td_client()
 
     def _validate_interval(self):
         if self.interval not in self.INTERVAL_DELTAS:
@@ -511,8 +573,8 @@ class TimeSeriesDownloader:
         # Move back by batch_size intervals
         return current_end - (delta * batch_size)
 
-    def _fetch_batch(self, end_date: str, batch_size: int) -> pd.DataFrame:
-        """Fetch a single batch of data from the API."""
+    def _fetch_batch(self, end_date: str | None, batch_size: int) -> pd.DataFrame:
+        """Fetch a single batch of data from the API (latest bars if end_date is None)."""
         try:
             data = self.client.time_series(
                 symbol=self.symbol,
@@ -524,61 +586,88 @@ class TimeSeriesDownloader:
             ).as_pandas()
 
             if data is not None and not data.empty:
-                data.columns = ["Open", "High", "Low", "Close"]
+                data.columns = ["Open", "High", "Low", "Close", "Volume"][:len(data.columns)]
                 return data
             return pd.DataFrame()
         except Exception as e:
             print(f"Error fetching batch ending at {end_date}: {e}")
             return pd.DataFrame()
 
-    def download(self, delay_between_requests: float = 1.0) -> pd.DataFrame:
+    def iter_batches(
+        self,
+        end_date: datetime | None = None,
+        output_size: int | None = None,
+        stop_at: datetime | None = None,
+        delay_between_requests: float = 1.0,
+    ):
         """
-        Download the full dataset by making multiple API requests if needed.
+        Yield batches going back in time, newest first, as they arrive.
 
         Args:
+            end_date: Newest bar to fetch (default: latest available)
+            output_size: Datapoints to fetch in total (default: self.output_size)
+            stop_at: Stop once a batch reaches this date (e.g. bars already stored locally)
             delay_between_requests: Seconds to wait between API calls (default: 1.0)
 
-        Returns:
-            DataFrame with all downloaded data, sorted from oldest to newest.
+        Yields:
+            One DataFrame per API request (index: datetime, newest first)
         """
-        all_data = []
-        remaining = self.output_size
-        current_end_date = self._parse_date(self.end_date)
+        remaining = self.output_size if output_size is None else output_size
+        current_end_date = end_date
         batch_num = 0
 
-        print(f"Starting download: {self.symbol} @ {self.interval}")
-        print(f"Target: {self.output_size} datapoints, ending at {self.end_date}")
-
         while remaining > 0:
             batch_size = min(remaining, self.MAX_BATCH_SIZE)
             batch_num += 1
+            end_str = self._format_date(current_end_date) if current_end_date is not None else None
 
-            print(f"  Batch {batch_num}: Fetching {batch_size} points ending at {self._format_date(current_end_date)}...")
+            # Stops here once the task downloading this data was cancelled
+            check_cancelled()
+            print(f"  Batch {batch_num}: Fetching {batch_size} points ending at {end_str or 'latest'}...")
 
-            df = self._fetch_batch(self._format_date(current_end_date), batch_size)
+            df = self._fetch_batch(end_str, batch_size)
 
             if df.empty:
                 print(f"  Warning: Empty response for batch {batch_num}. Stopping.")
-                break
+                return
 
             actual_fetched = len(df)
-            all_data.append(df)
             remaining -= actual_fetched
-
             print(f"  Batch {batch_num}: Got {actual_fetched} points. Remaining: {remaining}")
+            yield df
 
             if actual_fetched < batch_size:
                 print(f"  Note: Received fewer points than requested. No more historical data available.")
-                break
+                return
+
+            # Get the oldest date from the current batch and move back one interval
+            oldest_in_batch = df.index.min()
+            if isinstance(oldest_in_batch, str):
+                oldest_in_batch = self._parse_date(oldest_in_batch)
+            if stop_at is not None and oldest_in_batch <= stop_at:
+                return
 
             if remaining > 0:
-                # Get the oldest date from the current batch and move back one interval
-                oldest_in_batch = df.index.min()
-                if isinstance(oldest_in_batch, str):
-                    oldest_in_batch = self._parse_date(oldest_in_batch)
                 current_end_date = oldest_in_batch - self.INTERVAL_DELTAS[self.interval]
+                sleep_unless_cancelled(delay_between_requests)
+
+    def download(self, delay_between_requests: float = 1.0) -> pd.DataFrame:
+        """
+        Download the full dataset by making multiple API requests if needed.
+
+        Args:
+            delay_between_requests: Seconds to wait between API calls (default: 1.0)
+
+        Returns:
+            DataFrame with all downloaded data, sorted from oldest to newest.
+        """
+        print(f"Starting download: {self.symbol} @ {self.interval}")
+        print(f"Target: {self.output_size} datapoints, ending at {self.end_date}")
 
-                time.sleep(delay_between_requests)
+        all_data = list(self.iter_batches(
+            end_date=self._parse_date(self.end_date) if self.end_date else None,
+            delay_between_requests=delay_between_requests,
+        ))
 
         if not all_data:
             print("No data downloaded.")
@@ -54,10 +54,6 @@ def initialize_session_state():
         "max_concurrent_tasks": 4,
         "agent_model_label": "Gemini 3 Flash",
         "subagent_model_label": "Gemini 3 Flash",
-        # Pending actions (queued during streaming)
-        "pending_load_chart": False,
-        "pending_clear_conversation": False,
-        "pending_chart_settings": None,
         # Pending prompt (set before rerun to ensure sidebar is disabled)
         "pending_prompt": None,
         "pending_prompt_settings": None,
@@ -608,25 +604,9 @@ def main():
 
     # Handle load chart button
     if settings["load_clicked"]:
-        if st.session_state.get("is_streaming", False):
-            # Queue the load for when streaming finishes
-            st.session_state.pending_load_chart = True
-            st.session_state.pending_chart_settings = settings.copy()
-            st.toast("Chart will load after agent finishes")
-        else:
-            success = load_chart_data(settings)
-            if success:
-                st.rerun()
-
-    # Process queued chart load (after streaming completed)
-    if st.session_state.get("pending_load_chart") and not st.session_state.get("is_streaming"):
-        st.session_state.pending_load_chart = False
-        pending_settings = st.session_state.get("pending_chart_settings")
-        if pending_settings:
-            st.session_state.pending_chart_settings = None
-            success = load_chart_data(pending_settings)
-            if success:
-                st.rerun()
+        success = load_chart_data(settings)
+        if success:
+            st.rerun()
 
     # Chart section
     render_chart_section(settings)
@@ -2,9 +2,10 @@
 
 import pandas as pd
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
-from streamlit_app.utils.styles import CHART_COLORS, CHART_THEME
+from src.config.settings import CHART_POINT_BUDGET, CHART_DOWNSAMPLE_METHOD
+from src.utils.chart_spec import build_chart_spec, normalize_chart_frame, format_date_labels
+from src.utils.plotly_charts import create_plotly_figure
 
 
 def prepare_chart_data(df: pd.DataFrame, interval: str) -> pd.DataFrame:
@@ -12,30 +13,14 @@ def prepare_chart_data(df: pd.DataFrame, interval: str) -> pd.DataFrame:
 
     Notes:
         - This function intentionally does NOT filter out any timestamps.
-        - The x-axis is rendered as categorical (see apply_dark_theme), so
+        - The x-axis is rendered as categorical (see plotly_charts.apply_chart_theme), so
           missing timestamps won't create visual gaps.
     """
     if df is None or df.empty:
         return df
 
-    df = df.copy()
-
-    # Ensure we have a Date column (some pipelines keep Date in the index)
-    if "Date" not in df.columns:
-        if isinstance(df.index, pd.DatetimeIndex):
-            df["Date"] = df.index
-        else:
-            df["Date"] = pd.to_datetime(df.index, errors="coerce")
-    else:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-    # Create a unique, readable label for categorical x-axis.
-    # Include year to avoid collisions across longer ranges.
-    if interval in ["1day", "1week", "1month"]:
-        df["DateLabel"] = df["Date"].dt.strftime("%Y-%m-%d")
-    else:
-        df["DateLabel"] = df["Date"].dt.strftime("%Y-%m-%d %H:%M")
-
+    df = normalize_chart_frame(df)
+    df["DateLabel"] = format_date_labels(df["Date"], interval)
     return df
 
 
@@ -50,310 +35,30 @@ def create_candlestick_chart(
     """
     Create an interactive Plotly candlestick chart with technical indicators.
 
+    The chart is built from the same ChartSpec the chart agents render, so the
+    user and the model see the same panels, colours and levels. Beyond
+    CHART_POINT_BUDGET bars the figure is downsampled before it is sent to the browser.
+
     Args:
         df: DataFrame with OHLC data and indicators
         symbol: Trading symbol for title
         interval: Time interval for title
         indicators: Dict of indicator toggles (e.g., {"ema_20": True, "rsi": True})
-        pivot_levels: Optional pivot point levels
+        pivot_levels: Optional pivot point levels (drawn when the "pivot" toggle is on)
         theme_mode: "light" or "dark"
 
     Returns:
         Plotly Figure object
     """
-    # Data is already cleaned upstream; just normalize Date/labels for plotting.
-    df = prepare_chart_data(df, interval)
-
-    # Determine subplot configuration
-    subplot_indicators = []
-    has_volume = "Volume" in df.columns and df["Volume"].notna().any()
-
-    if has_volume and indicators.get("volume", True):
-        subplot_indicators.append("Volume")
-    if indicators.get("rsi"):
-        subplot_indicators.append("RSI")
-    if indicators.get("macd"):
-        subplot_indicators.append("MACD")
-    if indicators.get("atr"):
-        subplot_indicators.append("ATR")
-
-    num_rows = 1 + len(subplot_indicators)
-
-    # Calculate row heights - main chart gets more space
-    if num_rows == 1:
-        row_heights = [1.0]
-    else:
-        main_height = 0.6
-        subplot_height = (1 - main_height) / len(subplot_indicators)
-        row_heights = [main_height] + [subplot_height] * len(subplot_indicators)
-
-    # Create subplots
-    fig = make_subplots(
-        rows=num_rows,
-        cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.03,
-        row_heights=row_heights,
-        subplot_titles=[f"{symbol} ({interval})"] + subplot_indicators,
+    spec = build_chart_spec(
+        df,
+        symbol=symbol,
+        interval=interval,
+        indicators={"volume": True, **indicators},
+        pivot_levels=pivot_levels if indicators.get("pivot") else None,
+        theme_mode=theme_mode,
     )
-
-    # === Main Candlestick Chart (Row 1) ===
-    fig.add_trace(
-        go.Candlestick(
-            x=df["DateLabel"],
-            open=df["Open"],
-            high=df["High"],
-            low=df["Low"],
-            close=df["Close"],
-            name="OHLC",
-            increasing_line_color=CHART_COLORS["candle_up"],
-            decreasing_line_color=CHART_COLORS["candle_down"],
-            increasing_fillcolor=CHART_COLORS["candle_up"],
-            decreasing_fillcolor=CHART_COLORS["candle_down"],
-        ),
-        row=1, col=1
-    )
-
-    # === EMA Overlays ===
-    ema_configs = [
-        ("ema_10", "EMA10", CHART_COLORS["ema_10"], 1),
-        ("ema_20", "EMA20", CHART_COLORS["ema_20"], 1),
-        ("ema_50", "EMA50", CHART_COLORS["ema_50"], 1.5),
-        ("ema_100", "EMA100", CHART_COLORS["ema_100"], 1.5),
-    ]
-
-    for key, col, color, width in ema_configs:
-        if indicators.get(key) and col in df.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=df["DateLabel"],
-                    y=df[col],
-                    name=col,
-                    line=dict(color=color, width=width),
-                    hovertemplate=f"{col}: %{{y:.4f}}<extra></extra>",
-                ),
-                row=1, col=1
-            )
-
-    # === Bollinger Bands ===
-    ct = CHART_THEME.get(theme_mode, CHART_THEME["light"])
-
-    if indicators.get("bb") and "BB_Upper" in df.columns:
-        bb_fill_opacity = ct["bb_fill_opacity"]
-        # Upper band
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["BB_Upper"],
-                name="BB Upper",
-                line=dict(color=CHART_COLORS["bb_band"], width=1, dash="dash"),
-                hovertemplate="BB Upper: %{y:.4f}<extra></extra>",
-            ),
-            row=1, col=1
-        )
-        # Lower band
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["BB_Lower"],
-                name="BB Lower",
-                line=dict(color=CHART_COLORS["bb_band"], width=1, dash="dash"),
-                fill="tonexty",
-                fillcolor=f"rgba(96, 125, 139, {bb_fill_opacity})",
-                hovertemplate="BB Lower: %{y:.4f}<extra></extra>",
-            ),
-            row=1, col=1
-        )
-        # Middle band (SMA)
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["BB_Middle"],
-                name="BB Middle",
-                line=dict(color=CHART_COLORS["bb_middle"], width=1),
-                hovertemplate="BB Middle: %{y:.4f}<extra></extra>",
-            ),
-            row=1, col=1
-        )
-
-    # === Pivot Points ===
-    # Pivot values are displayed in the header area (app.py) when enabled
-
-    # === Subplot Indicators ===
-    current_row = 2
-
-    # Volume
-    if "Volume" in subplot_indicators:
-        colors = [
-            CHART_COLORS["volume_up"] if close >= open_
-            else CHART_COLORS["volume_down"]
-            for close, open_ in zip(df["Close"], df["Open"])
-        ]
-        fig.add_trace(
-            go.Bar(
-                x=df["DateLabel"],
-                y=df["Volume"],
-                name="Volume",
-                marker_color=colors,
-                hovertemplate="Volume: %{y:,.0f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-        current_row += 1
-
-    # RSI
-    if "RSI" in subplot_indicators and "RSI14" in df.columns:
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["RSI14"],
-                name="RSI(14)",
-                line=dict(color=CHART_COLORS["rsi"], width=1.5),
-                hovertemplate="RSI: %{y:.2f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-        # Overbought/Oversold lines
-        fig.add_hline(y=70, line=dict(color=CHART_COLORS["rsi_overbought"], width=1, dash="dash"), row=current_row, col=1)
-        fig.add_hline(y=30, line=dict(color=CHART_COLORS["rsi_oversold"], width=1, dash="dash"), row=current_row, col=1)
-        fig.add_hline(y=50, line=dict(color=ct["ref_line"], width=1, dash="dot"), row=current_row, col=1)
-
-        # Update RSI y-axis range
-        fig.update_yaxes(range=[0, 100], row=current_row, col=1)
-        current_row += 1
-
-    # MACD
-    if "MACD" in subplot_indicators and "MACD" in df.columns:
-        # MACD line
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["MACD"],
-                name="MACD",
-                line=dict(color=CHART_COLORS["macd_line"], width=1.5),
-                hovertemplate="MACD: %{y:.4f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-        # Signal line
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["MACD_Signal"],
-                name="Signal",
-                line=dict(color=CHART_COLORS["macd_signal"], width=1.5),
-                hovertemplate="Signal: %{y:.4f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-        # Histogram
-        hist_colors = [
-            CHART_COLORS["macd_hist_pos"] if val >= 0 else CHART_COLORS["macd_hist_neg"]
-            for val in df["MACD_Diff"]
-        ]
-        fig.add_trace(
-            go.Bar(
-                x=df["DateLabel"],
-                y=df["MACD_Diff"],
-                name="Histogram",
-                marker_color=hist_colors,
-                hovertemplate="Hist: %{y:.4f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-        # Zero line
-        fig.add_hline(y=0, line=dict(color=ct["ref_line"], width=1), row=current_row, col=1)
-        current_row += 1
-
-    # ATR
-    if "ATR" in subplot_indicators and "ATR" in df.columns:
-        atr_fill_opacity = ct["atr_fill_opacity"]
-        fig.add_trace(
-            go.Scatter(
-                x=df["DateLabel"],
-                y=df["ATR"],
-                name="ATR(14)",
-                line=dict(color=CHART_COLORS["atr"], width=1.5),
-                fill="tozeroy",
-                fillcolor=f"rgba(41, 182, 246, {atr_fill_opacity})",
-                hovertemplate="ATR: %{y:.4f}<extra></extra>",
-            ),
-            row=current_row, col=1
-        )
-
-    # === Apply Chart Theme ===
-    fig = apply_chart_theme(fig, num_rows, theme_mode)
-
-    return fig
-
-
-def apply_chart_theme(fig: go.Figure, num_rows: int, theme_mode: str = "light") -> go.Figure:
-    """Apply theme styling to the chart."""
-    ct = CHART_THEME.get(theme_mode, CHART_THEME["light"])
-
-    fig.update_layout(
-        template=ct["template"],
-        paper_bgcolor=ct["paper_bg"],
-        plot_bgcolor=ct["plot_bg"],
-        font=dict(family="Inter, sans-serif", color=ct["font_color"], size=12),
-        xaxis_rangeslider_visible=False,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1,
-            bgcolor=ct["legend_bg"],
-            font=dict(size=10, color=ct["font_color"]),
-        ),
-        margin=dict(l=60, r=60, t=80, b=40),
-        hovermode="x unified",
-        height=600 + (num_rows - 1) * 180,
-    )
-
-    # Update all axes
-    for i in range(1, num_rows + 1):
-        fig.update_xaxes(
-            gridcolor=ct["grid"],
-            showgrid=True,
-            zeroline=False,
-            showline=True,
-            linecolor=ct["grid"],
-            type="category",
-            nticks=10,
-            tickangle=-45,
-            row=i, col=1
-        )
-        fig.update_yaxes(
-            gridcolor=ct["grid"],
-            showgrid=True,
-            zeroline=False,
-            showline=True,
-            linecolor=ct["grid"],
-            side="right",
-            row=i, col=1
-        )
-
-    # Hide x-axis labels for all but last row
-    for i in range(1, num_rows):
-        fig.update_xaxes(showticklabels=False, row=i, col=1)
-
-    # Timezone label
-    fig.add_annotation(
-        text="🕐 UTC+0",
-        xref="paper", yref="paper",
-        x=1, y=-0.06,
-        xanchor="right", yanchor="top",
-        showarrow=False,
-        font=dict(size=12, color=ct["font_color"]),
-        bgcolor=ct["legend_bg"],
-        bordercolor=ct["grid"],
-        borderwidth=1,
-        borderpad=4,
-        opacity=0.9,
-    )
-
-    return fig
+    return create_plotly_figure(spec, point_budget=CHART_POINT_BUDGET, downsample_method=CHART_DOWNSAMPLE_METHOD)
 
 
 def get_latest_values(df: pd.DataFrame) -> dict:
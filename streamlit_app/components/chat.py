@@ -1,6 +1,7 @@
 """Chat interface component with streaming display and task iteration grouping."""
 
 import uuid
+from contextlib import aclosing
 from datetime import datetime, timezone
 import streamlit as st
 from typing import Any
@@ -9,9 +10,13 @@ from collections import defaultdict
 from streamlit_app.services.agent_service import (
     StreamEvent,
     stream_agent_response,
+    stream_until_cancelled,
     create_context,
 )
 
+# Lines of streamed sandbox output kept visible under a running quant task
+LIVE_OUTPUT_LINES = 30
+
 
 def initialize_chat_state():
     """Initialize chat-related session state."""
@@ -109,6 +114,17 @@ def render_iteration_header(iteration_num: int, tasks: list):
     return f"**🔄 Investigation Round {iteration_num}** ({total} tasks) — {counts_text} — {status}"
 
 
+def format_task_usage(usage: dict | None) -> str:
+    """One-line time / token summary of a task."""
+    if not usage:
+        return ""
+    queued = f" (queued {usage['queue_seconds']:.1f}s)" if usage["queue_seconds"] >= 0.1 else ""
+    return (
+        f"⏱️ {usage['seconds']:.1f}s{queued} · {usage['model_calls']} model calls · "
+        f"{usage['input_tokens']:,} in / {usage['output_tokens']:,} out tokens"
+    )
+
+
 def render_iteration_details(tasks: list):
     """Render task details inside an expander."""
     for idx, task in enumerate(tasks):
@@ -133,6 +149,8 @@ def render_iteration_details(tasks: list):
         # Result if available
         if result:
             st.markdown(result)
+        if task.get("usage"):
+            st.caption(format_task_usage(task["usage"]))
 
         if idx < len(tasks) - 1:
             st.markdown("---")
@@ -320,6 +338,28 @@ def finalize_iteration_to_history():
     st.session_state.current_iteration = None
 
 
+def get_running_task_placeholder(task_call_id: str | None) -> tuple[dict | None, dict | None]:
+    """Current iteration and result placeholder of a displayed task still running."""
+    iteration = st.session_state.current_iteration
+    if not iteration or not iteration.get("displayed"):
+        return iteration, None
+    result_info = iteration["result_placeholders"].get(task_call_id)
+    if not result_info or result_info["task"].get("result") is not None:
+        return iteration, None
+    return iteration, result_info
+
+
+def render_live_task(iteration: dict, task_call_id: str, result_info: dict):
+    """Render a running task's streamed subagent text and sandbox output."""
+    live_text = iteration.get("live_text", {}).get(task_call_id)
+    live_output = iteration.get("live_output", {}).get(task_call_id)
+    with result_info["placeholder"].container():
+        if live_text:
+            st.markdown(live_text)
+        if live_output:
+            st.code(live_output, language=None)
+
+
 def handle_stream_event(event: StreamEvent, placeholders: dict):
     """
     Handle a streaming event and update UI accordingly.
@@ -381,8 +421,10 @@ def handle_stream_event(event: StreamEvent, placeholders: dict):
                 if iteration and iteration.get("displayed"):
                     result_info = iteration["result_placeholders"].get(event.tool_call_id)
                     if result_info:
-                        with result_info["placeholder"]:
+                        with result_info["placeholder"].container():
                             st.markdown(event.content)
+                            if task_data.get("usage"):
+                                st.caption(format_task_usage(task_data["usage"]))
 
                     # Update header with new completion count
                     if iteration.get("header_placeholder"):
@@ -392,6 +434,43 @@ def handle_stream_event(event: StreamEvent, placeholders: dict):
                         )
                         iteration["header_placeholder"].markdown(header)
 
+    elif event.event_type == "task_usage":
+        # Arrives just before the task's result, which renders it
+        task_data = st.session_state.pending_tasks.get(event.task_call_id)
+        if task_data is not None:
+            task_data["usage"] = event.content
+
+    elif event.event_type == "subagent_token":
+        # Subagent reply streaming under its task, replaced by the task result when it arrives
+        iteration, result_info = get_running_task_placeholder(event.task_call_id)
+        if result_info is None:
+            return
+        live_text = iteration.setdefault("live_text", {})
+        live_agent = iteration.setdefault("live_agent", {})
+        text = live_text.get(event.task_call_id, "")
+        if live_agent.get(event.task_call_id) not in (None, event.tool_name):
+            # Next subagent of the task (chart analysis after the chart description)
+            text += "\n\n---\n\n"
+        live_agent[event.task_call_id] = event.tool_name
+        live_text[event.task_call_id] = text + (event.content or "")
+        render_live_task(iteration, event.task_call_id, result_info)
+
+    elif event.event_type in ("sandbox_output", "sandbox_result"):
+        # Live output of a quant task's running code, replaced by the task result when it arrives
+        iteration, result_info = get_running_task_placeholder(event.task_call_id)
+        if result_info is None:
+            return
+
+        if event.event_type == "sandbox_result":
+            result = event.content or {}
+            text = f"[{result.get('name') or result.get('kind')}]\n{result.get('text', '')}\n"
+        else:
+            text = event.content or ""
+        lines = (iteration.setdefault("live_output", {}).get(event.task_call_id, "") + text).splitlines()
+        live_output = "\n".join(lines[-LIVE_OUTPUT_LINES:]) + "\n"
+        iteration["live_output"][event.task_call_id] = live_output
+        render_live_task(iteration, event.task_call_id, result_info)
+
     elif event.event_type == "todos":
         with placeholders["todos"]:
             st.write("**Current Investigation Plan:**")
@@ -504,29 +583,28 @@ async def process_user_input(
         with status_placeholder:
             st.info("Agent is analyzing...", icon=":material/psychology:")
 
-        async for event in stream_agent_response(enhanced_query, context, st.session_state.thread_id):
-            handle_stream_event(event, placeholders)
+        def check_cancelled():
+            # Reading session state is a Streamlit yield point: a pending rerun (Clear
+            # Conversation or Load Chart was clicked) raises here, which cancels the run
+            st.session_state.get("is_streaming")
 
-            if event.event_type == "done":
-                # Show any remaining iteration and finalize
-                show_iteration_immediately(placeholders)
-                finalize_iteration_to_history()
-                status_placeholder.empty()
+        events = stream_until_cancelled(
+            stream_agent_response(enhanced_query, context, st.session_state.thread_id), check_cancelled
+        )
+        async with aclosing(events):
+            async for event in events:
+                handle_stream_event(event, placeholders)
+
+                if event.event_type == "done":
+                    # Show any remaining iteration and finalize
+                    show_iteration_immediately(placeholders)
+                    finalize_iteration_to_history()
+                    status_placeholder.empty()
 
     finally:
         # Always clear streaming flag
         st.session_state.is_streaming = False
 
-        # Process any queued actions or just rerun to re-enable controls
-        if st.session_state.get("pending_clear_conversation"):
-            st.session_state.pending_clear_conversation = False
-            st.session_state.messages = []
-            st.session_state.pending_tasks = {}
-            st.session_state.thread_id = str(uuid.uuid4())
-            st.rerun()
-        elif st.session_state.get("pending_load_chart"):
-            st.session_state.pending_load_chart = False
-            st.rerun()
-        else:
-            # Rerun to re-enable sidebar controls
-            st.rerun()
+    # Rerun to re-enable sidebar controls. Not reached when a click interrupted the
+    # run: Streamlit is already rerunning with that click.
+    st.rerun()
@@ -17,6 +17,19 @@ def _is_streaming() -> bool:
     return st.session_state.get("is_streaming", False)
 
 
+def _abandon_agent_run():
+    """Drop the running or queued agent run.
+
+    The click that got here interrupted the script run that was streaming,
+    which cancelled the agent run (see process_user_input); this forgets it.
+    """
+    st.session_state.is_streaming = False
+    st.session_state.pending_prompt = None
+    st.session_state.pending_prompt_settings = None
+    st.session_state.current_iteration = None
+    st.session_state.pending_tasks = {}
+
+
 def render_sidebar() -> dict:
     """
     Render the sidebar with all input controls.
@@ -47,7 +60,7 @@ def render_sidebar() -> dict:
 
         # Show warning when agent is working
         if _is_streaming():
-            st.warning("Agent working... Controls disabled", icon=":material/hourglass_empty:")
+            st.warning("Agent working... Load Chart or Clear Conversation stops it", icon=":material/hourglass_empty:")
 
         st.divider()
 
@@ -87,7 +100,7 @@ def render_sidebar() -> dict:
             chart_size = st.number_input(
                 "Bars",
                 min_value=50,
-                max_value=300,
+                max_value=5000,
                 value=100,
                 step=10,
                 help="Number of candlesticks",
@@ -130,8 +143,7 @@ def render_sidebar() -> dict:
             "Load Chart",
             type="primary",
             use_container_width=True,
-            help="Fetch data and render chart" if not _is_streaming() else "Please wait for agent to finish",
-            disabled=_is_streaming()
+            help="Fetch data and render chart" if not _is_streaming() else "Stop the agent and load the chart",
         )
 
         # Show status
@@ -145,20 +157,17 @@ def render_sidebar() -> dict:
             "Clear Conversation",
             type="secondary",
             use_container_width=True,
-            help="Clear chat history and start fresh" if not _is_streaming() else "Please wait for agent to finish",
-            disabled=_is_streaming()
+            help="Clear chat history and start fresh" if not _is_streaming() else "Stop the agent and clear chat history",
         )
 
+        if (load_clicked or clear_clicked) and _is_streaming():
+            _abandon_agent_run()
+
         if clear_clicked:
-            if _is_streaming():
-                # Queue the clear for when streaming finishes
-                st.session_state.pending_clear_conversation = True
-                st.toast("Will clear after agent finishes")
-            else:
-                st.session_state.messages = []
-                st.session_state.pending_tasks = {}
-                st.session_state.thread_id = str(uuid.uuid4())  # New thread for fresh conversation
-                st.rerun()
+            st.session_state.messages = []
+            st.session_state.pending_tasks = {}
+            st.session_state.thread_id = str(uuid.uuid4())  # New thread for fresh conversation
+            st.rerun()
 
         # === Return Settings ===
         # Get API key from session state (set during landing page)
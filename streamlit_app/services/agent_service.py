@@ -1,22 +1,37 @@
 """Agent service for handling orchestrator agent streaming."""
 
 import asyncio
-from typing import AsyncGenerator, Any
+from contextlib import aclosing
+from typing import AsyncGenerator, Any, Callable
 from dataclasses import dataclass
 
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 
 from src.agents.orchestrator import orchestrator_agent
 from src.states_and_contexts.technical_analysis import OrchestratorContext
+from src.services.usage import get_usage_tracker
+
+
+# Longest stream_until_cancelled waits for an event before checking for cancellation
+CANCEL_POLL_SECONDS = 0.5
+
+# Custom stream events passed on to the UI, with the tool writing them
+CUSTOM_EVENT_TOOLS = {
+    "sandbox_output": "write_code",
+    "sandbox_result": "write_code",
+    "task_usage": "task",
+    "subagent_token": "task",
+}
 
 
 @dataclass
 class StreamEvent:
     """Represents a streaming event from the agent."""
-    event_type: str  # "tool_call", "tool_result", "text", "thinking", "todos", "task", "done"
+    event_type: str  # "tool_call", "tool_result", "text", "thinking", "todos", "task", "sandbox_output", "sandbox_result", "task_usage", "subagent_token", "done"
     content: Any
-    tool_name: str | None = None
+    tool_name: str | None = None  # For subagent_token: the streaming subagent ("description", "analysis", "merged", "quantitative")
     tool_call_id: str | None = None  # For matching task results to task calls
+    task_call_id: str | None = None  # Orchestrator task a subagent event belongs to
 
 
 async def stream_agent_response(
@@ -38,26 +53,43 @@ async def stream_agent_response(
     human_message = HumanMessage(content=query)
 
     try:
-        # Use stream_mode="updates" to get step-by-step updates
-        async for event in orchestrator_agent.astream(
+        # "updates" gives step-by-step orchestrator updates; "custom" carries events
+        # written by tools of subagents (e.g. streamed sandbox output), which only
+        # reach this stream with subgraphs=True. aclosing: a consumer that stops
+        # early closes the run, cancelling its running tasks.
+        async with aclosing(orchestrator_agent.astream(
             {"messages": [human_message]},
             config={"configurable": {"thread_id": thread_id}},
             context=context,
-            stream_mode="updates"
-        ):
-            # Process each node's output
-            for node_name, node_output in event.items():
-                if "messages" in node_output:
-                    for msg in node_output["messages"]:
-                        for event in process_message(msg, node_name):
-                            yield event
-
-                # Handle todo updates
-                if "todos" in node_output:
-                    yield StreamEvent(
-                        event_type="todos",
-                        content=node_output["todos"]
-                    )
+            stream_mode=["updates", "custom"],
+            subgraphs=True,
+        )) as stream:
+            async for namespace, mode, event in stream:
+                if mode == "custom":
+                    custom_event = process_custom_event(event)
+                    if custom_event is not None:
+                        yield custom_event
+                    continue
+                if namespace:
+                    # Subagent internals; their final answers arrive as task results
+                    continue
+
+                # Process each node's output
+                for node_name, node_output in event.items():
+                    if not node_output:
+                        # Middleware hooks that changed nothing (e.g. context compaction)
+                        continue
+                    if "messages" in node_output:
+                        for msg in node_output["messages"]:
+                            for event in process_message(msg, node_name):
+                                yield event
+
+                    # Handle todo updates
+                    if "todos" in node_output:
+                        yield StreamEvent(
+                            event_type="todos",
+                            content=node_output["todos"]
+                        )
 
         yield StreamEvent(event_type="done", content=None)
 
@@ -77,6 +109,62 @@ async def stream_agent_response(
         )
 
 
+async def stream_until_cancelled(
+    events: AsyncGenerator[StreamEvent, None],
+    check_cancelled: Callable[[], None],
+    poll_seconds: float = CANCEL_POLL_SECONDS,
+) -> AsyncGenerator[StreamEvent, None]:
+    """
+    Yield the events of stream_agent_response, calling check_cancelled while waiting.
+
+    check_cancelled stops the run by raising. The run is then cancelled rather
+    than left running: its subagent tasks, downloads and sandbox snippets stop
+    (see src.services.cancellation). Consume it with contextlib.aclosing so a
+    consumer that raises cancels the run as well.
+
+    Args:
+        events: Stream from stream_agent_response
+        check_cancelled: Raises if the consumer has gone away
+        poll_seconds: Longest wait between checks
+
+    Yields:
+        The StreamEvents of `events`
+    """
+    pending = None
+    try:
+        while True:
+            check_cancelled()
+            pending = asyncio.ensure_future(anext(events))
+            while not pending.done():
+                await asyncio.wait({pending}, timeout=poll_seconds)
+                if not pending.done():
+                    check_cancelled()
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            pending = None
+            yield event
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.wait({pending})
+        await events.aclose()
+
+
+def process_custom_event(event: Any) -> StreamEvent | None:
+    """Convert a custom stream event written by a tool into a StreamEvent."""
+    if not isinstance(event, dict) or event.get("type") not in CUSTOM_EVENT_TOOLS:
+        return None
+    return StreamEvent(
+        event_type=event["type"],
+        content=event.get("content"),
+        tool_name=event.get("agent") or CUSTOM_EVENT_TOOLS[event["type"]],
+        tool_call_id=event.get("tool_call_id"),
+        task_call_id=event.get("task_call_id"),
+    )
+
+
 def process_message(msg: Any, node_name: str) -> list[StreamEvent]:
     """Process a message and yield appropriate events."""
     events = []
@@ -193,6 +281,11 @@ def run_agent_sync(
     return final_response
 
 
+def get_thread_usage(thread_id: str) -> dict | None:
+    """Token and latency totals of a conversation, per agent, tool and task."""
+    return get_usage_tracker().summary(thread_id)
+
+
 def create_context(
     gemini_api_key: str,
     min_research_iterations: int = 2,
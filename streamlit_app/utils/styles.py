@@ -1,5 +1,7 @@
 """Theme styling for Tradable Mind Streamlit app."""
 
+from src.utils.chart_spec import CHART_COLORS, CHART_THEME  # noqa: F401
+
 # ---------------------------------------------------------------------------
 # Color palettes
 # ---------------------------------------------------------------------------
@@ -96,55 +98,8 @@ DARK_COLORS = {
 # Chart colors (shared across themes - vibrant enough for both)
 # ---------------------------------------------------------------------------
 
-CHART_COLORS = {
-    "candle_up": "#26a69a",
-    "candle_down": "#ef5350",
-    "ema_10": "#2196F3",
-    "ema_20": "#FF9800",
-    "ema_50": "#9C27B0",
-    "ema_100": "#E91E63",
-    "bb_band": "#607D8B",
-    "bb_middle": "#2196F3",
-    "rsi": "#9C27B0",
-    "rsi_overbought": "#ef5350",
-    "rsi_oversold": "#26a69a",
-    "macd_line": "#2196F3",
-    "macd_signal": "#FF9800",
-    "macd_hist_pos": "#26a69a",
-    "macd_hist_neg": "#ef5350",
-    "atr": "#29b6f6",
-    "volume_up": "rgba(38, 166, 154, 0.5)",
-    "volume_down": "rgba(239, 83, 80, 0.5)",
-    "pivot": "#2196F3",
-    "resistance": "#ef5350",
-    "support": "#26a69a",
-}
-
-# Dark-mode overrides for chart elements that need visibility adjustments
-CHART_THEME = {
-    "light": {
-        "template": "plotly_white",
-        "paper_bg": "#ffffff",
-        "plot_bg": "#ffffff",
-        "grid": "#e0e0e0",
-        "font_color": "#1a1a1a",
-        "legend_bg": "rgba(255,255,255,0.8)",
-        "ref_line": "#404040",
-        "bb_fill_opacity": 0.1,
-        "atr_fill_opacity": 0.2,
-    },
-    "dark": {
-        "template": "plotly_dark",
-        "paper_bg": "#1a1a2e",
-        "plot_bg": "#1a1a2e",
-        "grid": "#2d2d3d",
-        "font_color": "#e8e8f0",
-        "legend_bg": "rgba(26,26,46,0.95)",
-        "ref_line": "#808090",
-        "bb_fill_opacity": 0.15,
-        "atr_fill_opacity": 0.3,
-    },
-}
+# CHART_COLORS and CHART_THEME live in src.utils.chart_spec so the agent charts
+# render with the same palette; they are re-exported here for the UI.
 
 # Pivot badge colors per theme
 PIVOT_COLORS = {